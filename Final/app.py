@@ -1,100 +1,377 @@
-from flask import Flask, jsonify, render_template, request
-from flask_cors import CORS
-import sys
-import os
-
-# Ensure system path includes current directory for module lookups
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-# Backend Imports
-from healthcare_agent.dss_agent.agent import EscalationAgent
-from healthcare_agent.dss_agent.models import Vitals, ResourceState
-from healthcare_agent.dss_agent.explainability.athena_stub import fetch_athena_guidelines
-from healthcare_agent.dss_agent.explainability.llm_stub import generate_explanation
-
-app = Flask(__name__, static_folder="static", static_url_path="/static")
-CORS(app)
-
-# --------------------------------------------------
-# UTILS
-# --------------------------------------------------
-
-def get_action_documentation(action_name):
-    return fetch_athena_guidelines(action_name)
-
-def explain_action_decision(recommendation, docs):
-    context = {
-        "recommendation": recommendation,
-        "docs": docs
-    }
-    return generate_explanation(context)
-
-# --------------------------------------------------
-# ROUTES
-# --------------------------------------------------
-
-# Serve the "Integrated One" frontend - The Agent Interface
-@app.route("/")
-def agent_ui():
-    return render_template("agent.html")
-
-@app.route("/api/agent/run", methods=["POST"])
-def run_agent_interactive():
-    try:
-        data = request.json
-        vitals_data = data.get("vitals", {})
-        resource_data = data.get("resources", {})
-        
-        # 1. Create Models
-        vitals = Vitals(
-            avpu=vitals_data.get("avpu", "A"),
-            sbp=int(vitals_data.get("sbp", 120)),
-            spo2=int(vitals_data.get("spo2", 98)),
-            rr=int(vitals_data.get("rr", 18)),
-            hr=80,  # Default
-            temp=37.0,
-            news2=int(vitals_data.get("news2", 0))
-        )
-        
-        r_state = ResourceState(
-            icu_beds_available=int(resource_data.get("icu_beds_available", 0)),
-            rrt_available=resource_data.get("rrt_available", True),
-            nurse_load=float(resource_data.get("nurse_load", 0.5)),
-            transport_delay_minutes=20
-        )
-        
-        # 2. Run Agent
-        # Use a temporary ID since this is stateless per request for the demo
-        temp_id = "SESSION_INTERACTIVE" 
-        agent = EscalationAgent(patient_id=temp_id)
-        
-        recs = agent.run_step(vitals, r_state)
-        
-        # 3. Enrich Recommendations with Docs & Explanations
-        enriched = []
-        for r in recs:
-            doc = get_action_documentation(r["action"])
-            explanation = explain_action_decision(r, [doc] if doc else [])
-            
-            enriched.append({
-                **r,
-                "documentation": doc,
-                "explanation": explanation
-            })
-            
-        return jsonify({
-            "status": "success",
-            "recommendations": enriched,
-            "patient_risk_score": vitals.news2
-        })
-        
-    except Exception as e:
-        print(f"Error running agent: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-if __name__ == "__main__":
-    # Ensure templates exist
-    if not os.path.exists("templates/agent.html"):
-        print("CRITICAL: templates/agent.html not found. Please ensure file exists.")
-    
-    app.run(host="127.0.0.1", port=5000, debug=True)
+from flask import Flask, jsonify, render_template, request
+from flask_cors import CORS
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import threading
+import time
+
+# Ensure system path includes current directory for module lookups
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend Imports
+from healthcare_agent.dss_agent.agent import EscalationAgent
+from healthcare_agent.dss_agent.models import Vitals, ResourceState, validate_vitals
+from healthcare_agent.dss_agent.registry import AgentRegistry
+from healthcare_agent.dss_agent.wal import WriteAheadLog
+from healthcare_agent.dss_agent.snapshot import claim_snapshot_path
+from healthcare_agent.dss_agent.instrumentation import AgentMetrics
+from healthcare_agent.dss_agent.encoding import encode_envelope, with_fields
+from healthcare_agent.dss_agent.reasoning.counterfactual import risk_curve, DEFAULT_CURVE_DELAYS, what_if_matrix, signal_mask
+from healthcare_agent.dss_agent.explainability.athena_stub import fetch_athena_guidelines
+from healthcare_agent.dss_agent.explainability.llm_stub import generate_explanation
+from healthcare_agent.dss_agent.explainability.cache import TTLCache
+from healthcare_agent.dss_agent.explainability.explanation_cache import ExplanationCache, explanation_context
+
+app = Flask(__name__, static_folder="static", static_url_path="/static")
+CORS(app)
+
+# Every agent step (vitals, resources, recommendations) is logged to
+# AGENT_WAL_DIR for audit and crash recovery. A background writer fsyncs once
+# per AGENT_WAL_FLUSH_INTERVAL_SECONDS. Each worker process needs its own
+# directory: a worker whose directory is already in use refuses to start.
+AGENT_WAL_DIR = os.environ.get("AGENT_WAL_DIR") or None
+agent_wal = WriteAheadLog(
+    AGENT_WAL_DIR,
+    flush_interval_seconds=float(os.environ.get("AGENT_WAL_FLUSH_INTERVAL_SECONDS", 0.05)),
+    segment_bytes=int(os.environ.get("AGENT_WAL_SEGMENT_BYTES", 64 * 1024 * 1024))
+) if AGENT_WAL_DIR else None
+if agent_wal is not None:
+    atexit.register(agent_wal.close)
+
+# Step counters and per-stage latency histograms, served at /metrics.
+# Stage timing is sampled on every AGENT_METRICS_SAMPLE_EVERY-th step.
+agent_metrics = AgentMetrics(sample_every=int(os.environ.get("AGENT_METRICS_SAMPLE_EVERY", 32)))
+
+# One agent per patient, kept across requests so history and trends build up.
+# Bounded by count (LRU), by the bytes held in histories and by idle time;
+# tune via environment for larger wards.
+agent_registry = AgentRegistry(
+    max_agents=int(os.environ.get("AGENT_REGISTRY_MAX_AGENTS", 5000)),
+    max_history_bytes=int(os.environ.get("AGENT_REGISTRY_MAX_HISTORY_BYTES", 256 * 1024 * 1024)),
+    idle_ttl_seconds=float(os.environ.get("AGENT_REGISTRY_IDLE_TTL_SECONDS", 6 * 3600)),
+    wal=agent_wal,
+    metrics=agent_metrics
+)
+
+# Patient state survives restarts through a snapshot file: restored lazily at
+# startup, written on shutdown and every AGENT_SNAPSHOT_INTERVAL_SECONDS
+# (0 = shutdown only). Each worker process needs its own path: a worker
+# whose path is already claimed by another process refuses to start.
+AGENT_SNAPSHOT_PATH = os.environ.get("AGENT_SNAPSHOT_PATH") or None
+AGENT_SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("AGENT_SNAPSHOT_INTERVAL_SECONDS", 300))
+
+def save_agent_snapshot():
+    try:
+        count = agent_registry.save_snapshot(AGENT_SNAPSHOT_PATH)
+        print(f"Saved agent snapshot with {count} patients to {AGENT_SNAPSHOT_PATH}")
+    except Exception as e:
+        print(f"Agent snapshot failed: {e!r}")
+
+def _snapshot_loop():
+    while True:
+        time.sleep(AGENT_SNAPSHOT_INTERVAL_SECONDS)
+        save_agent_snapshot()
+
+if AGENT_SNAPSHOT_PATH:
+    snapshot_claim = claim_snapshot_path(AGENT_SNAPSHOT_PATH)
+    if os.path.exists(AGENT_SNAPSHOT_PATH):
+        try:
+            print(f"Restoring {agent_registry.restore_snapshot(AGENT_SNAPSHOT_PATH)} patients from {AGENT_SNAPSHOT_PATH}")
+        except Exception as e:
+            print(f"Could not restore agent snapshot: {e!r}")
+    atexit.register(save_agent_snapshot)
+    if AGENT_SNAPSHOT_INTERVAL_SECONDS > 0:
+        threading.Thread(target=_snapshot_loop, name="agent-snapshot", daemon=True).start()
+
+# Documentation/explanation calls for all recommendations run in parallel on
+# this pool. All of a request's calls share one ENRICHMENT_TIMEOUT_SECONDS
+# deadline; a slow or failing call is replaced by a fallback so the response
+# degrades instead of stalling.
+ENRICHMENT_TIMEOUT_SECONDS = float(os.environ.get("ENRICHMENT_TIMEOUT_SECONDS", 2.0))
+enrichment_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ENRICHMENT_WORKERS", 16)),
+    thread_name_prefix="enrichment"
+)
+
+# Bounds on client-chosen /api/counterfactual/curve sweeps
+MAX_CURVE_DELAY_MINUTES = 24 * 60
+MAX_CURVE_POINTS = 500
+# Bounds on /api/counterfactual/what_if sweeps (delays share the curve's range)
+MAX_WHAT_IF_DELAYS = 50
+MAX_WHAT_IF_PATIENTS = 1000
+
+# Requests without a patient_id run on a throwaway agent under this ID
+ANONYMOUS_PATIENT_ID = "SESSION_INTERACTIVE"
+MAX_PATIENT_ID_LENGTH = 128
+
+DOCUMENTATION_UNAVAILABLE = "Guideline lookup unavailable. Follow local escalation policy."
+
+# Guidelines depend only on the action name, and there are only a handful of
+# actions, so nearly every lookup after warm-up is served from here.
+guideline_cache = TTLCache(
+    max_entries=int(os.environ.get("GUIDELINE_CACHE_MAX_ENTRIES", 256)),
+    ttl_seconds=float(os.environ.get("GUIDELINE_CACHE_TTL_SECONDS", 3600))
+)
+
+# Explanations are keyed by a hash of their context; EXPLANATION_CACHE_PATH
+# adds an on-disk tier that survives restarts.
+explanation_cache = ExplanationCache(
+    max_entries=int(os.environ.get("EXPLANATION_CACHE_MAX_ENTRIES", 4096)),
+    ttl_seconds=float(os.environ.get("EXPLANATION_CACHE_TTL_SECONDS", 24 * 3600)),
+    disk_path=os.environ.get("EXPLANATION_CACHE_PATH") or None,
+    serve_stale=os.environ.get("EXPLANATION_CACHE_SERVE_STALE", "0") == "1"
+)
+
+# --------------------------------------------------
+# UTILS
+# --------------------------------------------------
+
+def get_action_documentation(action_name):
+    return guideline_cache.get_or_load(action_name, lambda: fetch_athena_guidelines(action_name))
+
+def explain_action_decision(recommendation, docs):
+    context = explanation_context(recommendation, docs)
+    return explanation_cache.get_or_generate(context, lambda ctx: generate_explanation(ctx))
+
+def explanation_fallback(recommendation):
+    # The deterministic rationale is always available and says why the action was chosen
+    return recommendation.rationale
+
+def _results_by_deadline(futures, deadline, fallback):
+    """
+    Collects results of futures started together, sharing one deadline.
+    Returns (results, degraded) where failed or late calls get `fallback(i)`.
+    A late call that has already started cannot be interrupted: it finishes
+    on its pool worker and its result, if any, only reaches the caches.
+    """
+    results = []
+    degraded = False
+    for i, future in enumerate(futures):
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except Exception as e:
+            # Only stops calls still queued behind busy workers
+            future.cancel()
+            print(f"Enrichment call failed or timed out: {e!r}")
+            results.append(fallback(i))
+            degraded = True
+    return results, degraded
+
+def enrich_recommendations(recs):
+    """
+    Looks up documentation and explanation for each Recommendation, fanning
+    the calls out across recommendations. Both phases share one
+    ENRICHMENT_TIMEOUT_SECONDS deadline, so the whole enrichment never takes
+    longer than that. Returns (fields per recommendation, degraded).
+    """
+    deadline = time.monotonic() + ENRICHMENT_TIMEOUT_SECONDS
+    doc_futures = [enrichment_pool.submit(get_action_documentation, r.action) for r in recs]
+    docs, docs_degraded = _results_by_deadline(doc_futures, deadline, lambda i: None)
+
+    if time.monotonic() < deadline:
+        explanation_futures = [
+            enrichment_pool.submit(explain_action_decision, r, [doc] if doc else [])
+            for r, doc in zip(recs, docs)
+        ]
+        explanations, explanations_degraded = _results_by_deadline(
+            explanation_futures, deadline, lambda i: explanation_fallback(recs[i])
+        )
+    else:
+        # No time left: do not start calls whose results would be discarded
+        explanations = [explanation_fallback(r) for r in recs]
+        explanations_degraded = bool(recs)
+
+    fields = [
+        {
+            "documentation": doc if doc else DOCUMENTATION_UNAVAILABLE,
+            "explanation": explanation
+        }
+        for doc, explanation in zip(docs, explanations)
+    ]
+    return fields, docs_degraded or explanations_degraded
+
+def agent_response(step, vitals, fields, degraded):
+    """
+    The /api/agent/run success body as JSON bytes, built from the step's
+    pre-encoded recommendations without decoding or copying them. The
+    memory narrative is the same for every recommendation and is sent once.
+    """
+    return encode_envelope(
+        {"status": "success", "patient_risk_score": vitals.news2, "enrichment_degraded": degraded,
+         "memory_narrative": step.narrative},
+        "recommendations",
+        [with_fields(encoded, extra) for encoded, extra in zip(step.encoded, fields)]
+    )
+
+def parse_agent_request(data):
+    """
+    Builds (patient_id, Vitals, ResourceState) from an /api/agent/run body.
+    patient_id is None when the body has none. Raises ValueError for a
+    malformed body. Shared by the Flask route and the ASGI path in asgi.py.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    try:
+        vitals_data = data.get("vitals", {})
+        resource_data = data.get("resources", {})
+
+        # 1. Create Models
+        vitals = Vitals(
+            avpu=vitals_data.get("avpu", "A"),
+            sbp=int(vitals_data.get("sbp", 120)),
+            spo2=int(vitals_data.get("spo2", 98)),
+            rr=int(vitals_data.get("rr", 18)),
+            hr=80,  # Default
+            temp=37.0,
+            news2=int(vitals_data.get("news2", 0))
+        )
+
+        r_state = ResourceState(
+            icu_beds_available=int(resource_data.get("icu_beds_available", 0)),
+            rrt_available=bool(resource_data.get("rrt_available", True)),
+            nurse_load=float(resource_data.get("nurse_load", 0.5)),
+            transport_delay_minutes=20
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid vitals or resources: {e}") from None
+    validate_vitals(vitals)
+
+    patient_id = data.get("patient_id")
+    if patient_id is not None:
+        patient_id = str(patient_id)
+        if not 0 < len(patient_id) <= MAX_PATIENT_ID_LENGTH:
+            raise ValueError(f"patient_id must be 1-{MAX_PATIENT_ID_LENGTH} characters")
+    return patient_id, vitals, r_state
+
+def run_agent_step(patient_id, vitals, r_state):
+    """
+    Runs one step on the patient's persistent agent. Requests without a
+    patient_id get a fresh agent that is discarded afterwards, so unrelated
+    callers never share history. Such throwaway steps are not written to
+    the WAL: there is no patient to recover, and replaying them would merge
+    unrelated callers under ANONYMOUS_PATIENT_ID. Shared with asgi.py.
+    """
+    if patient_id is None:
+        agent = EscalationAgent(ANONYMOUS_PATIENT_ID, possible_actions=agent_registry.possible_actions,
+                                history_capacity=1, wal=None, metrics=agent_metrics)
+        return agent.run_step_encoded(vitals, r_state)
+    return agent_registry.run_step_encoded(patient_id, vitals, r_state)
+
+# --------------------------------------------------
+# ROUTES
+# --------------------------------------------------
+
+# Serve the "Integrated One" frontend - The Agent Interface
+@app.route("/")
+def agent_ui():
+    return render_template("agent.html")
+
+@app.route("/api/agent/run", methods=["POST"])
+def run_agent_interactive():
+    try:
+        patient_id, vitals, r_state = parse_agent_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        # 2. Run Agent
+        # Reuse the patient's agent so each call builds on the previous ones
+        # The step's recommendations come back already encoded as JSON
+        step = run_agent_step(patient_id, vitals, r_state)
+        
+        # 3. Enrich Recommendations with Docs & Explanations (in parallel, with timeouts)
+        fields, degraded = enrich_recommendations(step.recommendations)
+            
+        return app.response_class(agent_response(step, vitals, fields, degraded), mimetype="application/json")
+        
+    except Exception as e:
+        print(f"Error running agent: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/api/counterfactual/curve", methods=["POST"])
+def counterfactual_curve():
+    """
+    Risk-versus-delay curve for the "cost of waiting" chart.
+    Body: {"news2": int, "key_drivers": [...], "max_delay": 240, "step": 15}
+    max_delay is 0-MAX_CURVE_DELAY_MINUTES, step positive, and the sweep at
+    most MAX_CURVE_POINTS points; anything else gets a 400.
+    """
+    try:
+        data = request.json or {}
+        current_risk = min(1.0, int(data.get("news2", 0)) / 20.0)
+        max_delay = int(data.get("max_delay", DEFAULT_CURVE_DELAYS[-1]))
+        step = int(data.get("step", 15))
+        if not 0 <= max_delay <= MAX_CURVE_DELAY_MINUTES:
+            raise ValueError(f"max_delay must be between 0 and {MAX_CURVE_DELAY_MINUTES} minutes")
+        if step <= 0:
+            raise ValueError("step must be positive")
+        if max_delay // step + 1 > MAX_CURVE_POINTS:
+            raise ValueError(f"At most {MAX_CURVE_POINTS} curve points; increase step")
+        curve = risk_curve(current_risk, data.get("key_drivers", []), range(0, max_delay + 1, step))
+        return jsonify({"status": "success", "current_risk": current_risk, **curve})
+    except Exception as e:
+        print(f"Error computing counterfactual curve: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/counterfactual/what_if", methods=["POST"])
+def counterfactual_what_if():
+    """
+    Projected risk for tracked patients if action waits each delay.
+    Body: {"patient_ids": [...], "delays": [30, 60, 120]}
+    At most MAX_WHAT_IF_PATIENTS patients and MAX_WHAT_IF_DELAYS delays of
+    0-MAX_CURVE_DELAY_MINUTES; anything else gets a 400. Uses each
+    patient's latest step, read without creating or touching agents;
+    patients not in memory are listed as unknown.
+    """
+    try:
+        data = request.json or {}
+        delays = data.get("delays", [30, 60, 120])
+        requested = data.get("patient_ids", [])
+        if len(delays) > MAX_WHAT_IF_DELAYS:
+            raise ValueError(f"At most {MAX_WHAT_IF_DELAYS} delays")
+        if len(requested) > MAX_WHAT_IF_PATIENTS:
+            raise ValueError(f"At most {MAX_WHAT_IF_PATIENTS} patient_ids")
+        delays = [int(d) for d in delays]
+        if not all(0 <= delay <= MAX_CURVE_DELAY_MINUTES for delay in delays):
+            raise ValueError(f"delays must be between 0 and {MAX_CURVE_DELAY_MINUTES} minutes")
+        requested = [str(patient_id) for patient_id in requested]
+        inputs = agent_registry.peek(
+            requested,
+            lambda agent: (agent.current_risk(), signal_mask(agent.signals.explanation_signals()))
+        )
+        patient_ids = list(inputs)
+        unknown = [patient_id for patient_id in requested if patient_id not in inputs]
+        matrix = what_if_matrix(
+            [risk for risk, _ in inputs.values()],
+            delays,
+            [mask for _, mask in inputs.values()]
+        )
+        return jsonify({
+            "status": "success",
+            "patient_ids": patient_ids,
+            "delays": delays,
+            "projected_risk": matrix,
+            "unknown_patient_ids": unknown
+        })
+    except Exception as e:
+        print(f"Error computing what-if sweep: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify({
+        "guidelines": guideline_cache.stats(),
+        "explanations": explanation_cache.stats()
+    })
+
+@app.route("/metrics")
+def metrics():
+    return agent_metrics.to_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+if __name__ == "__main__":
+    # Ensure templates exist
+    if not os.path.exists("templates/agent.html"):
+        print("CRITICAL: templates/agent.html not found. Please ensure file exists.")
+    
+    app.run(host="127.0.0.1", port=5000, debug=True)
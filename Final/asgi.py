@@ -0,0 +1,151 @@
+"""
+ASGI entry point with an asyncio-native /api/agent/run.
+
+Explainability calls for all recommendations are awaited concurrently, so a
+slow knowledge base or LLM backend holds an event-loop task rather than a
+whole worker. Every other route is served by the Flask app.
+
+Run with:
+    uvicorn asgi:app --workers 4
+"""
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    app as flask_app, parse_agent_request, run_agent_step, agent_response,
+    ENRICHMENT_TIMEOUT_SECONDS, DOCUMENTATION_UNAVAILABLE, explanation_fallback, guideline_cache,
+    explanation_cache
+)
+from healthcare_agent.dss_agent.explainability.athena_stub import fetch_athena_guidelines_async
+from healthcare_agent.dss_agent.explainability.llm_stub import generate_explanation_async
+from healthcare_agent.dss_agent.explainability.explanation_cache import explanation_context
+
+MAX_BODY_BYTES = 1024 * 1024
+
+flask_fallback = WsgiToAsgi(flask_app)
+
+# --------------------------------------------------
+# UTILS
+# --------------------------------------------------
+
+async def _call_by_deadline(coro, deadline, fallback):
+    """
+    Awaits one backend call until the loop time `deadline`, cancelling it
+    if it runs late. Returns (result, degraded); failures and timeouts
+    yield `fallback`.
+    """
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        coro.close()
+        return fallback, True
+    try:
+        return await asyncio.wait_for(coro, remaining), False
+    except Exception as e:
+        print(f"Enrichment call failed or timed out: {e!r}")
+        return fallback, True
+
+async def enrich_recommendation(recommendation, deadline):
+    """
+    Returns (documentation and explanation fields, degraded) for one
+    Recommendation. Both calls share the request's `deadline`.
+    """
+    action = recommendation.action
+    doc, doc_degraded = await _call_by_deadline(
+        guideline_cache.get_or_load_async(action, lambda: fetch_athena_guidelines_async(action)),
+        deadline,
+        None
+    )
+    explanation, explanation_degraded = await _call_by_deadline(
+        explanation_cache.get_or_generate_async(
+            explanation_context(recommendation, [doc] if doc else []),
+            lambda ctx: generate_explanation_async(ctx)
+        ),
+        deadline,
+        explanation_fallback(recommendation)
+    )
+    return {
+        "documentation": doc if doc else DOCUMENTATION_UNAVAILABLE,
+        "explanation": explanation
+    }, doc_degraded or explanation_degraded
+
+async def run_agent(body: bytes):
+    """
+    Async counterpart of app.run_agent_interactive. Returns (status, payload),
+    the success payload already encoded as JSON bytes.
+    """
+    try:
+        patient_id, vitals, r_state = parse_agent_request(json.loads(body or b"{}"))
+    except ValueError as e:
+        # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+        return 400, {"status": "error", "message": str(e)}
+    try:
+        # The step may wait on the patient's step lock or a full WAL queue,
+        # so it runs in a worker thread rather than on the event loop
+        step = await asyncio.to_thread(run_agent_step, patient_id, vitals, r_state)
+        # One enrichment deadline for the whole request, as in app.enrich_recommendations
+        deadline = asyncio.get_running_loop().time() + ENRICHMENT_TIMEOUT_SECONDS
+        results = await asyncio.gather(*(enrich_recommendation(r, deadline) for r in step.recommendations))
+
+        return 200, agent_response(
+            step, vitals, [fields for fields, _ in results], any(degraded for _, degraded in results)
+        )
+    except Exception as e:
+        print(f"Error running agent: {e}")
+        return 500, {"status": "error", "message": str(e)}
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+async def _send_json(send, status: int, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# --------------------------------------------------
+# APP
+# --------------------------------------------------
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["path"] == "/api/agent/run" and scope["method"] == "POST":
+        try:
+            body = await _read_body(receive)
+        except ValueError as e:
+            await _send_json(send, 413, {"status": "error", "message": str(e)})
+            return
+        status, payload = await run_agent(body)
+        await _send_json(send, status, payload)
+        return
+
+    await flask_fallback(scope, receive, send)
@@ -1,72 +1,347 @@
-from typing import List, Dict, Any
-from .models import Vitals, ResourceState, Recommendation
-from .world_model import WorldModel
-from .perception import vitals_trends, delay_signals, treatment_response, notes_signals
-from .reasoning import safety, scoring, tradeoffs, counterfactual
-
-class EscalationAgent:
-    def __init__(self, patient_id: str):
-        self.world_model = WorldModel(patient_id)
-        # Defined possible actions (configuration)
-        self.possible_actions = [
-            {"action": "Monitor closely", "base_score": 0.4, "benefit": "Low", "cost_level": "Low", "cost_exp": "Minimal", "min_risk": 0.0},
-            {"action": "Increase monitoring frequency", "base_score": 0.6, "benefit": "Medium", "cost_level": "Low", "cost_exp": "Nursing time", "min_risk": 0.1},
-            {"action": "Consult specialist", "base_score": 0.7, "benefit": "Medium", "cost_level": "Medium", "cost_exp": "Specialist time", "min_risk": 0.2},
-            {"action": "ICU transfer", "base_score": 0.9, "benefit": "High", "cost_level": "High", "cost_exp": "ICU bed", "min_risk": 0.3},
-            {"action": "Prepare transfer plan / bed request", "base_score": 0.8, "benefit": "Medium", "cost_level": "Medium", "cost_exp": "Admin coordination", "min_risk": 0.3},
-            {"action": "Discharge planning", "base_score": 0.2, "benefit": "Low", "cost_level": "Low", "cost_exp": "Planning time", "min_risk": 0.0},
-        ]
-
-    def run_step(self, new_vitals: Vitals, resource_state: ResourceState) -> List[Dict[str, Any]]:
-        """
-        Executes one cycle of the agent loop:
-        Observe -> Update Beliefs -> Reason -> Recommend
-        """
-        # 1. Update Beliefs (World Model)
-        self.world_model.update_vitals(new_vitals)
-        self.world_model.update_resources(resource_state)
-        
-        belief_state = self.world_model.patient_belief
-        
-        # 2. Perception (Extract Signals)
-        # These signals could be attached to belief_state or passed to reasoning
-        trend_signals = vitals_trends.analyze_vital_trends(belief_state.history, belief_state.current_vitals)
-        delay_sig = delay_signals.check_delays(belief_state)
-        response_sig = treatment_response.check_treatment_response(belief_state)
-        
-        # 3. Reason (Generate Recommendations)
-        # A. Safety Check (Hard overrides)
-        emergent_rec = safety.check_safety_rules(belief_state)
-        if emergent_rec:
-            return [emergent_rec.to_dict()]
-            
-        # B. Scoring & Ranking
-        recommendations = scoring.score_actions(belief_state, resource_state, self.possible_actions)
-        
-        # C. Tradeoff Analysis (could be added to metadata)
-        # tradeoff_summary = tradeoffs.analyze_tradeoffs(recommendations)
-        
-        # Limit to top 3
-        top_recs = recommendations[:3]
-        
-        # D. Counterfactual Analysis (Explanation)
-        # Collect signals
-        explanation_signals = []
-        explanation_signals.extend(trend_signals.get("trends", []))
-        if delay_sig.get("overdue_review"):
-            explanation_signals.append("overdue_review")
-        if emergent_rec:
-            explanation_signals.append("emergent_safety_trigger")
-
-        # Estimate risk from NEWS2 (0-20 scale mapped to 0-1)
-        current_risk = min(1.0, belief_state.current_vitals.news2 / 20.0)
-
-        for rec in top_recs:
-            cf_result = counterfactual.analyze_counterfactual(
-                current_risk=current_risk,
-                delay_minutes=60,
-                active_signals=explanation_signals
-            )
-            rec.counterfactual_analysis = cf_result
-
-        return [rec.to_dict() for rec in top_recs]
+from time import perf_counter_ns
+from typing import List, Dict, Any, Iterable, Tuple, Optional, Sequence, Union
+from .models import Vitals, ResourceState, Recommendation
+from .world_model import WorldModel
+from .history import DEFAULT_CAPACITY
+from .perception.signals import StepSignals
+from .catalog import ActionCatalog, DEFAULT_ACTIONS, as_catalog
+from .reasoning import safety, scoring, tradeoffs, counterfactual, narrative
+from .wal import WriteAheadLog
+from .instrumentation import AgentMetrics
+from .encoding import EncodedStep, encode_recommendations
+
+def default_actions() -> List[dict]:
+    """
+    Returns a mutable copy of the built-in action table (configuration).
+    Agents share the precompiled catalog from catalog.default_catalog();
+    use this to start a customised table.
+    """
+    return [dict(action) for action in DEFAULT_ACTIONS]
+
+class EscalationAgent:
+    def __init__(self, patient_id: str, possible_actions: Union[ActionCatalog, List[dict], None] = None,
+                 history_capacity: int = DEFAULT_CAPACITY,
+                 safety_rules: Optional[safety.SafetyRuleSet] = None,
+                 wal: Optional[WriteAheadLog] = None,
+                 metrics: Optional[AgentMetrics] = None):
+        self.world_model = WorldModel(patient_id, history_capacity=history_capacity)
+        # Defined possible actions (configuration)
+        # Defaults to the process-wide precompiled catalog shared by every agent;
+        # a list of action dicts is validated and compiled here.
+        self.possible_actions = as_catalog(possible_actions)
+        # Compiled safety rules; hospital-specific tables replace the defaults
+        self.safety_rules = safety_rules if safety_rules is not None else safety.DEFAULT_RULESET
+        # Optional step log for audit and crash recovery
+        self.wal = wal
+        # Optional per-stage timing and step counters
+        self.metrics = metrics
+        self.signals = StepSignals(self.world_model.patient_belief, self.world_model.trends)
+        # Memory narrative, rebuilt only when a tracked vital changes
+        self.narrator = narrative.MemoryNarrator()
+
+    def restore_world_model(self, world_model: WorldModel):
+        """
+        Replaces this agent's beliefs, e.g. with a WorldModel loaded from a snapshot.
+        """
+        self.world_model = world_model
+        self.signals = StepSignals(world_model.patient_belief, world_model.trends)
+        self.narrator = narrative.MemoryNarrator()
+
+    def current_risk(self) -> float:
+        """
+        Estimate risk from NEWS2 (0-20 scale mapped to 0-1). A reading
+        without NEWS2 was escalated by the safety rules and counts as 1.
+        """
+        news2 = self.world_model.patient_belief.current_vitals.news2
+        return 1.0 if news2 is None else min(1.0, news2 / 20.0)
+
+    def run_step(self, new_vitals: Vitals, resource_state: ResourceState) -> List[Dict[str, Any]]:
+        """
+        Executes one cycle of the agent loop:
+        Observe -> Update Beliefs -> Reason -> Recommend
+        """
+        return self._step(new_vitals, resource_state, False)[1]
+
+    def run_step_encoded(self, new_vitals: Vitals, resource_state: ResourceState) -> EncodedStep:
+        """
+        Same step as run_step, with the output serialized straight to JSON
+        bytes (see dss_agent.encoding) instead of built as dicts. The memory
+        narrative, the same for every recommendation, is returned once as
+        EncodedStep.narrative and left out of the encoded recommendations.
+        """
+        recs, encoded = self._step(new_vitals, resource_state, True)
+        return EncodedStep(recs, encoded, list(recs[0].memory_narrative))
+
+    def _step(self, new_vitals: Vitals, resource_state: ResourceState,
+              encode: bool) -> Tuple[List[Recommendation], Union[List[Dict[str, Any]], List[bytes]]]:
+        # Stage boundary clock reads, only on steps the metrics sample
+        metrics = self.metrics
+        marks = metrics.begin() if metrics is not None else None
+
+        emergent_rec = self._observe(new_vitals, resource_state, marks)
+        if emergent_rec:
+            recs = [emergent_rec]
+        else:
+            # B. Scoring & Ranking
+            recommendations = scoring.score_actions_batch(
+                [self.world_model.patient_belief], resource_state, self.possible_actions.compiled
+            )[0]
+            if marks is not None:
+                marks.append(perf_counter_ns())
+            recs = self._recommend(recommendations, marks)
+
+        if encode:
+            result = encode_recommendations(recs, narrative=False)
+        else:
+            result = [rec.to_dict() for rec in recs]
+        if marks is not None:
+            marks.append(perf_counter_ns())
+            metrics.record_step(self.world_model.patient_belief.patient_id, bool(emergent_rec), marks)
+        elif emergent_rec and metrics is not None:
+            metrics.record_step(self.world_model.patient_belief.patient_id, True, None)
+        if self.wal is not None:
+            self.wal.append(self.world_model.patient_belief.patient_id, new_vitals, resource_state, result,
+                            narrative=recs[0].memory_narrative if encode else None)
+        return recs, result
+
+    def _observe(self, new_vitals: Vitals, resource_state: ResourceState,
+                 marks: Optional[List[int]] = None) -> Optional[Recommendation]:
+        """
+        Updates beliefs, prepares this step's perception signals and runs the
+        safety check. Returns the emergent recommendation if a safety rule
+        fired, else None.
+        """
+        self._update_beliefs(new_vitals, resource_state)
+        if marks is not None:
+            marks.append(perf_counter_ns())
+        
+        # 3. Reason (Generate Recommendations)
+        # A. Safety Check (Hard overrides)
+        emergent_rec = safety.check_safety_rules(self.world_model.patient_belief, self.safety_rules)
+        if marks is not None:
+            marks.append(perf_counter_ns())
+        return emergent_rec
+
+    def _update_beliefs(self, new_vitals: Vitals, resource_state: ResourceState):
+        # 1. Update Beliefs (World Model)
+        self.world_model.update_vitals(new_vitals, self._admit_missing)
+        self.world_model.update_resources(resource_state)
+        
+        belief_state = self.world_model.patient_belief
+        
+        # 2. Perception (Extract Signals)
+        # Signals are lazy: the emergent path returns before reading any of
+        # them, and the routine path computes only the ones it uses.
+        self.signals = StepSignals(belief_state, self.world_model.trends)
+
+    def _admit_missing(self, vitals: Vitals, missing: Tuple[str, ...]):
+        # A reading with missing values can only be escalated, never scored
+        if not self.safety_rules.check(vitals):
+            raise ValueError(f"Reading is missing {', '.join(missing)} and no safety rule escalates it")
+
+    def _recommend(self, recommendations: List[Recommendation],
+                   marks: Optional[List[int]] = None) -> List[Recommendation]:
+        """
+        Takes the ranked (non-emergent) recommendations for this step and
+        returns the top ones with intent, memory narrative and counterfactual
+        analysis attached. Appends a clock mark after each stage to `marks`
+        when given.
+        """
+        belief_state = self.world_model.patient_belief
+
+        # C. Tradeoff Analysis (could be added to metadata)
+        # tradeoff_summary = tradeoffs.analyze_tradeoffs(recommendations)
+        
+        # Limit to top 3
+        top_recs = recommendations[:3]
+        
+        # D. Counterfactual Analysis (Explanation)
+        # Collect signals
+        explanation_signals = self.signals.explanation_signals()
+
+        current_risk = self.current_risk()
+        if marks is not None:
+            marks.append(perf_counter_ns())
+
+        # Determine Intent
+        # Default to escalate if top recommendation is high score/high cost
+        # Monitor if top recommendation is "Monitor closely" or scores are low
+        # (emergent patients never reach this point: safety returns early)
+        
+        primary_rec = top_recs[0]
+        intent = "escalate"
+        next_check_in = None
+        
+        # Threshold for escalation: standard score threshold or specific action types
+        # If the top action is "Monitor closely" or "Increase monitoring frequency"
+        # we consider it a MONITORING intent.
+        
+        monitoring_actions = ["Monitor closely", "Increase monitoring frequency", "Discharge planning"]
+        
+        if primary_rec.action in monitoring_actions:
+             intent = "monitor"
+             # Set check-in time based on action
+             if primary_rec.action == "Increase monitoring frequency":
+                 next_check_in = 30 # Check sooner
+             else:
+                 next_check_in = 60 # Standard check
+        elif primary_rec.confidence < 0.5: # Low confidence in escalation
+             # Force intent to monitor if confidence in escalation is low? 
+             # Maybe safer to stick to recommendation but flag intent.
+             pass
+
+        # Generate Memory Narrative (cached until a tracked vital changes)
+        narrative_lines = self.narrator.narrative(belief_state.history, belief_state.current_vitals)
+        if marks is not None:
+            marks.append(perf_counter_ns())
+
+        # The counterfactual depends only on risk, delay and signals, which are
+        # the same for every recommendation in this step: compute it once.
+        cf_result = counterfactual.analyze_counterfactual(
+            current_risk=current_risk,
+            delay_minutes=next_check_in if next_check_in else 60,
+            active_signals=explanation_signals
+        )
+        if marks is not None:
+            marks.append(perf_counter_ns())
+
+        for rec in top_recs:
+            # Propagate intent to all (or just primary? Usually intent is agent-level)
+            # But we persist it on the recommendation objects as requested.
+            rec.intent = intent
+            if intent == "monitor":
+                rec.next_check_in_minutes = next_check_in
+            
+            rec.memory_narrative = narrative_lines
+            rec.counterfactual_analysis = cf_result
+
+        return top_recs
+
+
+class WardAgent:
+    """
+    Evaluates a whole ward per tick.
+    Keeps one EscalationAgent (and WorldModel) per patient and shares a single
+    action table and ResourceState across all of them.
+    """
+    def __init__(self, possible_actions: Union[ActionCatalog, List[dict], None] = None,
+                 safety_rules: Optional[safety.SafetyRuleSet] = None,
+                 wal: Optional[WriteAheadLog] = None,
+                 metrics: Optional[AgentMetrics] = None):
+        self.possible_actions = as_catalog(possible_actions)
+        self.compiled_actions = self.possible_actions.compiled
+        self.safety_rules = safety_rules if safety_rules is not None else safety.DEFAULT_RULESET
+        self.wal = wal
+        self.metrics = metrics
+        self.agents: Dict[str, EscalationAgent] = {}
+        # Patients whose reading failed in the last run_batch, with the error
+        self.failed_patients: Dict[str, str] = {}
+
+    def get_agent(self, patient_id: str) -> EscalationAgent:
+        agent = self.agents.get(patient_id)
+        if agent is None:
+            agent = EscalationAgent(patient_id, possible_actions=self.possible_actions,
+                                    safety_rules=self.safety_rules, wal=self.wal, metrics=self.metrics)
+            self.agents[patient_id] = agent
+        return agent
+
+    def discharge(self, patient_id: str):
+        """
+        Drops a patient's agent and belief state from the ward.
+        """
+        self.agents.pop(patient_id, None)
+
+    def what_if(self, delays: Sequence[int], patient_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Projected risk for each patient (default: everyone on the ward) if
+        action waits each of `delays` minutes, from the patient's latest
+        risk and trend signals.
+
+        Returns:
+            Dict with "patient_ids", "delays" and a "projected_risk" matrix
+            (one row per patient, one column per delay).
+        """
+        patient_ids = list(self.agents) if patient_ids is None else list(patient_ids)
+        agents = [self.agents[patient_id] for patient_id in patient_ids]
+        matrix = counterfactual.what_if_matrix(
+            [agent.current_risk() for agent in agents],
+            delays,
+            [counterfactual.signal_mask(agent.signals.explanation_signals()) for agent in agents]
+        )
+        return {"patient_ids": patient_ids, "delays": list(delays), "projected_risk": matrix}
+
+    def run_batch(self, vitals_list: Iterable[Tuple[str, Vitals]], resource_state: ResourceState) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Runs one agent step for every (patient_id, vitals) pair against the
+        same ResourceState. Output per patient is identical to calling
+        EscalationAgent.run_step for that patient.
+
+        Beliefs are updated per patient, then safety rules are evaluated for
+        the whole batch, and all remaining patients are scored together with
+        the columnar scoring engine.
+
+        A reading that fails (e.g. an unusable value, see
+        WorldModel.update_vitals) leaves its patient unchanged and is
+        reported in `failed_patients`; every other patient still gets a
+        result. Raises ValueError, before any patient's state changes, when
+        a patient appears more than once in the batch.
+
+        Returns:
+            Dict mapping patient_id to that patient's recommendation dicts,
+            for every patient not in `failed_patients`.
+        """
+        readings = list(vitals_list)
+        results: Dict[str, List[Dict[str, Any]]] = dict.fromkeys(patient_id for patient_id, _ in readings)
+        if len(results) != len(readings):
+            seen = set()
+            for patient_id, _ in readings:
+                if patient_id in seen:
+                    raise ValueError(f"Patient {patient_id} appears more than once in the batch")
+                seen.add(patient_id)
+        self.failed_patients = failed = {}
+        agents = []
+        get_agent = self.get_agent
+        for patient_id, vitals in readings:
+            agent = get_agent(patient_id)
+            try:
+                agent._update_beliefs(vitals, resource_state)
+            except Exception as e:
+                failed[patient_id] = f"{type(e).__name__}: {e}"
+                continue
+            agents.append(agent)
+
+        pending = []
+        emergent = safety.check_safety_rules_batch(
+            [agent.world_model.patient_belief for agent in agents], self.safety_rules
+        )
+        for agent, emergent_rec in zip(agents, emergent):
+            if emergent_rec:
+                results[agent.world_model.patient_belief.patient_id] = [emergent_rec.to_dict()]
+            else:
+                pending.append(agent)
+
+        ranked = scoring.score_actions_batch(
+            [agent.world_model.patient_belief for agent in pending], resource_state, self.compiled_actions
+        )
+        for agent, recommendations in zip(pending, ranked):
+            patient_id = agent.world_model.patient_belief.patient_id
+            try:
+                results[patient_id] = [rec.to_dict() for rec in agent._recommend(recommendations)]
+            except Exception as e:
+                failed[patient_id] = f"{type(e).__name__}: {e}"
+        for patient_id in failed:
+            del results[patient_id]
+
+        if self.metrics is not None:
+            # Batched patients share their stage timings; only the step counters apply
+            for agent, emergent_rec in zip(agents, emergent):
+                if agent.world_model.patient_belief.patient_id in failed:
+                    continue
+                self.metrics.begin()
+                if emergent_rec:
+                    self.metrics.record_step(agent.world_model.patient_belief.patient_id, True, None)
+        if self.wal is not None:
+            for patient_id, vitals in readings:
+                if patient_id not in failed:
+                    self.wal.append(patient_id, vitals, resource_state, results[patient_id])
+        return results
@@ -0,0 +1,142 @@
+"""
+Action catalog: the actions the agent can recommend.
+
+A catalog is validated and compiled once, then shared read-only by every
+agent in the process. The built-in catalog can be replaced per site with a
+JSON file, either passed to ActionCatalog.load or named by the
+DSS_ACTION_CATALOG environment variable, without a code change.
+"""
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Mapping, Tuple, Union
+from .reasoning.scoring import CompiledActions, compile_actions, COST_LEVELS, GATE_NAMES, GATE_NONE, RATIONALE_FIELDS
+
+CATALOG_ENV_VAR = "DSS_ACTION_CATALOG"
+
+DEFAULT_ACTIONS = (
+    {"action": "Monitor closely", "base_score": 0.4, "benefit": "Low", "cost_level": "Low", "cost_exp": "Minimal", "min_risk": 0.0},
+    {"action": "Increase monitoring frequency", "base_score": 0.6, "benefit": "Medium", "cost_level": "Low", "cost_exp": "Nursing time", "min_risk": 0.1},
+    {"action": "Consult specialist", "base_score": 0.7, "benefit": "Medium", "cost_level": "Medium", "cost_exp": "Specialist time", "min_risk": 0.2},
+    {"action": "ICU transfer", "base_score": 0.9, "benefit": "High", "cost_level": "High", "cost_exp": "ICU bed", "min_risk": 0.3,
+     "rationale_template": "ICU beds: {icu_beds_available}. Delay: {transport_delay_minutes}m."},
+    {"action": "Prepare transfer plan / bed request", "base_score": 0.8, "benefit": "Medium", "cost_level": "Medium", "cost_exp": "Admin coordination", "min_risk": 0.3,
+     "rationale_template": "ICU full (0 beds). Initiating contingency planning."},
+    {"action": "Discharge planning", "base_score": 0.2, "benefit": "Low", "cost_level": "Low", "cost_exp": "Planning time", "min_risk": 0.0},
+)
+
+_REQUIRED = {"action": str, "base_score": (int, float), "benefit": str, "cost_level": str, "cost_exp": str}
+_OPTIONAL = {"min_risk": (int, float), "gate": str, "rationale_template": str}
+
+def _validate(index: int, row: Any, source: str) -> Dict[str, Any]:
+    where = f"Action catalog {source}, entry {index}"
+    if not isinstance(row, dict):
+        raise ValueError(f"{where}: expected an object, got {type(row).__name__}")
+    unknown = set(row) - set(_REQUIRED) - set(_OPTIONAL)
+    if unknown:
+        raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+    for key, types in list(_REQUIRED.items()) + list(_OPTIONAL.items()):
+        if key not in row:
+            if key in _REQUIRED:
+                raise ValueError(f"{where}: missing '{key}'")
+            continue
+        if not isinstance(row[key], types) or isinstance(row[key], bool):
+            raise ValueError(f"{where}: '{key}' has the wrong type")
+    if not row["action"].strip():
+        raise ValueError(f"{where}: 'action' is empty")
+    if row["cost_level"] not in COST_LEVELS:
+        raise ValueError(f"{where}: 'cost_level' must be one of {COST_LEVELS}")
+    if not 0.0 <= row.get("min_risk", 0.0) <= 1.0:
+        raise ValueError(f"{where}: 'min_risk' must be between 0 and 1")
+    if "gate" in row and row["gate"] not in GATE_NAMES:
+        raise ValueError(f"{where}: 'gate' must be one of {sorted(GATE_NAMES)}")
+    if "rationale_template" in row:
+        try:
+            row["rationale_template"].format(**dict.fromkeys(RATIONALE_FIELDS, 0))
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"{where}: 'rationale_template' is not a valid template ({e!r}); "
+                             f"placeholders must be among {list(RATIONALE_FIELDS)}") from None
+    return dict(row)
+
+@dataclass(frozen=True)
+class ActionCatalog:
+    """
+    A validated, read-only action table and its compiled columns.
+    Actions are addressed by integer ID (their position in this catalog,
+    see id_of) or by name.
+    """
+    actions: Tuple[Mapping[str, Any], ...]
+    compiled: CompiledActions
+    ids: Mapping[str, int]
+    source: str = "<built-in>"
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]], source: str = "<dicts>") -> "ActionCatalog":
+        """
+        Validates the rows and compiles them. Raises ValueError on the first
+        problem, or when no action is always eligible (min_risk 0 and no
+        gate), since a patient matching no action would get no recommendation.
+        """
+        validated = [_validate(i, row, source) for i, row in enumerate(rows)]
+        if not validated:
+            raise ValueError(f"Action catalog {source}: no actions defined")
+        ids: Dict[str, int] = {}
+        for i, row in enumerate(validated):
+            if row["action"] in ids:
+                raise ValueError(f"Action catalog {source}, entry {i}: duplicate action '{row['action']}'")
+            ids[row["action"]] = i
+        actions = tuple(MappingProxyType(row) for row in validated)
+        compiled = compile_actions(list(actions))
+        if not any(min_risk <= 0.0 and gate == GATE_NONE for min_risk, gate in zip(compiled.min_risk, compiled.gate)):
+            raise ValueError(f"Action catalog {source}: needs at least one always-eligible action "
+                             f"(min_risk 0 and no gate), e.g. 'Monitor closely'")
+        return cls(actions=actions, compiled=compiled, ids=MappingProxyType(ids), source=source)
+
+    @classmethod
+    def load(cls, path: str) -> "ActionCatalog":
+        """
+        Reads a JSON catalog: a list of action objects, or {"actions": [...]}.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("actions")
+        if not isinstance(data, list):
+            raise ValueError(f"Action catalog {path}: expected a list of actions")
+        return cls.from_dicts(data, source=path)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return iter(self.actions)
+
+    def __getitem__(self, action_id: int) -> Mapping[str, Any]:
+        return self.actions[action_id]
+
+    def id_of(self, action: str) -> int:
+        return self.ids[action]
+
+@lru_cache(maxsize=None)
+def default_catalog() -> ActionCatalog:
+    """
+    The process-wide catalog: the file named by DSS_ACTION_CATALOG if set,
+    otherwise the built-in actions. Loaded and validated once.
+    """
+    path = os.environ.get(CATALOG_ENV_VAR)
+    if path:
+        return ActionCatalog.load(path)
+    return ActionCatalog.from_dicts(DEFAULT_ACTIONS, source="<built-in>")
+
+def as_catalog(actions: Union[ActionCatalog, Iterable[Dict[str, Any]], None]) -> ActionCatalog:
+    """
+    Accepts a catalog, a list of action dicts (validated and compiled), or
+    None for the process-wide default.
+    """
+    if actions is None:
+        return default_catalog()
+    if isinstance(actions, ActionCatalog):
+        return actions
+    return ActionCatalog.from_dicts(actions)
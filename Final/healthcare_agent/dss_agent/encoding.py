@@ -0,0 +1,134 @@
+"""
+Direct JSON encoding of agent output.
+
+Recommendation.to_dict() builds a fresh nested dict per recommendation,
+which a server then copies again to add its own fields and walks a second
+time to serialize. The functions here write the same JSON straight to
+bytes:
+
+- the catalog fields of an action (name, expected benefit, cost) never
+  change, so their encoding is cached per action;
+- the memory narrative and counterfactual are one object shared by every
+  recommendation of a step and are encoded once per step (the agent's
+  server path leaves the narrative out and sends it once per response);
+- extra fields (documentation, explanation) are spliced onto an encoded
+  recommendation, and encoded recommendations into a response, without
+  decoding or copying them.
+
+Encoded recommendations decode to exactly what to_dict() returns.
+"""
+import json
+from dataclasses import dataclass
+from json.encoder import c_make_encoder, encode_basestring_ascii
+from typing import Any, Dict, List, Mapping, Sequence
+from .models import Recommendation
+
+# json.dumps builds a new C encoder per call; build one and reuse it. Where
+# the C accelerator is missing, fall back to the pure-Python encoder.
+if c_make_encoder is not None:
+    _chunks = c_make_encoder(None, json.JSONEncoder().default, encode_basestring_ascii, None,
+                             ":", ",", False, False, True)
+    def _encode(value: Any) -> str:
+        return "".join(_chunks(value, 0))
+else:
+    _encode = json.JSONEncoder(separators=(",", ":")).encode
+
+# Encoded catalog fields per (action, benefit, cost level, cost explanation);
+# cleared when full so ad hoc action tables cannot grow it without bound
+_CATALOG_FIELDS: Dict[tuple, bytes] = {}
+_MAX_CATALOG_FIELDS = 4096
+
+_STEP_FIELDS = '"rationale":%s,"confidence":%r,"emergent":%s,"rank":%d,"intent":%s,"next_check_in_minutes":%s'
+
+@dataclass
+class EncodedStep:
+    """
+    One agent step's recommendations with their pre-encoded JSON, in the
+    same order, and the step's memory narrative (not repeated in `encoded`).
+    """
+    recommendations: List[Recommendation]
+    encoded: List[bytes]
+    narrative: List[str]
+
+def encode_json(value: Any) -> bytes:
+    """
+    Compact JSON, ASCII-escaped like json.dumps.
+    """
+    return _encode(value).encode("ascii")
+
+def _catalog_fields(rec: Recommendation) -> bytes:
+    cost = rec.cost
+    key = (rec.action, rec.expected_benefit, cost.level, cost.explanation)
+    encoded = _CATALOG_FIELDS.get(key)
+    if encoded is None:
+        if len(_CATALOG_FIELDS) >= _MAX_CATALOG_FIELDS:
+            _CATALOG_FIELDS.clear()
+        encoded = _CATALOG_FIELDS[key] = encode_json({
+            "action": rec.action,
+            "expected_benefit": rec.expected_benefit,
+            "cost": {"level": cost.level, "explanation": cost.explanation},
+        })[:-1]
+    return encoded
+
+def encode_recommendations(recs: Sequence[Recommendation], narrative: bool = True) -> List[bytes]:
+    """
+    Encodes a step's recommendations, each as one JSON object. With
+    `narrative` False the memory_narrative field is left out.
+    """
+    # Narrative and counterfactual objects seen in this call, by identity
+    shared: Dict[int, bytes] = {}
+    encoded = []
+    for rec in recs:
+        if narrative:
+            lines = rec.memory_narrative
+            narrative_json = shared.get(id(lines))
+            if narrative_json is None:
+                narrative_json = shared[id(lines)] = b',"memory_narrative":' + encode_json(lines)
+        else:
+            narrative_json = b""
+        counterfactual = rec.counterfactual_analysis
+        counterfactual_json = shared.get(id(counterfactual))
+        if counterfactual_json is None:
+            counterfactual_json = shared[id(counterfactual)] = encode_json(counterfactual)
+        step_fields = _STEP_FIELDS % (
+            encode_basestring_ascii(rec.rationale),
+            float(rec.confidence),
+            "true" if rec.emergent else "false",
+            rec.rank,
+            encode_basestring_ascii(rec.intent),
+            "null" if rec.next_check_in_minutes is None else int(rec.next_check_in_minutes),
+        )
+        encoded.append(b"".join((
+            _catalog_fields(rec), b",", step_fields.encode("ascii"), narrative_json,
+            b',"counterfactual_analysis":', counterfactual_json, b"}",
+        )))
+    return encoded
+
+def _members(fields: Mapping[str, Any]) -> bytes:
+    # `"key":value,...` without braces; strings (the usual case) skip the
+    # general encoder
+    return ",".join(
+        encode_basestring_ascii(key) + ":" + (encode_basestring_ascii(value) if type(value) is str else _encode(value))
+        for key, value in fields.items()
+    ).encode("ascii")
+
+def with_fields(encoded: bytes, fields: Mapping[str, Any]) -> bytes:
+    """
+    Adds `fields` to an encoded JSON object.
+    """
+    if not fields:
+        return encoded
+    return b"".join((memoryview(encoded)[:-1], b",", _members(fields), b"}"))
+
+def encode_envelope(fields: Mapping[str, Any], key: str, items: Sequence[bytes]) -> bytes:
+    """
+    Encodes `fields` as a JSON object with `key` holding the array of
+    pre-encoded `items`.
+    """
+    parts = [b"{", _members(fields), b"," if fields else b"", encode_basestring_ascii(key).encode("ascii"), b":["]
+    for i, item in enumerate(items):
+        if i:
+            parts.append(b",")
+        parts.append(item)
+    parts.append(b"]}")
+    return b"".join(parts)
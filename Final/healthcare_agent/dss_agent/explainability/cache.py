@@ -0,0 +1,228 @@
+"""
+In-memory TTL cache for explainability lookups.
+Size-bounded (LRU), with single-flight loading so concurrent misses for the
+same key make one backend call, optional serve-stale-while-refreshing, and
+hit/miss counters for monitoring.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class _Flight:
+    """
+    An in-progress load that other callers for the same key wait on.
+    """
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl_seconds` after loading.
+
+    get_or_load / get_or_load_async return a cached value or call the loader.
+    While a load for a key is in flight, further callers for that key wait
+    for it instead of calling the backend again. Loader errors propagate to
+    every waiting caller and are not cached.
+
+    With `serve_stale=True`, an expired entry is returned immediately and
+    refreshed in the background (one refresh per key at a time).
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600.0,
+                 clock: Callable[[], float] = time.monotonic, serve_stale: bool = False):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.serve_stale = serve_stale
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._async_flights: Dict[Hashable, "asyncio.Future"] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """
+        Drops one key, or every entry when no key is given.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    # -- Lookups ------------------------------------------------------------
+
+    _MISSING = object()
+
+    def _lookup_locked(self, key: Hashable, now: float, allow_stale: bool = False):
+        """
+        Returns (value, stale). Expired entries are dropped unless `allow_stale`.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return self._MISSING, False
+        expires_at, value = entry
+        stale = expires_at is not None and expires_at <= now
+        if stale and not allow_stale:
+            del self._entries[key]
+            return self._MISSING, False
+        self._entries.move_to_end(key)
+        return value, stale
+
+    def _store_locked(self, key: Hashable, value: Any, now: float):
+        expires_at = None if self.ttl_seconds is None else now + self.ttl_seconds
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value, _ = self._lookup_locked(key, self._clock())
+        return default if value is self._MISSING else value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._store_locked(key, value, self._clock())
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            value, stale = self._lookup_locked(key, self._clock(), self.serve_stale)
+            if value is not self._MISSING and not stale:
+                self.hits += 1
+                return value
+            if stale:
+                self.stale_hits += 1
+                if key not in self._flights:
+                    self._flights[key] = _Flight()
+                    threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        return self._run_flight(key, flight, loader)
+
+    def _run_flight(self, key: Hashable, flight: _Flight, loader: Callable[[], Any]) -> Any:
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._store_locked(key, flight.value, self._clock())
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any]):
+        """
+        Background refresh of a stale entry. Failures keep the stale value.
+        """
+        try:
+            self._run_flight(key, self._flights[key], loader)
+        except Exception as e:
+            print(f"Cache refresh failed for {key!r}: {e!r}")
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant. Coalesces concurrent misses within the running event loop.
+        """
+        with self._lock:
+            value, stale = self._lookup_locked(key, self._clock(), self.serve_stale)
+            if value is not self._MISSING and not stale:
+                self.hits += 1
+                return value
+            if stale:
+                self.stale_hits += 1
+                if key not in self._async_flights:
+                    self._async_flights[key] = asyncio.get_running_loop().create_future()
+                    asyncio.ensure_future(self._refresh_async(key, loader))
+                return value
+            pending = self._async_flights.get(key)
+            if pending is None:
+                pending = self._async_flights[key] = asyncio.get_running_loop().create_future()
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The leading caller was cancelled; load on our own behalf
+                return await self.get_or_load_async(key, loader)
+
+        return await self._run_async_flight(key, pending, loader)
+
+    async def _run_async_flight(self, key: Hashable, pending: "asyncio.Future", loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as e:
+            pending.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as lost
+            pending.exception()
+            raise
+        else:
+            with self._lock:
+                self._store_locked(key, value, self._clock())
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._async_flights.pop(key, None)
+
+    async def _refresh_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            await self._run_async_flight(key, self._async_flights[key], loader)
+        except Exception as e:
+            print(f"Cache refresh failed for {key!r}: {e!r}")
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for LLM explanations.
+Keys are a canonical hash of the explanation context, so identical contexts
+from different patients or requests share one generated explanation. An
+in-memory LRU tier sits in front of an optional SQLite tier that survives
+restarts.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from ..models import Recommendation
+from .cache import TTLCache
+
+# Recommendation fields the explainer is given. Per-patient detail such as the
+# memory narrative and exact counterfactual numbers is left out so that
+# equivalent recommendations produce the same context.
+EXPLANATION_FIELDS = ("action", "rationale", "expected_benefit", "cost", "confidence", "emergent", "intent")
+
+def explanation_context(recommendation: Union[Dict[str, Any], Recommendation], docs: List[str]) -> Dict[str, Any]:
+    """
+    Builds the context passed to generate_explanation for one recommendation,
+    given as a to_dict() dict or the Recommendation itself.
+    """
+    if isinstance(recommendation, Recommendation):
+        rec = {name: getattr(recommendation, name) for name in EXPLANATION_FIELDS}
+        rec["cost"] = {"level": recommendation.cost.level, "explanation": recommendation.cost.explanation}
+        counterfactual = recommendation.counterfactual_analysis
+    else:
+        rec = {name: recommendation.get(name) for name in EXPLANATION_FIELDS}
+        counterfactual = recommendation.get("counterfactual_analysis")
+    rec["key_drivers"] = sorted(counterfactual["key_drivers"]) if counterfactual else []
+    return {
+        "recommendation": rec,
+        "docs": list(docs)
+    }
+
+def canonical_key(context: Dict[str, Any]) -> str:
+    """
+    SHA-256 of the context serialised as canonical JSON (sorted keys, no whitespace).
+    """
+    payload = json.dumps(context, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class DiskTier:
+    """
+    SQLite-backed key/value store with TTL and least-recently-used eviction
+    down to `max_entries`. Eviction runs every `evict_every` writes.
+    """
+    def __init__(self, path: str, max_entries: int = 100_000, ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 evict_every: int = 256, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = evict_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS explanations ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS explanations_accessed ON explanations (accessed)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM explanations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl_seconds is not None and created + self.ttl_seconds <= now:
+                self._conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE explanations SET accessed = ? WHERE key = ?", (now, key))
+            return value
+
+    def put(self, key: str, value: str):
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM explanations WHERE key IN "
+                "(SELECT key FROM explanations ORDER BY accessed LIMIT ?)", (excess,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ExplanationCache:
+    """
+    Two-tier explanation cache: memory LRU (TTLCache) then optional disk.
+
+    Memory misses fall through to disk before calling the generator; new
+    explanations are written to both tiers. `serve_stale` returns expired
+    memory entries immediately while one background call refreshes them.
+    """
+    def __init__(self, max_entries: int = 4096, ttl_seconds: Optional[float] = 24 * 3600,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 100_000,
+                 serve_stale: bool = False):
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, serve_stale=serve_stale)
+        self.disk = DiskTier(disk_path, max_entries=disk_max_entries, ttl_seconds=ttl_seconds) if disk_path else None
+        self.disk_hits = 0
+        self.generated = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["generated"] = self.generated
+        return stats
+
+    def _from_disk(self, key: str) -> Optional[str]:
+        if self.disk is None:
+            return None
+        value = self.disk.get(key)
+        if value is not None:
+            self.disk_hits += 1
+        return value
+
+    def _store(self, key: str, value: str):
+        self.generated += 1
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def get_or_generate(self, context: Dict[str, Any], generate: Callable[[Dict[str, Any]], str]) -> str:
+        key = canonical_key(context)
+
+        def load():
+            value = self._from_disk(key)
+            if value is None:
+                value = generate(context)
+                self._store(key, value)
+            return value
+
+        return self.memory.get_or_load(key, load)
+
+    async def get_or_generate_async(self, context: Dict[str, Any],
+                                    generate: Callable[[Dict[str, Any]], Awaitable[str]]) -> str:
+        key = canonical_key(context)
+
+        async def load():
+            if self.disk is None:
+                value = await generate(context)
+                self._store(key, value)
+                return value
+            # SQLite calls block, so they run off the event loop
+            value = await asyncio.to_thread(self._from_disk, key)
+            if value is None:
+                value = await generate(context)
+                await asyncio.to_thread(self._store, key, value)
+            return value
+
+        return await self.memory.get_or_load_async(key, load)
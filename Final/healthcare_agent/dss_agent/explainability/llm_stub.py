@@ -4,3 +4,10 @@ def generate_explanation(context: dict) -> str:
     Passes context to an LLM to generate plain language explanation.
     """
     return "The patient is showing signs of instability (increasing NEWS2). Recommended actions prioritize safety while considering limited ICU availability."
+
+async def generate_explanation_async(context: dict) -> str:
+    """
+    Async variant used by the ASGI serving path.
+    A real client would await the model endpoint here.
+    """
+    return generate_explanation(context)
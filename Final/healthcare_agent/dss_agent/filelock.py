@@ -0,0 +1,36 @@
+"""
+Process-exclusive claims on snapshot paths and log directories.
+
+Several server workers pointed at the same snapshot file or WAL directory
+would overwrite each other's state, so each claims its path with a
+non-blocking exclusive flock held for as long as the process keeps the
+returned handle open. The lock is released automatically when the process
+exits, so a crashed worker never leaves a stale claim behind.
+"""
+import os
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, claims always succeed
+    fcntl = None
+
+def claim_exclusive(lock_path: str, what: str) -> IO:
+    """
+    Opens and locks `lock_path`, returning the open handle; close it to
+    release the claim. Raises RuntimeError when another process holds it.
+    `what` names the claimed resource in the error.
+    """
+    directory = os.path.dirname(lock_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle = open(lock_path, "a+")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"{what} is already in use by another process; "
+                           "give each worker process its own") from None
+    return handle
@@ -0,0 +1,52 @@
+from typing import List, Optional
+from ..models import PatientBeliefState
+from . import vitals_trends, delay_signals, treatment_response
+from .trend_engine import TrendEngine
+
+_UNSET = object()
+
+class StepSignals:
+    """
+    Perception signals for one agent step.
+    Each signal is computed on first access and reused for the rest of the
+    step, so a path that never reads a signal never pays for it.
+    """
+    __slots__ = ("_belief_state", "_engine", "_trends", "_delays", "_response")
+
+    def __init__(self, belief_state: PatientBeliefState, engine: Optional[TrendEngine] = None):
+        self._belief_state = belief_state
+        self._engine = engine
+        self._trends = _UNSET
+        self._delays = _UNSET
+        self._response = _UNSET
+
+    @property
+    def trends(self) -> dict:
+        if self._trends is _UNSET:
+            belief_state = self._belief_state
+            # Baseline before the earliest active intervention with a known start
+            started = min(belief_state.intervention_times.values(), default=None)
+            self._trends = vitals_trends.analyze_vital_trends(belief_state.history, belief_state.current_vitals,
+                                                              self._engine, started)
+        return self._trends
+
+    @property
+    def delays(self) -> dict:
+        if self._delays is _UNSET:
+            self._delays = delay_signals.check_delays(self._belief_state)
+        return self._delays
+
+    @property
+    def treatment_response(self) -> dict:
+        if self._response is _UNSET:
+            self._response = treatment_response.check_treatment_response(self._belief_state)
+        return self._response
+
+    def explanation_signals(self) -> List[str]:
+        """
+        Signal names that drive the counterfactual explanation.
+        """
+        signals = list(self.trends.get("trends", []))
+        if self.delays.get("overdue_review"):
+            signals.append("overdue_review")
+        return signals
@@ -1,26 +1,52 @@
-from ..models import PatientBeliefState
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+from ..history import HistoryView, VitalsHistory
+from ..models import PatientBeliefState, Vitals
+
+# Readings this long before an intervention started form its baseline
+BASELINE_WINDOW = timedelta(minutes=30)
+
+def pre_intervention_window(history: Sequence[Vitals], started: datetime) -> Optional[HistoryView]:
+    """
+    The readings taken in the BASELINE_WINDOW up to `started`, or None when
+    there are none (or `history` is a plain list).
+    """
+    if not isinstance(history, VitalsHistory):
+        return None
+    window = history.between(started - BASELINE_WINDOW, started)
+    return window if window else None
 
 def check_treatment_response(belief_state: PatientBeliefState) -> dict:
     """
     Checks if the patient is responding to active interventions.
+    When the intervention's start time is known, the current reading is
+    compared with the mean of its pre-intervention baseline; otherwise with
+    the previous reading.
     """
     signals = {
         "response_status": "unknown"
     }
-    
+
     # Example logic: if "fluid_bolus" in active_interventions and SBP improved, response is positive.
     # This is a stub for more complex logic.
-    
+
     if "fluid_bolus" in belief_state.active_interventions:
-        # Check history to see if SBP went up
-        if belief_state.history:
-            prev_sbp = belief_state.history[-1].sbp
-            curr_sbp = belief_state.current_vitals.sbp
-            if curr_sbp > prev_sbp + 5:
-                 signals["response_status"] = "responsive"
-            elif curr_sbp < prev_sbp:
-                 signals["response_status"] = "non_responsive"
-            else:
-                 signals["response_status"] = "no_significant_change"
-    
+        history = belief_state.history
+        started = belief_state.intervention_times.get("fluid_bolus")
+        baseline = None if started is None else pre_intervention_window(history, started)
+        if baseline is not None:
+            reference_sbp = baseline.aggregate("sbp").mean
+            signals["baseline_sbp"] = round(reference_sbp, 1)
+        elif history:
+            reference_sbp = history[-1].sbp
+        else:
+            return signals
+        curr_sbp = belief_state.current_vitals.sbp
+        if curr_sbp > reference_sbp + 5:
+             signals["response_status"] = "responsive"
+        elif curr_sbp < reference_sbp:
+             signals["response_status"] = "non_responsive"
+        else:
+             signals["response_status"] = "no_significant_change"
+
     return signals
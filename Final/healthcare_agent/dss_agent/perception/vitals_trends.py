@@ -1,10 +1,21 @@
-from typing import List, Tuple
-from ..models import PatientBeliefState, Vitals
+from datetime import datetime
+from typing import Optional, Sequence
+from ..models import Vitals
+from .trend_engine import TrendEngine
+from .treatment_response import pre_intervention_window
 
-def analyze_vital_trends(history: List[Vitals], current: Vitals) -> dict:
+def analyze_vital_trends(history: Sequence[Vitals], current: Vitals, engine: Optional[TrendEngine] = None,
+                         baseline_before: Optional[datetime] = None) -> dict:
     """
     Analyzes trends in vital signs to detect deterioration or instability.
     Returns a dictionary of trend signals.
+    `history` may be a list or a VitalsHistory; only the newest entry is read,
+    for single-sample changes. When the patient's TrendEngine is given, its
+    sustained trends (steady decline or rise over the window) are added.
+    With `baseline_before` (the start of an active intervention), the
+    current reading is also compared with the mean of the readings before
+    it, with the same thresholds, so a patient who keeps deteriorating
+    under treatment is flagged even when each step is small.
     """
     signals = {
         "stability": "stable",
@@ -32,4 +43,22 @@ def analyze_vital_trends(history: List[Vitals], current: Vitals) -> dict:
         signals["trends"].append("Significant SpO2 drop")
         signals["stability"] = "unstable"
 
+    baseline = None if baseline_before is None else pre_intervention_window(history, baseline_before)
+    if baseline is not None:
+        if current.sbp < baseline.aggregate("sbp").mean - 20:
+            signals["trends"].append("SBP below pre-intervention baseline")
+            signals["stability"] = "unstable"
+        if current.rr > baseline.aggregate("rr").mean + 5:
+            signals["trends"].append("RR above pre-intervention baseline")
+            signals["stability"] = "unstable"
+        if current.spo2 < baseline.aggregate("spo2").mean - 5:
+            signals["trends"].append("SpO2 below pre-intervention baseline")
+            signals["stability"] = "unstable"
+
+    if engine is not None:
+        sustained = engine.sustained_trends()
+        if sustained:
+            signals["trends"].extend(sustained)
+            signals["stability"] = "unstable"
+
     return signals
@@ -1,34 +1,238 @@
-from typing import Optional
-from ..models import PatientBeliefState, Recommendation, Cost
+"""
+Mandatory safety rules that override all other reasoning.
 
-def check_safety_rules(belief_state: PatientBeliefState) -> Optional[Recommendation]:
+Rules are declared as a table of single-field threshold checks and compiled
+into a SafetyRuleSet. Rules on the same field are folded into one guard, so
+a patient that triggers nothing costs one comparison per field however many
+rules the table has. Trigger text is only formatted for rules that fire.
+"""
+import operator
+from dataclasses import dataclass, fields
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from ..models import PatientBeliefState, Recommendation, Cost, Vitals
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda value, allowed: value in allowed,
+    "not in": lambda value, allowed: value not in allowed,
+}
+
+@dataclass(frozen=True)
+class SafetyRule:
+    """
+    Fires when `getattr(vitals, field) <op> threshold`.
+    `label` is used in the trigger text ("<label>=<value>").
+
+    A reading that lacks the field, or has it as None, cannot be shown to
+    be safe, so by default the rule fires ("<label>=None"). Set
+    `fire_if_missing` False for optional measurements, e.g. a lab value
+    that is only sometimes available.
+    """
+    field: str
+    op: str
+    threshold: Any
+    label: str
+    fire_if_missing: bool = True
+
+    def fires(self, value: Any) -> bool:
+        return _OPS[self.op](value, self.threshold)
+
+# The hospital-wide rules. Order is the order triggers are reported in.
+DEFAULT_RULES = (
+    SafetyRule("avpu", "!=", "A", "AVPU"),
+    SafetyRule("sbp", "<", 70, "SBP"),
+    SafetyRule("spo2", "<", 80, "SpO2"),
+    SafetyRule("rr", ">", 35, "RR"),
+    SafetyRule("news2", ">=", 9, "NEWS2"),
+)
+
+# A fired rule: (position in the table, rule, observed value)
+Trigger = Tuple[int, SafetyRule, Any]
+
+class _FieldGuard:
+    """
+    Exact "does any rule on this field fire" test, folded from all of the
+    field's rules into at most one lower bound, one upper bound and two
+    value sets.
+    """
+    __slots__ = ("field", "rules", "missing", "low", "low_inclusive", "high", "high_inclusive", "hit_values",
+                 "safe_values")
+
+    def __init__(self, field: str, rules: List[Tuple[int, SafetyRule]]):
+        self.field = field
+        self.rules = rules
+        # Rules that fire when the value is missing
+        self.missing = [(index, rule) for index, rule in rules if rule.fire_if_missing]
+        self.low = self.high = None
+        self.low_inclusive = self.high_inclusive = False
+        hit_values = set()
+        safe_values: Optional[FrozenSet] = None
+        for _, rule in rules:
+            op, t = rule.op, rule.threshold
+            if op in ("<", "<="):
+                inclusive = op == "<="
+                if self.low is None or t > self.low or (t == self.low and inclusive):
+                    self.low, self.low_inclusive = t, inclusive
+            elif op in (">", ">="):
+                inclusive = op == ">="
+                if self.high is None or t < self.high or (t == self.high and inclusive):
+                    self.high, self.high_inclusive = t, inclusive
+            elif op in ("==", "in"):
+                hit_values.update([t] if op == "==" else t)
+            else:
+                # "!=" / "not in": fires unless the value is allowed by every such rule
+                allowed = frozenset([t] if op == "!=" else t)
+                safe_values = allowed if safe_values is None else safe_values & allowed
+        self.hit_values = frozenset(hit_values)
+        self.safe_values = safe_values
+
+    def fires(self, value: Any) -> bool:
+        low = self.low
+        if low is not None and (value < low or (self.low_inclusive and value == low)):
+            return True
+        high = self.high
+        if high is not None and (value > high or (self.high_inclusive and value == high)):
+            return True
+        if value in self.hit_values:
+            return True
+        return self.safe_values is not None and value not in self.safe_values
+
+    def hits(self, column: Sequence[Any]) -> List[int]:
+        """
+        Indices of a column of values for which some rule on this field fires.
+        Each folded bound is one comprehension over the whole column.
+        """
+        present = [(i, value) for i, value in enumerate(column) if value is not None]
+        found = set()
+        low, high = self.low, self.high
+        if low is not None:
+            if self.low_inclusive:
+                found.update(i for i, value in present if value <= low)
+            else:
+                found.update(i for i, value in present if value < low)
+        if high is not None:
+            if self.high_inclusive:
+                found.update(i for i, value in present if value >= high)
+            else:
+                found.update(i for i, value in present if value > high)
+        if self.hit_values:
+            hit_values = self.hit_values
+            found.update(i for i, value in present if value in hit_values)
+        if self.safe_values is not None:
+            safe_values = self.safe_values
+            found.update(i for i, value in present if value not in safe_values)
+        return sorted(found)
+
+class SafetyRuleSet:
+    """
+    A compiled safety rule table.
+    """
+    def __init__(self, rules: Iterable[SafetyRule] = DEFAULT_RULES):
+        self.rules = tuple(rules)
+        by_field: Dict[str, List[Tuple[int, SafetyRule]]] = {}
+        for index, rule in enumerate(self.rules):
+            if rule.op not in _OPS:
+                raise ValueError(f"Safety rule {rule.label}: unknown operator {rule.op!r}")
+            if rule.op in ("in", "not in") and isinstance(rule.threshold, str):
+                raise ValueError(f"Safety rule {rule.label}: '{rule.op}' needs a collection of values")
+            by_field.setdefault(rule.field, []).append((index, rule))
+        self._guards = tuple(_FieldGuard(field, rules) for field, rules in by_field.items())
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]],
+                   known_fields: Optional[Iterable[str]] = None) -> "SafetyRuleSet":
+        """
+        Builds a rule set from config rows such as
+        {"field": "hr", "op": ">=", "threshold": 140, "label": "HR"}
+        (optionally with "fire_if_missing": false).
+
+        Fields must be in `known_fields` (default: the Vitals fields), so a
+        typo such as "heart_rate" raises ValueError instead of silently
+        disabling the rule. Pass the field names of an extended vitals type
+        to allow others.
+        """
+        known = frozenset(f.name for f in fields(Vitals)) if known_fields is None else frozenset(known_fields)
+        rules = []
+        for row in rows:
+            if row["field"] not in known:
+                raise ValueError(f"Safety rule {row.get('label', row['field'])}: unknown field {row['field']!r} "
+                                 f"(known: {', '.join(sorted(known))})")
+            threshold = row["threshold"]
+            if isinstance(threshold, list):
+                threshold = tuple(threshold)
+            rules.append(SafetyRule(row["field"], row["op"], threshold, row.get("label", row["field"]),
+                                    bool(row.get("fire_if_missing", True))))
+        return cls(rules)
+
+    def check(self, vitals: Vitals) -> List[Trigger]:
+        """
+        Returns the rules that fire for one reading, in table order.
+        """
+        triggers = []
+        for guard in self._guards:
+            value = getattr(vitals, guard.field, None)
+            if value is None:
+                triggers.extend((index, rule, None) for index, rule in guard.missing)
+            elif guard.fires(value):
+                triggers.extend((index, rule, value) for index, rule in guard.rules if rule.fires(value))
+        if len(triggers) > 1:
+            triggers.sort(key=lambda trigger: trigger[0])
+        return triggers
+
+    def check_batch(self, vitals_list: Sequence[Vitals]) -> List[List[Trigger]]:
+        """
+        check() for many readings, evaluated field by field over columns.
+        """
+        results: List[List[Trigger]] = [[] for _ in vitals_list]
+        for guard in self._guards:
+            field = guard.field
+            column = [getattr(vitals, field, None) for vitals in vitals_list]
+            if guard.missing:
+                for i, value in enumerate(column):
+                    if value is None:
+                        results[i].extend((index, rule, None) for index, rule in guard.missing)
+            for i in guard.hits(column):
+                value = column[i]
+                results[i].extend((index, rule, value) for index, rule in guard.rules if rule.fires(value))
+        for triggers in results:
+            if len(triggers) > 1:
+                triggers.sort(key=lambda trigger: trigger[0])
+        return results
+
+def emergent_recommendation(triggers: List[Trigger]) -> Recommendation:
+    """
+    Builds the "Call RRT" recommendation for a non-empty list of triggers.
+    """
+    text = ", ".join(f"{rule.label}={value}" for _, rule, value in triggers)
+    return Recommendation(
+        action="Call RRT",
+        rationale=f"Patient meets critical safety criteria: {text}. Immediate RRT response required.",
+        expected_benefit="High",
+        cost=Cost(level="Medium", explanation="RRT team mobilization"),
+        confidence=0.95,
+        emergent=True,
+        rank=1
+    )
+
+DEFAULT_RULESET = SafetyRuleSet()
+
+def check_safety_rules(belief_state: PatientBeliefState, rules: SafetyRuleSet = DEFAULT_RULESET) -> Optional[Recommendation]:
     """
     Checks mandatory safety rules that override all other reasoning.
     Returns an emergent Recommendation if a rule is triggered, else None.
     """
-    vitals = belief_state.current_vitals
-    
-    triggers = []
-    if vitals.avpu != "A":
-        triggers.append(f"AVPU={vitals.avpu}")
-    if vitals.sbp < 70:
-        triggers.append(f"SBP={vitals.sbp}")
-    if vitals.spo2 < 80:
-        triggers.append(f"SpO2={vitals.spo2}")
-    if vitals.rr > 35:
-        triggers.append(f"RR={vitals.rr}")
-    if vitals.news2 >= 9:
-        triggers.append(f"NEWS2={vitals.news2}")
-        
-    if triggers:
-        return Recommendation(
-            action="Call RRT",
-            rationale=f"Patient meets critical safety criteria: {', '.join(triggers)}. Immediate RRT response required.",
-            expected_benefit="High",
-            cost=Cost(level="Medium", explanation="RRT team mobilization"),
-            confidence=0.95,
-            emergent=True,
-            rank=1
-        )
-        
-    return None
+    triggers = rules.check(belief_state.current_vitals)
+    return emergent_recommendation(triggers) if triggers else None
+
+def check_safety_rules_batch(belief_states: Sequence[PatientBeliefState],
+                             rules: SafetyRuleSet = DEFAULT_RULESET) -> List[Optional[Recommendation]]:
+    """
+    check_safety_rules for a whole census at once.
+    """
+    results = rules.check_batch([belief_state.current_vitals for belief_state in belief_states])
+    return [emergent_recommendation(triggers) if triggers else None for triggers in results]
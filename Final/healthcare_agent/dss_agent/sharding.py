@@ -0,0 +1,271 @@
+"""
+Multi-process ward evaluation.
+
+Patients are consistently hashed to worker processes. Each worker owns a
+WardAgent, and with it the WorldModels of its patients; the coordinator only
+routes readings, broadcasts ResourceState updates and gathers results.
+Readings cross the process boundary as plain tuples (timestamps at
+millisecond resolution, as in CompactVitals), and each worker sends back
+one message per batch: the results plus any patients whose reading failed,
+so one bad reading does not cost the rest of its shard their results.
+
+A crashed worker is restarted empty and its share of the batch is re-run
+there, so its patients still get a recommendation (safety rules need only
+the current reading). Other shards keep their state.
+"""
+import bisect
+import hashlib
+import multiprocessing
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from .agent import WardAgent
+from .catalog import ActionCatalog, as_catalog
+from .models import Vitals, CompactVitals, ResourceState, to_epoch_ms, from_epoch_ms
+from .reasoning.safety import SafetyRule, SafetyRuleSet
+
+def _stable_hash(key: str) -> int:
+    # Python's hash() is salted per process; shard placement must not be
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class ShardRing:
+    """
+    Consistent-hash ring with `replicas` virtual nodes per shard, so adding
+    or removing a shard moves only about 1/n of the patients.
+    """
+    def __init__(self, n_shards: int, replicas: int = 64):
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        self.n_shards = n_shards
+        points = sorted((_stable_hash(f"shard-{shard}-{r}"), shard) for shard in range(n_shards) for r in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, patient_id: str) -> int:
+        i = bisect.bisect(self._hashes, _stable_hash(patient_id))
+        return self._shards[i % len(self._shards)]
+
+def _encode(patient_id: str, vitals: Union[Vitals, CompactVitals]) -> tuple:
+    ts = vitals.timestamp_ms if isinstance(vitals, CompactVitals) else to_epoch_ms(vitals.timestamp)
+    return (patient_id, vitals.avpu, vitals.sbp, vitals.spo2, vitals.rr, vitals.hr, vitals.temp, vitals.news2, ts)
+
+def _decode(row: tuple) -> Tuple[str, Vitals]:
+    patient_id, avpu, sbp, spo2, rr, hr, temp, news2, ts = row
+    return patient_id, Vitals(avpu=avpu, sbp=sbp, spo2=spo2, rr=rr, hr=hr, temp=temp, news2=news2,
+                              timestamp=from_epoch_ms(ts))
+
+def _worker_main(conn, action_rows: Optional[List[dict]], rule_rows: Optional[Tuple[SafetyRule, ...]]):
+    """
+    Worker loop. Messages: ("resources", ResourceState), ("batch", rows),
+    ("census", None), ("discharge", patient_id), ("stop", None). Batches are
+    answered with ("ok", results, failed), where `failed` maps patient_id to
+    the error for readings that failed on their own, or ("error", message)
+    when the whole batch could not run.
+    """
+    ward = WardAgent(possible_actions=action_rows,
+                     safety_rules=SafetyRuleSet(rule_rows) if rule_rows is not None else None)
+    resource_state = None
+    while True:
+        try:
+            kind, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if kind == "resources":
+            resource_state = payload
+        elif kind == "batch":
+            try:
+                if resource_state is None:
+                    raise ValueError("no ResourceState broadcast yet")
+                readings, undecodable = [], {}
+                for row in payload:
+                    try:
+                        readings.append(_decode(row))
+                    except Exception as e:
+                        undecodable[row[0]] = f"{type(e).__name__}: {e}"
+                results = ward.run_batch(readings, resource_state)
+                conn.send(("ok", results, {**undecodable, **ward.failed_patients}))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+        elif kind == "census":
+            conn.send(sorted(ward.agents))
+        elif kind == "discharge":
+            ward.discharge(payload)
+        elif kind == "stop":
+            return
+
+class _Shard:
+    __slots__ = ("index", "process", "conn", "restarts")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+
+class ShardedWard:
+    """
+    Runs WardAgent.run_batch across `n_workers` processes.
+
+    Results per patient are the same as a single WardAgent would return.
+    Use as a context manager, or call close() to stop the workers.
+    """
+    def __init__(self, n_workers: Optional[int] = None,
+                 possible_actions: Union[ActionCatalog, List[dict], None] = None,
+                 safety_rules: Optional[SafetyRuleSet] = None,
+                 start_method: Optional[str] = None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.ring = ShardRing(self.n_workers)
+        self._ctx = multiprocessing.get_context(start_method)
+        # Workers get plain rows and rebuild the catalog and rule set, so this
+        # works with spawn as well as fork. None keeps each worker's defaults.
+        self._worker_args = (
+            None if possible_actions is None else [dict(action) for action in as_catalog(possible_actions)],
+            None if safety_rules is None else safety_rules.rules,
+        )
+        self.resource_state: Optional[ResourceState] = None
+        # Patients without a result in the last run_batch, with the error:
+        # their own reading failed, or their shard failed twice
+        self.failed_patients: Dict[str, str] = {}
+        self._shards = [_Shard(i) for i in range(self.n_workers)]
+        for shard in self._shards:
+            self._start(shard)
+
+    def _start(self, shard: _Shard):
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child,) + self._worker_args,
+                                    name=f"ward-shard-{shard.index}", daemon=True)
+        process.start()
+        child.close()
+        shard.process, shard.conn = process, parent
+        if self.resource_state is not None:
+            parent.send(("resources", self.resource_state))
+
+    def _restart(self, shard: _Shard):
+        shard.conn.close()
+        shard.process.join(timeout=1)
+        if shard.process.is_alive():
+            shard.process.terminate()
+            shard.process.join()
+        print(f"Ward shard {shard.index} died (exit code {shard.process.exitcode}); restarting it empty")
+        shard.restarts += 1
+        self._start(shard)
+
+    def __enter__(self) -> "ShardedWard":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for shard in self._shards:
+            try:
+                shard.conn.send(("stop", None))
+            except (OSError, ValueError):
+                pass
+        for shard in self._shards:
+            shard.process.join(timeout=5)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            shard.conn.close()
+
+    @property
+    def restarts(self) -> List[int]:
+        return [shard.restarts for shard in self._shards]
+
+    def shard_for(self, patient_id: str) -> int:
+        return self.ring.shard_for(patient_id)
+
+    def census(self) -> Dict[int, List[str]]:
+        """
+        Patient IDs currently held by each shard.
+        """
+        census = {}
+        for shard in self._shards:
+            try:
+                shard.conn.send(("census", None))
+                census[shard.index] = shard.conn.recv()
+            except (EOFError, OSError, ValueError):
+                self._restart(shard)
+                census[shard.index] = []
+        return census
+
+    def update_resources(self, resource_state: ResourceState):
+        """
+        Broadcasts a ResourceState to every worker.
+        """
+        self.resource_state = resource_state
+        for shard in self._shards:
+            self._send(shard, ("resources", resource_state))
+
+    def discharge(self, patient_id: str):
+        self._send(self._shards[self.shard_for(patient_id)], ("discharge", patient_id))
+
+    def _send(self, shard: _Shard, message) -> bool:
+        try:
+            shard.conn.send(message)
+            return True
+        except (OSError, ValueError):
+            self._restart(shard)
+            return False
+
+    def _exchange(self, shard: _Shard, rows: List[tuple]):
+        """
+        Sends one batch and waits for the reply. Returns the reply or None if the worker died.
+        """
+        try:
+            shard.conn.send(("batch", rows))
+            return shard.conn.recv()
+        except (EOFError, OSError, ValueError):
+            return None
+
+    def run_batch(self, vitals_list: Iterable[Tuple[str, Union[Vitals, CompactVitals]]],
+                  resource_state: Optional[ResourceState] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Runs one step for every (patient_id, vitals) pair, in parallel
+        across shards. A ResourceState given here is broadcast first.
+        Patients left without a result are listed in `failed_patients`.
+        """
+        if resource_state is not None and resource_state != self.resource_state:
+            self.update_resources(resource_state)
+        if self.resource_state is None:
+            raise ValueError("No ResourceState: pass one or call update_resources first")
+
+        parts: List[List[tuple]] = [[] for _ in self._shards]
+        seen = set()
+        for patient_id, vitals in vitals_list:
+            if patient_id in seen:
+                raise ValueError(f"Patient {patient_id} appears more than once in the batch")
+            seen.add(patient_id)
+            parts[self.shard_for(patient_id)].append(_encode(patient_id, vitals))
+
+        # Send every shard its part before waiting on any of them
+        sent = []
+        for shard, rows in zip(self._shards, parts):
+            if not rows:
+                continue
+            try:
+                shard.conn.send(("batch", rows))
+                sent.append((shard, rows, True))
+            except (OSError, ValueError):
+                sent.append((shard, rows, False))
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        self.failed_patients = {}
+        for shard, rows, delivered in sent:
+            reply = None
+            if delivered:
+                try:
+                    reply = shard.conn.recv()
+                except (EOFError, OSError):
+                    reply = None
+            if reply is None:
+                # Worker died: restart it and re-run its part once
+                self._restart(shard)
+                reply = self._exchange(shard, rows)
+            if reply is None or reply[0] != "ok":
+                detail = reply[1] if reply else "worker died again"
+                print(f"Ward shard {shard.index} failed its batch: {detail}")
+                self.failed_patients.update((row[0], detail) for row in rows)
+                continue
+            results.update(reply[1])
+            self.failed_patients.update(reply[2])
+        return results
@@ -0,0 +1,138 @@
+"""
+Load test for /api/agent/run: sync Flask path versus the ASGI path.
+
+The explainability stubs are replaced with versions that sleep for
+--latency-ms to simulate remote knowledge/LLM calls. Both apps are driven
+in-process, so the numbers isolate the serving model from network overhead:
+- sync: --workers threads, one request at a time each (gunicorn sync workers)
+- async: one event loop with --concurrency requests in flight
+
+Run from the Final directory:
+    python loadtest.py --requests 2000 --latency-ms 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import app as sync_app
+import asgi as async_app
+
+def _payload(i: int) -> bytes:
+    return json.dumps({
+        "patient_id": f"LOAD-{i % 500}",
+        "vitals": {"avpu": "A", "sbp": 110, "spo2": 94, "rr": 20 + i % 5, "news2": 4 + i % 4},
+        "resources": {"icu_beds_available": 1, "nurse_load": 0.6, "rrt_available": True}
+    }).encode("utf-8")
+
+def _install_latency(latency_s: float):
+    doc = "WHO/Athena Guidelines: simulated."
+    explanation = "Simulated explanation."
+
+    def slow_guidelines(query):
+        time.sleep(latency_s)
+        return doc
+
+    def slow_explanation(context):
+        time.sleep(latency_s)
+        return explanation
+
+    async def slow_guidelines_async(query):
+        await asyncio.sleep(latency_s)
+        return doc
+
+    async def slow_explanation_async(context):
+        await asyncio.sleep(latency_s)
+        return explanation
+
+    sync_app.fetch_athena_guidelines = slow_guidelines
+    sync_app.generate_explanation = slow_explanation
+    async_app.fetch_athena_guidelines_async = slow_guidelines_async
+    async_app.generate_explanation_async = slow_explanation_async
+
+def _report(name: str, latencies, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:<8} {len(latencies):>8} {len(latencies) / elapsed:>10.1f} {p50:>10.1f} {p99:>10.1f}")
+
+def run_sync(total: int, workers: int):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        client = sync_app.app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            response = client.post("/api/agent/run", data=_payload(i), content_type="application/json")
+            assert response.status_code == 200, response.data
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _report("sync", latencies, time.perf_counter() - start)
+
+async def _asgi_request(body: bytes):
+    sent = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/agent/run", "headers": []}
+    await async_app.app(scope, receive, send)
+    assert sent[0]["status"] == 200, sent
+
+async def run_async(total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await _asgi_request(_payload(i))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    _report("async", latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--workers", type=int, default=4, help="sync workers")
+    parser.add_argument("--concurrency", type=int, default=1000, help="async in-flight requests")
+    parser.add_argument("--no-cache", action="store_true", help="expire guideline/explanation caches immediately")
+    args = parser.parse_args()
+
+    _install_latency(args.latency_ms / 1000.0)
+    if args.no_cache:
+        sync_app.guideline_cache.ttl_seconds = 0
+        sync_app.explanation_cache.memory.ttl_seconds = 0
+    print(f"simulated backend latency: {args.latency_ms:.0f} ms per call")
+    print(f"{'path':<8} {'requests':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    run_sync(min(args.requests, args.workers * 25), args.workers)
+    asyncio.run(run_async(args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
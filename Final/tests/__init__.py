@@ -0,0 +1 @@
+# Tests package
\ No newline at end of file
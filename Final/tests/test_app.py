@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import app as server
+
+VITALS = {"avpu": "A", "sbp": 110, "spo2": 95, "rr": 22, "news2": 4}
+RESOURCES = {"icu_beds_available": 1, "nurse_load": 0.5, "rrt_available": True}
+
+@pytest.fixture
+def client():
+    server.agent_registry.clear()
+    return server.app.test_client()
+
+def test_requests_without_patient_id_do_not_share_an_agent(client):
+    for _ in range(3):
+        res = client.post("/api/agent/run", json={"vitals": VITALS, "resources": RESOURCES})
+        assert res.status_code == 200
+        assert res.get_json()["status"] == "success"
+    assert len(server.agent_registry) == 0
+
+def test_patient_id_keeps_state_across_requests(client):
+    body = {"patient_id": "TAB-1", "vitals": VITALS, "resources": RESOURCES}
+    assert client.post("/api/agent/run", json=body).status_code == 200
+    assert client.post("/api/agent/run", json=body).status_code == 200
+    assert "TAB-1" in server.agent_registry
+
+def test_only_named_patients_are_written_to_the_wal(client, monkeypatch):
+    logged = []
+
+    class RecordingWal:
+        def append(self, patient_id, *args, **kwargs):
+            logged.append(patient_id)
+
+    monkeypatch.setattr(server, "agent_wal", RecordingWal())
+    monkeypatch.setattr(server.agent_registry, "wal", server.agent_wal)
+    assert client.post("/api/agent/run", json={"vitals": VITALS, "resources": RESOURCES}).status_code == 200
+    body = {"patient_id": "TAB-4", "vitals": VITALS, "resources": RESOURCES}
+    assert client.post("/api/agent/run", json=body).status_code == 200
+    assert logged == ["TAB-4"]
+
+@pytest.mark.parametrize("body", [
+    None,
+    [1, 2],
+    {"vitals": {"sbp": "high"}},
+    {"vitals": {"avpu": "Z"}},
+    {"vitals": VITALS, "resources": {"nurse_load": None}},
+    {"patient_id": "", "vitals": VITALS},
+    {"patient_id": "x" * 200, "vitals": VITALS},
+])
+def test_malformed_requests_are_rejected(client, body):
+    res = client.post("/api/agent/run", data=json.dumps(body), content_type="application/json")
+    assert res.status_code == 400
+    assert res.get_json()["status"] == "error"
+
+def test_bad_request_does_not_break_the_patient(client):
+    body = {"patient_id": "TAB-2", "vitals": VITALS, "resources": RESOURCES}
+    assert client.post("/api/agent/run", json=body).status_code == 200
+    bad = dict(body, vitals=dict(VITALS, avpu="?"))
+    assert client.post("/api/agent/run", json=bad).status_code == 400
+    assert client.post("/api/agent/run", json=body).status_code == 200
+
+def test_asgi_path_rejects_malformed_requests():
+    asgi = pytest.importorskip("asgi")
+    status, payload = asyncio.run(asgi.run_agent(b"{not json"))
+    assert status == 400 and payload["status"] == "error"
+    status, payload = asyncio.run(asgi.run_agent(json.dumps({"vitals": {"avpu": "Z"}}).encode()))
+    assert status == 400
+
+def test_asgi_path_runs_without_patient_id():
+    asgi = pytest.importorskip("asgi")
+    server.agent_registry.clear()
+    status, payload = asyncio.run(asgi.run_agent(json.dumps({"vitals": VITALS, "resources": RESOURCES}).encode()))
+    assert status == 200
+    assert json.loads(payload)["status"] == "success"
+    assert len(server.agent_registry) == 0
+
+def test_curve_sweep_is_bounded(client):
+    res = client.post("/api/counterfactual/curve", json={"news2": 5, "max_delay": 240, "step": 15})
+    assert res.status_code == 200
+    assert len(res.get_json()["delays"]) == 17
+    for body in ({"max_delay": -15}, {"max_delay": 100000}, {"step": 0}, {"step": -5},
+                 {"max_delay": 1440, "step": 1}):
+        res = client.post("/api/counterfactual/curve", json=dict(body, news2=5))
+        assert res.status_code == 400
+        assert res.get_json()["status"] == "error"
+
+def test_what_if_is_bounded_and_read_only(client):
+    assert client.post("/api/agent/run", json={"patient_id": "TAB-3", "vitals": VITALS, "resources": RESOURCES}).status_code == 200
+    res = client.post("/api/counterfactual/what_if", json={"patient_ids": ["TAB-3", "NOPE"], "delays": [0, 60]})
+    assert res.status_code == 200
+    payload = res.get_json()
+    assert payload["patient_ids"] == ["TAB-3"] and payload["unknown_patient_ids"] == ["NOPE"]
+    assert "NOPE" not in server.agent_registry
+    for body in ({"delays": list(range(server.MAX_WHAT_IF_DELAYS + 1))}, {"delays": [100000]},
+                 {"patient_ids": ["P"] * (server.MAX_WHAT_IF_PATIENTS + 1)}):
+        res = client.post("/api/counterfactual/what_if", json=body)
+        assert res.status_code == 400
+        assert res.get_json()["status"] == "error"
+
+SLOW_SECONDS = 2.0
+TIMEOUT_SECONDS = 0.3
+
+@pytest.fixture
+def slow_backends(monkeypatch):
+    def slow_guidelines(query):
+        time.sleep(SLOW_SECONDS)
+        return "late guidelines"
+
+    def slow_explanation(context):
+        time.sleep(SLOW_SECONDS)
+        return "late explanation"
+
+    monkeypatch.setattr(server, "ENRICHMENT_TIMEOUT_SECONDS", TIMEOUT_SECONDS)
+    monkeypatch.setattr(server, "fetch_athena_guidelines", slow_guidelines)
+    monkeypatch.setattr(server, "generate_explanation", slow_explanation)
+    server.guideline_cache.invalidate()
+    server.explanation_cache.memory.invalidate()
+    yield
+    server.guideline_cache.invalidate()
+    server.explanation_cache.memory.invalidate()
+
+def _assert_fallback(payload):
+    assert payload["status"] == "success"
+    assert payload["enrichment_degraded"] is True
+    for rec in payload["recommendations"]:
+        assert rec["documentation"] == server.DOCUMENTATION_UNAVAILABLE
+        assert rec["explanation"] == rec["rationale"]
+
+def test_slow_enrichment_degrades_within_one_timeout(client, slow_backends):
+    start = time.monotonic()
+    res = client.post("/api/agent/run", json={"vitals": VITALS, "resources": RESOURCES})
+    elapsed = time.monotonic() - start
+    assert res.status_code == 200
+    _assert_fallback(res.get_json())
+    # Documentation and explanation share the deadline: not one timeout each
+    assert elapsed < 1.6 * TIMEOUT_SECONDS
+
+def test_asgi_slow_enrichment_degrades_within_one_timeout(monkeypatch, slow_backends):
+    asgi = pytest.importorskip("asgi")
+
+    async def slow_guidelines(query):
+        await asyncio.sleep(SLOW_SECONDS)
+        return "late guidelines"
+
+    async def slow_explanation(context):
+        await asyncio.sleep(SLOW_SECONDS)
+        return "late explanation"
+
+    monkeypatch.setattr(asgi, "ENRICHMENT_TIMEOUT_SECONDS", TIMEOUT_SECONDS)
+    monkeypatch.setattr(asgi, "fetch_athena_guidelines_async", slow_guidelines)
+    monkeypatch.setattr(asgi, "generate_explanation_async", slow_explanation)
+    start = time.monotonic()
+    status, payload = asyncio.run(asgi.run_agent(json.dumps({"vitals": VITALS, "resources": RESOURCES}).encode()))
+    elapsed = time.monotonic() - start
+    assert status == 200
+    _assert_fallback(json.loads(payload))
+    assert elapsed < 1.6 * TIMEOUT_SECONDS
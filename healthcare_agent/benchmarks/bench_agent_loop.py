@@ -0,0 +1,164 @@
+"""
+End-to-end throughput of the agent loop on a replayed multi-patient stream.
+
+Drives one EscalationAgent per patient through every reading in order and
+reports steps/sec, emergent versus routine steps, per-stage latency
+histograms (world model, perception, safety, scoring, counterfactual,
+narrative, serialization; time per step in each), whole-step latency and
+peak memory. Steps run through run_step_encoded, as the server's do, so
+the step includes JSON-encoding its output (the serialization stage).
+Stage latencies come from an AgentMetrics attached to every agent and
+timing every step, so they use the same stage boundaries as the server's
+/metrics. Timing every step costs up to about 10% of throughput; use
+--no-stages for a clean steps/sec figure.
+
+The report is JSON with a fixed schema ("dss-agent-bench/1"), so runs can be
+stored and compared across releases:
+    python -m benchmarks.bench_agent_loop --output report.json
+    python -m benchmarks.bench_agent_loop --compare report.json --max-regression 0.1
+
+Sources: synthetic (default, deterministic for a given --seed),
+jsonl:<feed file in the ingest format> or wal:<write-ahead log directory>.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_agent_loop [--patients 2000] [--hours 48] [--interval 15]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from dss_agent.agent import EscalationAgent
+from benchmarks.harness import STAGES, LatencyHistogram, open_source, peak_rss_mb, stage_metrics, stage_summary
+
+# Version 2: stages measured by AgentMetrics
+SCHEMA = "dss-agent-bench/2"
+
+def run(source, stage_timing: bool = True, trace_memory: bool = False) -> dict:
+    agents = {}
+    resources = None
+    steps = emergent = 0
+    step_histogram = LatencyHistogram()
+    metrics = stage_metrics() if stage_timing else None
+    clock = time.perf_counter_ns
+
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for kind, payload in source:
+            if kind == "resources":
+                resources = payload
+                continue
+            patient_id, vitals = payload
+            agent = agents.get(patient_id)
+            if agent is None:
+                agent = agents[patient_id] = EscalationAgent(patient_id, metrics=metrics)
+            step_start = clock()
+            step = agent.run_step_encoded(vitals, resources)
+            step_histogram.record(clock() - step_start)
+            steps += 1
+            if step.recommendations[0].emergent:
+                emergent += 1
+    finally:
+        elapsed = time.perf_counter() - start
+    traced_peak = None
+    if trace_memory:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        tracemalloc.stop()
+
+    return {
+        "steps": steps,
+        "patients": len(agents),
+        "elapsed_seconds": round(elapsed, 3),
+        "steps_per_second": round(steps / elapsed, 1) if elapsed else 0.0,
+        "paths": {"emergent": emergent, "routine": steps - emergent},
+        "step": step_histogram.summary(),
+        "stages": stage_summary(metrics) if stage_timing else {},
+        "peak_rss_mb": peak_rss_mb(),
+        "tracemalloc_peak_mb": traced_peak,
+    }
+
+def print_report(report: dict):
+    results = report["results"]
+    print(f"{results['steps']} steps, {results['patients']} patients, {results['elapsed_seconds']} s "
+          f"-> {results['steps_per_second']:.0f} steps/s "
+          f"(emergent {results['paths']['emergent']}, routine {results['paths']['routine']})")
+    print(f"peak RSS {results['peak_rss_mb']} MB" +
+          (f", traced peak {results['tracemalloc_peak_mb']} MB" if results["tracemalloc_peak_mb"] is not None else ""))
+    print(f"{'stage':<15} {'steps':>9} {'total s':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'max us':>10}")
+    rows = [(stage, results["stages"][stage]) for stage in STAGES if stage in results["stages"]]
+    rows.append(("step", results["step"]))
+    for name, s in rows:
+        print(f"{name:<15} {s['count']:>9} {s['total_seconds']:>9.3f} {s['mean_us']:>9.1f} {s['p50_us']:>9.1f} "
+              f"{s['p99_us']:>9.1f} {s['p999_us']:>9.1f} {s['max_us']:>10.1f}")
+
+def compare(report: dict, baseline: dict, max_regression: float) -> bool:
+    """
+    Prints throughput and per-stage p99 against a baseline report.
+    Returns False if throughput dropped by more than `max_regression`.
+    """
+    if baseline.get("schema") != SCHEMA:
+        raise ValueError(f"Baseline schema {baseline.get('schema')!r} is not {SCHEMA}")
+    new, old = report["results"], baseline["results"]
+    ratio = new["steps_per_second"] / old["steps_per_second"] if old["steps_per_second"] else 1.0
+    print(f"\nsteps/s {old['steps_per_second']:.0f} -> {new['steps_per_second']:.0f} ({ratio - 1:+.1%})")
+    for stage in STAGES:
+        if stage in new["stages"] and stage in old["stages"] and old["stages"][stage]["p99_us"]:
+            before, after = old["stages"][stage]["p99_us"], new["stages"][stage]["p99_us"]
+            print(f"  {stage:<15} p99 {before:>8.1f} -> {after:>8.1f} us ({after / before - 1:+.1%})")
+    return ratio >= 1.0 - max_regression
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="synthetic", help="synthetic, jsonl:<path> or wal:<dir>")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--hours", type=int, default=48)
+    parser.add_argument("--interval", type=int, default=15, help="minutes between readings")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-stages", action="store_true", help="skip per-stage timing (pure throughput)")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace Python heap peak (slow)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="fail --compare if steps/s drops by more than this fraction")
+    args = parser.parse_args()
+
+    source = open_source(args.source, args.patients, args.hours, args.interval, args.seed)
+    report = {
+        "schema": SCHEMA,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "source": args.source,
+            "patients": args.patients,
+            "hours": args.hours,
+            "interval_minutes": args.interval,
+            "seed": args.seed,
+            "stage_timing": not args.no_stages,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": run(source, stage_timing=not args.no_stages, trace_memory=args.tracemalloc),
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(report, json.load(f), args.max_regression):
+                print(f"Throughput regressed by more than {args.max_regression:.0%}")
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
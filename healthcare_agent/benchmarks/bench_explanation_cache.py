@@ -0,0 +1,52 @@
+"""
+Explanation cache hit rate on a replayed day of ward traffic.
+
+Drives WardAgent over a synthetic 24h stream and requests an explanation
+for every returned recommendation, the way the Flask app does. The stub
+generator counts backend calls.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_explanation_cache [--beds 300] [--interval 15]
+"""
+import argparse
+import time
+from dss_agent.agent import WardAgent
+from dss_agent.explainability.athena_stub import fetch_athena_guidelines
+from dss_agent.explainability.explanation_cache import ExplanationCache, explanation_context
+from dss_agent.explainability.llm_stub import generate_explanation
+from benchmarks.synthetic import make_day_stream, default_resources
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--beds", type=int, default=300)
+    parser.add_argument("--interval", type=int, default=15, help="minutes between readings")
+    args = parser.parse_args()
+
+    ticks = make_day_stream(args.beds, hours=24, interval_minutes=args.interval)
+    ward = WardAgent()
+    cache = ExplanationCache()
+    resources = default_resources()
+    backend_calls = 0
+
+    def generate(context):
+        nonlocal backend_calls
+        backend_calls += 1
+        return generate_explanation(context)
+
+    lookups = 0
+    start = time.perf_counter()
+    for batch in ticks:
+        for recs in ward.run_batch(batch, resources).values():
+            for rec in recs:
+                docs = [fetch_athena_guidelines(rec["action"])]
+                cache.get_or_generate(explanation_context(rec, docs), generate)
+                lookups += 1
+    elapsed = time.perf_counter() - start
+
+    stats = cache.stats()
+    print(f"beds={args.beds} readings/bed={len(ticks)} explanation lookups={lookups:,}")
+    print(f"backend calls={backend_calls:,} hit rate={stats['hit_rate']:.1%} distinct contexts={stats['size']:,}")
+    print(f"replay time={elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
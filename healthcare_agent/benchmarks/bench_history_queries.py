@@ -0,0 +1,67 @@
+"""
+Time-indexed history queries on days of minute-level readings: the reading
+in effect at a time (as_of) and a vital's min/max/mean/last over a 30-minute
+window (between + aggregate), against the linear scans a plain list of
+Vitals needs.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_history_queries
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from dss_agent.history import VitalsHistory
+from dss_agent.models import Vitals
+
+HISTORY_DAYS = (1, 3, 10)
+WINDOW = timedelta(minutes=30)
+QUERIES = 2_000
+START = datetime(2024, 1, 1)
+
+def list_as_of(readings, when):
+    found = None
+    for vitals in readings:
+        if vitals.timestamp > when:
+            break
+        found = vitals
+    return found
+
+def list_aggregate(readings, start, end, name):
+    values = [getattr(v, name) for v in readings if start <= v.timestamp <= end]
+    return min(values), max(values), sum(values) / len(values), values[-1]
+
+def history_aggregate(history, start, end, name):
+    stats = history.between(start, end).aggregate(name)
+    return stats.min, stats.max, stats.mean, stats.last
+
+def per_query_us(fn, times, count) -> float:
+    begin = time.perf_counter()
+    for when in times[:count]:
+        fn(when)
+    return (time.perf_counter() - begin) / count * 1e6
+
+def main():
+    rng = random.Random(3)
+    print(f"{'readings':>9} {'as_of list':>11} {'as_of':>7} {'window list':>12} {'window':>7}  (us/query)")
+    for days in HISTORY_DAYS:
+        minutes = days * 24 * 60
+        readings = [Vitals(sbp=rng.randint(90, 140), timestamp=START + timedelta(minutes=m)) for m in range(minutes)]
+        history = VitalsHistory()
+        for vitals in readings:
+            history.append(vitals)
+        times = [START + timedelta(minutes=rng.randint(30, minutes - 1), seconds=30) for _ in range(QUERIES)]
+        for when in times[:20]:
+            assert list_as_of(readings, when) == history.as_of(when)
+            assert list_aggregate(readings, when - WINDOW, when, "sbp") == \
+                history_aggregate(history, when - WINDOW, when, "sbp")
+
+        # The scans are slow; time fewer of them
+        scans = max(1, QUERIES // 100)
+        print(f"{minutes:>9} "
+              f"{per_query_us(lambda t: list_as_of(readings, t), times, scans):>11.0f} "
+              f"{per_query_us(history.as_of, times, QUERIES):>7.1f} "
+              f"{per_query_us(lambda t: list_aggregate(readings, t - WINDOW, t, 'sbp'), times, scans):>12.0f} "
+              f"{per_query_us(lambda t: history_aggregate(history, t - WINDOW, t, 'sbp'), times, QUERIES):>7.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Streaming ingestion throughput benchmark.
+Feeds a pre-encoded JSON-lines stream through StreamIngestor and reports
+events/sec end to end (parse, batch, agent step, change detection).
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_ingest
+"""
+import asyncio
+import gc
+import json
+import time
+from dss_agent.ingest import StreamIngestor
+from benchmarks.synthetic import make_day_stream, default_resources
+
+def encode_stream(n_patients: int, hours: int) -> list:
+    lines = []
+    for tick in make_day_stream(n_patients, hours=hours):
+        for patient_id, v in tick:
+            lines.append(json.dumps({
+                "patient_id": patient_id, "timestamp": v.timestamp.isoformat(), "avpu": v.avpu,
+                "sbp": v.sbp, "spo2": v.spo2, "rr": v.rr, "hr": v.hr, "temp": v.temp, "news2": v.news2
+            }).encode("utf-8"))
+    return lines
+
+async def _drive(ingestor: StreamIngestor, lines: list):
+    consumer = asyncio.ensure_future(ingestor.run())
+    for line in lines:
+        await ingestor.submit(line)
+    await ingestor.close()
+    await consumer
+
+def bench(n_patients: int, hours: int, queue_size: int):
+    lines = encode_stream(n_patients, hours)
+    ingestor = StreamIngestor(default_resources(), queue_size=queue_size)
+    gc.collect()
+    start = time.perf_counter()
+    asyncio.run(_drive(ingestor, lines))
+    elapsed = time.perf_counter() - start
+    return len(lines) / elapsed, ingestor
+
+def main():
+    print(f"{'patients':>10} {'events':>10} {'queue':>8} {'events/s':>12} {'emitted':>10} {'max depth':>10}")
+    for n, hours in ((100, 24), (1_000, 6), (5_000, 2)):
+        for queue_size in (1_000, 10_000):
+            rate, ingestor = bench(n, hours, queue_size)
+            print(f"{n:>10} {ingestor.events:>10,} {queue_size:>8,} {rate:>12,.0f} "
+                  f"{ingestor.emitted:>10,} {ingestor.max_queue_depth:>10,}")
+
+if __name__ == "__main__":
+    main()
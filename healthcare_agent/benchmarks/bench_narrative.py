@@ -0,0 +1,141 @@
+"""
+Memory narrative per step: regenerating it every step against the cached
+MemoryNarrator (last reading only, and with the default 1h/6h/24h
+horizons), on a mostly stable synthetic ward; the cost of the horizon
+lookups as one patient's minute-level history grows to days; and the
+response bytes saved by sending the narrative once per step instead of
+once per recommendation.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_narrative
+"""
+import time
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.encoding import encode_recommendations
+from dss_agent.history import VitalsHistory
+from dss_agent.models import Vitals, to_epoch_ms
+from dss_agent.reasoning.narrative import (DEFAULT_HORIZONS, MemoryNarrator, generate_horizon_narrative,
+                                           generate_memory_narrative)
+from benchmarks.synthetic import default_resources, make_day_stream
+
+PATIENTS = 200
+HOURS = 24
+ROUNDS = 5
+# Minute-level history lengths for the lookup scaling table
+HISTORY_DAYS = (0.25, 1, 3, 10)
+LOOKUPS = 5_000
+
+def run(stream, narrate) -> float:
+    """
+    Seconds per step of feeding every patient's history as the agent does
+    and, unless `narrate` is None, calling narrate(patient_id, history,
+    current).
+    """
+    histories = {}
+    currents = {}
+    steps = 0
+    start = time.perf_counter()
+    for tick in stream:
+        for patient_id, vitals in tick:
+            history = histories.get(patient_id)
+            if history is None:
+                history = histories[patient_id] = VitalsHistory()
+            previous = currents.get(patient_id)
+            if previous is not None:
+                history.append(previous)
+            currents[patient_id] = vitals
+            if narrate is not None:
+                narrate(patient_id, history, vitals)
+            steps += 1
+    return (time.perf_counter() - start) / steps
+
+def regenerate(patient_id, history, current):
+    lines = generate_memory_narrative(history, current)
+    lines.extend(generate_horizon_narrative(history, current))
+    return lines
+
+def cached(horizons, narrators):
+    def narrate(patient_id, history, current):
+        narrator = narrators.get(patient_id)
+        if narrator is None:
+            narrator = narrators[patient_id] = MemoryNarrator(horizons)
+        return narrator.narrative(history, current)
+    return narrate
+
+def lookup_scaling():
+    """
+    Microseconds per horizon lookup (1h, 6h and 24h reference readings) on
+    one minute-level history of each length: VitalsHistory.search against
+    a linear scan back from the newest reading.
+    """
+    start = datetime(2024, 1, 1)
+    rows = []
+    for days in HISTORY_DAYS:
+        minutes = int(days * 24 * 60)
+        history = VitalsHistory()
+        for minute in range(minutes):
+            history.append(Vitals(timestamp=start + timedelta(minutes=minute)))
+        now_ms = to_epoch_ms(start + timedelta(minutes=minutes))
+        targets = [now_ms - horizon // timedelta(milliseconds=1) for horizon in DEFAULT_HORIZONS]
+
+        def scan(target):
+            index = len(history) - 1
+            while index >= 0 and history.timestamp_ms(index) > target:
+                index -= 1
+            return index
+
+        def search(target):
+            return history.search(target, right=True) - 1
+
+        assert [scan(t) for t in targets] == [search(t) for t in targets]
+        row = [minutes]
+        for find in (scan, search):
+            count = LOOKUPS if find is search else max(1, LOOKUPS // 50)
+            begin = time.perf_counter()
+            for _ in range(count):
+                for target in targets:
+                    find(target)
+            row.append((time.perf_counter() - begin) / count * 1e6)
+        rows.append(row)
+    return rows
+
+def response_bytes(stream):
+    resources = default_resources()
+    agents = {}
+    per_rec = once = 0
+    for tick in stream:
+        for patient_id, vitals in tick:
+            agent = agents.get(patient_id)
+            if agent is None:
+                agent = agents[patient_id] = EscalationAgent(patient_id)
+            step = agent.run_step_encoded(vitals, resources)
+            per_rec += sum(map(len, encode_recommendations(step.recommendations)))
+            once += sum(map(len, step.encoded)) + len(str(step.narrative))
+    return per_rec, once
+
+def main():
+    stream = make_day_stream(PATIENTS, hours=HOURS)
+    baseline = min(run(stream, None) for _ in range(ROUNDS))
+    steps = sum(map(len, stream))
+    print(f"{steps} steps")
+    regenerated = min(run(stream, regenerate) for _ in range(ROUNDS)) - baseline
+    print(f"{'regenerate every step':<30} {regenerated * 1e6:>6.2f} us/step")
+    for name, horizons in (("MemoryNarrator, last reading", ()), ("MemoryNarrator, horizons", DEFAULT_HORIZONS)):
+        best = float("inf")
+        for _ in range(ROUNDS):
+            narrators = {}
+            best = min(best, run(stream, cached(horizons, narrators)) - baseline)
+        rebuilt = sum(n.rebuilds for n in narrators.values()) / steps
+        print(f"{name:<30} {best * 1e6:>6.2f} us/step  (rebuilt on {rebuilt:.0%} of steps)")
+
+    print(f"\n{'readings':>9} {'scan us':>9} {'search us':>10}  (1h, 6h and 24h references)")
+    for minutes, scan_us, search_us in lookup_scaling():
+        print(f"{minutes:>9} {scan_us:>9.1f} {search_us:>10.2f}")
+
+    per_rec, once = response_bytes(stream)
+    print(f"\nencoded recommendations: {per_rec / steps:.0f} B/step with the narrative per recommendation, "
+          f"{once / steps:.0f} B/step with it once ({1 - once / per_rec:.0%} smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Safety rule evaluation cost as the rule table grows.
+Extra rules are graded thresholds on the existing vitals (as a site would
+add HR, temperature and age-band variants); the compiled guards fold them,
+so evaluating a reading stays flat.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_safety
+"""
+import gc
+import time
+from dss_agent.reasoning.safety import DEFAULT_RULES, SafetyRule, SafetyRuleSet
+from benchmarks.synthetic import make_ward_tick
+
+def make_rules(extra: int):
+    rules = list(DEFAULT_RULES)
+    for i in range(extra):
+        kind = i % 4
+        if kind == 0:
+            rules.append(SafetyRule("hr", ">", 130 + i, f"HR>{130 + i}"))
+        elif kind == 1:
+            rules.append(SafetyRule("temp", ">=", 39.5 + i / 100, "Temp"))
+        elif kind == 2:
+            rules.append(SafetyRule("sbp", "<", 65 - i / 100, "SBP"))
+        else:
+            rules.append(SafetyRule("rr", ">=", 36 + i, "RR"))
+    return rules
+
+def naive_check(rules, vitals):
+    """An if-chain equivalent: every rule is tested on every reading."""
+    return [rule for rule in rules if rule.fires(getattr(vitals, rule.field))]
+
+def main():
+    readings = [v for _, v in make_ward_tick(20_000)]
+    print(f"{'rules':>6} {'if-chain us':>12} {'compiled us':>12} {'batch us':>10}")
+    for extra in (0, 20, 100, 400):
+        rules = make_rules(extra)
+        ruleset = SafetyRuleSet(rules)
+
+        gc.collect()
+        start = time.perf_counter()
+        for vitals in readings:
+            naive_check(rules, vitals)
+        naive = (time.perf_counter() - start) / len(readings)
+
+        gc.collect()
+        start = time.perf_counter()
+        for vitals in readings:
+            ruleset.check(vitals)
+        compiled = (time.perf_counter() - start) / len(readings)
+
+        gc.collect()
+        start = time.perf_counter()
+        ruleset.check_batch(readings)
+        batch = (time.perf_counter() - start) / len(readings)
+
+        print(f"{len(rules):>6} {naive * 1e6:>12.2f} {compiled * 1e6:>12.2f} {batch * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Census ranking benchmark: scalar score_actions per patient versus the
+columnar score_actions_batch engine.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_scoring
+"""
+import gc
+import time
+from dss_agent.agent import default_actions
+from dss_agent.models import PatientBeliefState
+from dss_agent.reasoning.scoring import score_actions, score_actions_batch, compile_actions
+from benchmarks.synthetic import make_ward_tick, default_resources
+
+def main():
+    actions = default_actions()
+    compiled = compile_actions(actions)
+    resources = default_resources()
+
+    print(f"{'patients':>10} {'scalar ms':>12} {'batch ms':>12} {'speedup':>9}")
+    for n in (100, 1_000, 10_000):
+        beliefs = [PatientBeliefState(patient_id=pid, current_vitals=v) for pid, v in make_ward_tick(n)]
+
+        gc.collect()
+        start = time.perf_counter()
+        for belief in beliefs:
+            score_actions(belief, resources, actions)
+        scalar = time.perf_counter() - start
+
+        gc.collect()
+        start = time.perf_counter()
+        score_actions_batch(beliefs, resources, compiled)
+        batch = time.perf_counter() - start
+
+        print(f"{n:>10} {scalar * 1000:>12.1f} {batch * 1000:>12.1f} {scalar / batch:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Response serialization: the dict path (Recommendation.to_dict, a copy per
+recommendation to add documentation and explanation, then Flask-style
+json.dumps with sorted keys) against pre-encoded output (dss_agent.encoding).
+Both produce the same /api/agent/run body.
+
+Reports time and throughput per response and, from tracemalloc, the peak
+memory allocated while building one response (intermediate dicts, copies
+and encoder buffers, including the body itself).
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_serialization
+"""
+import json
+import time
+import tracemalloc
+from dss_agent.agent import EscalationAgent
+from dss_agent.encoding import encode_envelope, encode_recommendations, with_fields
+from benchmarks.synthetic import default_resources, make_day_stream
+
+PATIENTS = 100
+HOURS = 6
+ROUNDS = 5
+DOCUMENTATION = "Guideline excerpt for this action. " * 8
+EXPLANATION = "The patient's trend and the ward's resources favour this action now. " * 3
+
+def make_steps():
+    """
+    The recommendations of every step of a synthetic stream.
+    """
+    resources = default_resources()
+    agents = {}
+    steps = []
+    for tick in make_day_stream(PATIENTS, hours=HOURS):
+        for patient_id, vitals in tick:
+            agent = agents.get(patient_id)
+            if agent is None:
+                agent = agents[patient_id] = EscalationAgent(patient_id)
+            steps.append((agent.run_step_encoded(vitals, resources).recommendations, vitals.news2))
+    return steps
+
+def dict_path(recs, news2) -> bytes:
+    enriched = [{**r, "documentation": DOCUMENTATION, "explanation": EXPLANATION}
+                for r in (rec.to_dict() for rec in recs)]
+    payload = {"status": "success", "recommendations": enriched, "patient_risk_score": news2,
+               "enrichment_degraded": False}
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+def encoded_path(recs, news2) -> bytes:
+    fields = {"documentation": DOCUMENTATION, "explanation": EXPLANATION}
+    return encode_envelope(
+        {"status": "success", "patient_risk_score": news2, "enrichment_degraded": False},
+        "recommendations", [with_fields(encoded, fields) for encoded in encode_recommendations(recs)]
+    )
+
+def bench(steps, build):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        size = sum(len(build(recs, news2)) for recs, news2 in steps)
+        best = min(best, time.perf_counter() - start)
+    return best / len(steps), size / len(steps)
+
+def allocation_peak(steps, build) -> float:
+    """
+    Mean peak bytes allocated while building one response.
+    """
+    peak = 0
+    tracemalloc.start()
+    for recs, news2 in steps:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        body = build(recs, news2)
+        peak += tracemalloc.get_traced_memory()[1] - base
+        del body
+    tracemalloc.stop()
+    return peak / len(steps)
+
+def main():
+    steps = make_steps()
+    for recs, news2 in steps[:50]:
+        assert json.loads(dict_path(recs, news2)) == json.loads(encoded_path(recs, news2))
+
+    print(f"{len(steps)} responses")
+    print(f"{'path':<10} {'us/resp':>9} {'bytes':>7} {'MB/s':>8} {'alloc peak B':>13}")
+    for name, build in (("dicts", dict_path), ("encoded", encoded_path)):
+        seconds, size = bench(steps, build)
+        peak = allocation_peak(steps, build)
+        print(f"{name:<10} {seconds * 1e6:>9.1f} {size:>7.0f} {size / seconds / 1e6:>8.1f} {peak:>13.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Sharded ward throughput.
+Compares WardAgent.run_batch in one process against ShardedWard with
+1, 2 and 4 worker processes. Scaling is bounded by the cores available.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_sharding
+"""
+import gc
+import os
+import time
+from dss_agent.agent import WardAgent
+from dss_agent.sharding import ShardedWard
+from benchmarks.synthetic import make_ward_tick, default_resources
+
+TICKS = 3
+N_PATIENTS = 20_000
+
+def bench_single(ticks) -> float:
+    resources = default_resources()
+    ward = WardAgent()
+    gc.collect()
+    start = time.perf_counter()
+    for batch in ticks:
+        ward.run_batch(batch, resources)
+    return N_PATIENTS * TICKS / (time.perf_counter() - start)
+
+def bench_sharded(ticks, n_workers: int) -> float:
+    resources = default_resources()
+    with ShardedWard(n_workers=n_workers) as ward:
+        ward.update_resources(resources)
+        gc.collect()
+        start = time.perf_counter()
+        for batch in ticks:
+            ward.run_batch(batch)
+        return N_PATIENTS * TICKS / (time.perf_counter() - start)
+
+def main():
+    ticks = [make_ward_tick(N_PATIENTS, tick) for tick in range(TICKS)]
+    print(f"{os.cpu_count()} CPUs, {N_PATIENTS:,} patients")
+    print(f"{'workers':>10} {'patients/s':>14}")
+    print(f"{'inline':>10} {bench_single(ticks):>14,.0f}")
+    for n in (1, 2, 4):
+        print(f"{n:>10} {bench_sharded(ticks, n):>14,.0f}")
+
+if __name__ == "__main__":
+    main()
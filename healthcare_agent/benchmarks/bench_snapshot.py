@@ -0,0 +1,56 @@
+"""
+Snapshot write, index open and full restore time for a ward census, each
+patient carrying a day of minute-level history.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_snapshot
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from dss_agent.snapshot import SnapshotReader, write_snapshot
+from dss_agent.world_model import WorldModel
+from benchmarks.synthetic import make_vitals
+
+PATIENTS = 1_000
+READINGS = 24 * 60
+
+def build_census():
+    rng = random.Random(11)
+    t0 = datetime(2024, 1, 1)
+    world_models = []
+    for i in range(PATIENTS):
+        world_model = WorldModel(f"P{i:05d}")
+        for minute in range(READINGS):
+            world_model.update_vitals(make_vitals(rng, t0 + timedelta(minutes=minute)))
+        world_models.append(world_model)
+    return world_models
+
+def main():
+    world_models = build_census()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "agents.snap")
+
+        start = time.perf_counter()
+        write_snapshot(path, world_models)
+        write_s = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        reader = SnapshotReader(path)
+        open_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        restored = list(reader.load_all())
+        restore_s = time.perf_counter() - start
+        reader.close()
+
+    print(f"{PATIENTS} patients x {READINGS} readings, snapshot {size_mb:.1f} MB")
+    print(f"{'write':<12} {write_s:>8.2f} s")
+    print(f"{'open index':<12} {open_s * 1000:>8.2f} ms")
+    print(f"{'restore all':<12} {restore_s:>8.2f} s  ({restore_s / len(restored) * 1e6:.0f} us/patient)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-step latency of EscalationAgent.run_step for emergent versus routine
+patients. The "eager" rows add back the perception work that run_step used
+to do unconditionally and the chosen path does not read, for comparison.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_step_latency
+"""
+import gc
+import random
+import time
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.models import Vitals
+from dss_agent.perception import vitals_trends, delay_signals, treatment_response
+from benchmarks.synthetic import default_resources
+
+STEPS = 20_000
+
+def _stream(emergent: bool):
+    rng = random.Random(3)
+    t0 = datetime(2024, 1, 1)
+    for i in range(STEPS):
+        timestamp = t0 + timedelta(minutes=i)
+        if emergent:
+            yield Vitals(avpu="A", sbp=rng.randint(55, 69), spo2=rng.randint(85, 95), rr=rng.randint(20, 30),
+                         news2=rng.randint(6, 12), timestamp=timestamp)
+        else:
+            yield Vitals(avpu="A", sbp=rng.randint(100, 130), spo2=rng.randint(92, 99), rr=rng.randint(12, 22),
+                         news2=rng.randint(0, 8), timestamp=timestamp)
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return [samples[int(len(samples) * q)] * 1e6 for q in (0.5, 0.99)]
+
+def bench(emergent: bool, eager: bool):
+    resources = default_resources()
+    agent = EscalationAgent("BENCH")
+    stream = list(_stream(emergent))
+    belief_state = agent.world_model.patient_belief
+    samples = []
+    gc.collect()
+    for vitals in stream:
+        start = time.perf_counter()
+        agent.run_step(vitals, resources)
+        if eager:
+            if emergent:
+                vitals_trends.analyze_vital_trends(belief_state.history, belief_state.current_vitals)
+                delay_signals.check_delays(belief_state)
+            treatment_response.check_treatment_response(belief_state)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+def main():
+    print(f"{'patient':<10} {'path':<6} {'p50 us':>10} {'p99 us':>10}")
+    for emergent in (True, False):
+        label = "emergent" if emergent else "routine"
+        for eager in (True, False):
+            p50, p99 = bench(emergent, eager)
+            print(f"{label:<10} {'eager' if eager else 'lazy':<6} {p50:>10.1f} {p99:>10.1f}")
+
+if __name__ == "__main__":
+    main()
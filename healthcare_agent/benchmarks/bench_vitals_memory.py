@@ -0,0 +1,54 @@
+"""
+Bytes retained per vitals sample for each representation:
+a list of Vitals dataclasses, a list of CompactVitals, and VitalsHistory columns.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_vitals_memory
+"""
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+from dss_agent.history import VitalsHistory
+from dss_agent.models import Vitals, CompactVitals
+
+SAMPLES = 100_000
+T0 = datetime(2024, 1, 1)
+
+def _sample(i):
+    return dict(avpu="A", sbp=100 + i % 40, spo2=90 + i % 10, rr=12 + i % 12, hr=60 + i % 60,
+                temp=36.0 + (i % 30) / 10, news2=i % 9)
+
+def _measure(build) -> float:
+    gc.collect()
+    tracemalloc.start()
+    retained = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return current / SAMPLES
+
+def build_dataclass_list():
+    return [Vitals(**_sample(i), timestamp=T0 + timedelta(minutes=i)) for i in range(SAMPLES)]
+
+def build_compact_list():
+    base_ms = CompactVitals(timestamp=T0).timestamp_ms
+    return [CompactVitals(**_sample(i), timestamp_ms=base_ms + i * 60_000) for i in range(SAMPLES)]
+
+def build_history():
+    history = VitalsHistory(capacity=SAMPLES)
+    base_ms = CompactVitals(timestamp=T0).timestamp_ms
+    for i in range(SAMPLES):
+        history.append(CompactVitals(**_sample(i), timestamp_ms=base_ms + i * 60_000))
+    return history
+
+def main():
+    print(f"{'representation':<24} {'bytes/sample':>13}")
+    for name, build in (
+        ("list[Vitals]", build_dataclass_list),
+        ("list[CompactVitals]", build_compact_list),
+        ("VitalsHistory", build_history),
+    ):
+        print(f"{name:<24} {_measure(build):>13.1f}")
+
+if __name__ == "__main__":
+    main()
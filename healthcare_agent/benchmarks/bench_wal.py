@@ -0,0 +1,63 @@
+"""
+Per-step overhead of the write-ahead log: run_step latency with logging off
+and on (fsync every flush interval), plus the time for the writer to drain.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_wal
+"""
+import gc
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.wal import WriteAheadLog
+from benchmarks.synthetic import default_resources, make_vitals
+
+PATIENTS = 200
+STEPS_PER_PATIENT = 100
+
+def _stream():
+    rng = random.Random(5)
+    t0 = datetime(2024, 1, 1)
+    return [(f"P{i:05d}", make_vitals(rng, t0 + timedelta(minutes=step)))
+            for step in range(STEPS_PER_PATIENT) for i in range(PATIENTS)]
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return [samples[int(len(samples) * q)] * 1e6 for q in (0.5, 0.99)]
+
+def bench(stream, wal=None):
+    resources = default_resources()
+    agents = {}
+    samples = []
+    gc.collect()
+    start = time.perf_counter()
+    for patient_id, vitals in stream:
+        agent = agents.get(patient_id)
+        if agent is None:
+            agent = agents[patient_id] = EscalationAgent(patient_id, wal=wal)
+        step_start = time.perf_counter()
+        agent.run_step(vitals, resources)
+        samples.append(time.perf_counter() - step_start)
+    elapsed = time.perf_counter() - start
+    drain_start = time.perf_counter()
+    if wal is not None:
+        wal.flush()
+    return _percentiles(samples) + [len(stream) / elapsed, time.perf_counter() - drain_start]
+
+def main():
+    stream = _stream()
+    print(f"{'log':<12} {'p50 us':>10} {'p99 us':>10} {'steps/s':>10} {'drain ms':>10}")
+    p50, p99, rate, _ = bench(stream)
+    print(f"{'off':<12} {p50:>10.1f} {p99:>10.1f} {rate:>10.0f} {'-':>10}")
+    for interval in (0.01, 0.05):
+        with tempfile.TemporaryDirectory() as tmp:
+            with WriteAheadLog(tmp, flush_interval_seconds=interval) as wal:
+                p50, p99, rate, drain = bench(stream, wal)
+                syncs = wal.syncs
+        label = f"on {int(interval * 1000)}ms"
+        print(f"{label:<12} {p50:>10.1f} {p99:>10.1f} {rate:>10.0f} {drain * 1000:>10.1f}  ({syncs} fsyncs)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Ward-scale throughput benchmark.
+Compares looping EscalationAgent.run_step per patient against WardAgent.run_batch.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_ward_batch
+"""
+import gc
+import time
+from dss_agent.agent import EscalationAgent, WardAgent
+from benchmarks.synthetic import make_ward_tick, default_resources
+
+TICKS = 3
+
+def bench_run_step(n_patients: int) -> float:
+    resources = default_resources()
+    ticks = [make_ward_tick(n_patients, tick) for tick in range(TICKS)]
+    agents = {}
+    gc.collect()
+    start = time.perf_counter()
+    for batch in ticks:
+        for patient_id, vitals in batch:
+            agent = agents.get(patient_id)
+            if agent is None:
+                agent = agents[patient_id] = EscalationAgent(patient_id)
+            agent.run_step(vitals, resources)
+    return n_patients * TICKS / (time.perf_counter() - start)
+
+def bench_run_batch(n_patients: int) -> float:
+    resources = default_resources()
+    ticks = [make_ward_tick(n_patients, tick) for tick in range(TICKS)]
+    ward = WardAgent()
+    gc.collect()
+    start = time.perf_counter()
+    for batch in ticks:
+        ward.run_batch(batch, resources)
+    return n_patients * TICKS / (time.perf_counter() - start)
+
+def main():
+    print(f"{'patients':>10} {'run_step/s':>14} {'run_batch/s':>14}")
+    for n in (100, 1_000, 10_000):
+        print(f"{n:>10} {bench_run_step(n):>14,.0f} {bench_run_batch(n):>14,.0f}")
+
+if __name__ == "__main__":
+    main()
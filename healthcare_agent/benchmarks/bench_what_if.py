@@ -0,0 +1,46 @@
+"""
+What-if sweep benchmark: nested analyze_counterfactual calls versus
+what_if_matrix for a census of patients across a set of delays.
+
+Run from the healthcare_agent directory:
+    python -m benchmarks.bench_what_if
+"""
+import gc
+import random
+import time
+from dss_agent.reasoning.counterfactual import analyze_counterfactual, what_if_matrix, signal_mask, SIGNAL_NAMES
+
+DELAYS = list(range(0, 240, 12))
+
+def make_census(n: int, seed: int = 11):
+    rng = random.Random(seed)
+    risks = [rng.randint(0, 20) / 20.0 for _ in range(n)]
+    signals = [[name for name in SIGNAL_NAMES if rng.random() < 0.08] for _ in range(n)]
+    return risks, signals
+
+def main():
+    print(f"{'patients':>10} {'delays':>7} {'nested ms':>11} {'matrix ms':>11} {'masks ms':>10}")
+    for n in (1_000, 10_000, 100_000):
+        risks, signals = make_census(n)
+        masks = [signal_mask(s) for s in signals]
+
+        gc.collect()
+        start = time.perf_counter()
+        for risk, active in zip(risks, signals):
+            [analyze_counterfactual(risk, d, active)["projected_risk"] for d in DELAYS]
+        nested = time.perf_counter() - start
+
+        gc.collect()
+        start = time.perf_counter()
+        what_if_matrix(risks, DELAYS, signals)
+        matrix = time.perf_counter() - start
+
+        gc.collect()
+        start = time.perf_counter()
+        what_if_matrix(risks, DELAYS, masks)
+        masked = time.perf_counter() - start
+
+        print(f"{n:>10} {len(DELAYS):>7} {nested * 1000:>11.1f} {matrix * 1000:>11.1f} {masked * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Deterministic replay harness for the agent loop.
+
+Pieces shared by the end-to-end benchmarks:
+- stream sources: synthetic ward traffic, a JSON-lines feed in the ingest
+  format, or a write-ahead log directory, all as ("vitals" | "resources",
+  payload) events in order;
+- stage timing through dss_agent.instrumentation.AgentMetrics, so the
+  benchmarks and the server report the same stages;
+- LatencyHistogram (re-exported from dss_agent.instrumentation), a
+  log-bucketed histogram (about 6% resolution) that records in constant
+  time and memory;
+- peak memory readings.
+"""
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+from dss_agent.ingest import parse_event
+from dss_agent.instrumentation import AgentMetrics, LatencyHistogram, STAGES
+from dss_agent.wal import replay as replay_wal
+from benchmarks.synthetic import iter_day_stream, default_resources
+
+# -- Sources ----------------------------------------------------------------
+
+def synthetic_source(n_patients: int, hours: int, interval_minutes: int, seed: int) -> Iterator[Tuple[str, Any]]:
+    yield "resources", default_resources()
+    for tick in iter_day_stream(n_patients, hours=hours, interval_minutes=interval_minutes, seed=seed):
+        for reading in tick:
+            yield "vitals", reading
+
+def jsonl_source(path: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Replays a feed in the StreamIngestor event format. Readings before the
+    first resources event use the benchmark's default ResourceState.
+    """
+    yield "resources", default_resources()
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                kind, payload = parse_event(line)
+                if kind != "discharge":
+                    yield kind, payload
+
+def wal_source(directory: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Replays the readings recorded in a write-ahead log.
+    """
+    resources = None
+    for record in replay_wal(directory):
+        if record["resources"] != resources:
+            resources = record["resources"]
+            yield "resources", resources
+        yield "vitals", (record["patient_id"], record["vitals"])
+
+def open_source(spec: str, n_patients: int, hours: int, interval_minutes: int, seed: int) -> Iterator[Tuple[str, Any]]:
+    """
+    "synthetic", "jsonl:<path>" or "wal:<directory>".
+    """
+    if spec == "synthetic":
+        return synthetic_source(n_patients, hours, interval_minutes, seed)
+    kind, _, location = spec.partition(":")
+    if kind == "jsonl" and location:
+        return jsonl_source(location)
+    if kind == "wal" and location:
+        return wal_source(location)
+    raise ValueError(f"Unknown source {spec!r}; expected synthetic, jsonl:<path> or wal:<dir>")
+
+# -- Stage timing -----------------------------------------------------------
+
+def stage_metrics() -> AgentMetrics:
+    """
+    AgentMetrics that times every step, to attach to the benchmarked agents.
+    Stage latencies then come from the agent's own stage marks, the same
+    boundaries the server exports at /metrics.
+    """
+    return AgentMetrics(sample_every=1)
+
+def stage_summary(metrics: AgentMetrics) -> Dict[str, Dict[str, float]]:
+    """
+    Per-stage latency summaries of the steps `metrics` timed. Stages no
+    step reached are left out.
+    """
+    stages = metrics.stats()["stages"]
+    return {stage: summary for stage, summary in stages.items() if summary["count"]}
+
+# -- Memory -----------------------------------------------------------------
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process, or None where unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
@@ -0,0 +1,68 @@
+"""
+Deterministic synthetic ward data for benchmarks.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+from dss_agent.models import Vitals, ResourceState
+
+def make_vitals(rng: random.Random, timestamp: datetime) -> Vitals:
+    """
+    Draws one plausible set of vitals. Roughly 5% of readings are emergent.
+    """
+    if rng.random() < 0.05:
+        return Vitals(avpu=rng.choice("VPU"), sbp=rng.randint(55, 90), spo2=rng.randint(78, 90),
+                      rr=rng.randint(25, 40), hr=rng.randint(110, 150), temp=round(rng.uniform(35.0, 40.0), 1),
+                      news2=rng.randint(9, 15), timestamp=timestamp)
+    return Vitals(avpu="A", sbp=rng.randint(95, 140), spo2=rng.randint(90, 100),
+                  rr=rng.randint(12, 24), hr=rng.randint(60, 110), temp=round(rng.uniform(36.0, 38.5), 1),
+                  news2=rng.randint(0, 8), timestamp=timestamp)
+
+def make_ward_tick(n_patients: int, tick: int = 0, seed: int = 42) -> List[Tuple[str, Vitals]]:
+    """
+    Returns (patient_id, vitals) pairs for one monitoring tick.
+    """
+    rng = random.Random(seed * 1_000_003 + tick)
+    timestamp = datetime.now() + timedelta(minutes=tick)
+    return [(f"P{i:05d}", make_vitals(rng, timestamp)) for i in range(n_patients)]
+
+def default_resources() -> ResourceState:
+    return ResourceState(icu_beds_available=2, rrt_available=True, nurse_load=0.7, transport_delay_minutes=20)
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+def iter_day_stream(n_patients: int, hours: int = 24, interval_minutes: int = 15,
+                    seed: int = 7) -> Iterator[List[Tuple[str, Vitals]]]:
+    """
+    Generates `hours` of ward traffic lazily: one tick every
+    `interval_minutes`, each a list of (patient_id, vitals). Every patient
+    follows a bounded random walk around a stable baseline, with occasional
+    deterioration episodes. Only one tick is held in memory at a time.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 0, 0)
+    state = [{"sbp": rng.randint(105, 135), "spo2": rng.randint(94, 99), "rr": rng.randint(12, 20),
+              "hr": rng.randint(65, 95), "temp": 36.8, "news2": rng.choice((0, 0, 1, 1, 2, 3, 5))}
+             for _ in range(n_patients)]
+    for tick in range(hours * 60 // interval_minutes):
+        timestamp = start + timedelta(minutes=tick * interval_minutes)
+        batch = []
+        for i, s in enumerate(state):
+            if rng.random() < 0.02:
+                s["news2"] = _clamp(s["news2"] + rng.choice((2, 3, 4)), 0, 12)
+            elif rng.random() < 0.2:
+                s["news2"] = _clamp(s["news2"] + rng.choice((-1, 1)), 0, 12)
+            s["sbp"] = _clamp(s["sbp"] + rng.randint(-4, 4), 60, 180)
+            s["spo2"] = _clamp(s["spo2"] + rng.randint(-1, 1), 82, 100)
+            s["rr"] = _clamp(s["rr"] + rng.randint(-1, 1), 8, 36)
+            s["hr"] = _clamp(s["hr"] + rng.randint(-3, 3), 40, 160)
+            s["temp"] = round(_clamp(s["temp"] + rng.uniform(-0.1, 0.1), 35.0, 40.5), 1)
+            batch.append((f"P{i:05d}", Vitals(avpu="A", timestamp=timestamp, **s)))
+        yield batch
+
+def make_day_stream(n_patients: int, hours: int = 24, interval_minutes: int = 15, seed: int = 7) -> List[List[Tuple[str, Vitals]]]:
+    """
+    iter_day_stream collected into a list of ticks.
+    """
+    return list(iter_day_stream(n_patients, hours, interval_minutes, seed))
@@ -4,3 +4,10 @@ def fetch_athena_guidelines(query: str) -> str:
     In a real system, this would query an external knowledge base.
     """
     return "WHO/Athena Guidelines: Ensure adequate hydration and monitoring for potential sepsis."
+
+async def fetch_athena_guidelines_async(query: str) -> str:
+    """
+    Async variant used by the ASGI serving path.
+    A real client would await the remote knowledge base here.
+    """
+    return fetch_athena_guidelines(query)
@@ -0,0 +1,397 @@
+"""
+Bounded, array-backed vitals history.
+Keeps one numeric column per vital in a ring buffer so long stays with
+minute-level monitor feeds use a fixed amount of memory per patient.
+"""
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence, Union
+from .models import Vitals, CompactVitals, to_epoch_ms, from_epoch_ms
+
+# Ten days of minute-level readings
+DEFAULT_CAPACITY = 10 * 24 * 60
+
+# Numeric columns and their array typecodes. AVPU and timestamps are stored separately.
+COLUMNS = (
+    ("sbp", "i"),
+    ("spo2", "i"),
+    ("rr", "i"),
+    ("hr", "i"),
+    ("temp", "d"),
+    ("news2", "i"),
+)
+
+# Every stored column in storage order, as written to snapshots
+STORAGE_COLUMNS = (("avpu", "B"), ("timestamp_ms", "q")) + COLUMNS
+
+# One reading in storage order, with the columns' native types: packing it
+# checks every value the way the array columns would
+_ROW = struct.Struct("=" + "".join(code for _, code in STORAGE_COLUMNS))
+
+@dataclass
+class WindowStats:
+    """
+    Aggregates of one vital over a window of readings.
+    """
+    count: int
+    min: float
+    max: float
+    mean: float
+    last: float
+
+class VitalsHistory:
+    """
+    Fixed-capacity ring buffer of Vitals.
+
+    Supports the read access the agent used on the old list (len, truthiness,
+    indexing, iteration) plus cheap "last N" / "since T" views and
+    time-indexed point and range queries (as_of, nearest, between), all
+    O(log n) by binary search over the timestamp column. Appends are
+    O(1): storage grows on demand up to `capacity`, after which the oldest
+    reading is overwritten. Readings older than `max_age` (relative to the
+    newest reading) are dropped on append.
+
+    Timestamps are stored as epoch milliseconds, so readings materialised from
+    the buffer carry millisecond precision. The newest reading is returned as
+    the original Vitals object.
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_age: Optional[timedelta] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_age_ms = None if max_age is None else max_age // timedelta(milliseconds=1)
+
+        self._columns = {name: array(code) for name, code in COLUMNS}
+        self._avpu = array("B")
+        self._ts = array("q")
+        self._arrays = [self._avpu, self._ts] + list(self._columns.values())
+        # Every column by STORAGE_COLUMNS name
+        self._named = dict(zip((name for name, _ in STORAGE_COLUMNS), self._arrays))
+
+        self._start = 0
+        self._size = 0
+        self._last: Optional[Vitals] = None
+
+    # -- Writes -------------------------------------------------------------
+
+    def append(self, vitals: Union[Vitals, CompactVitals]):
+        """
+        Appends one reading. Raises ValueError, leaving the history
+        unchanged, when a value does not fit its column (e.g. a None or
+        multi-character AVPU, or a float SBP).
+        """
+        try:
+            ts = vitals.timestamp_ms if isinstance(vitals, CompactVitals) else to_epoch_ms(vitals.timestamp)
+            avpu, sbp, spo2, rr, hr, temp, news2 = (ord(vitals.avpu), vitals.sbp, vitals.spo2, vitals.rr,
+                                                    vitals.hr, vitals.temp, vitals.news2)
+            _ROW.pack(avpu, ts, sbp, spo2, rr, hr, temp, news2)
+        except (TypeError, AttributeError, struct.error) as e:
+            raise ValueError(f"Vitals cannot be stored in history: {e}") from None
+
+        alloc = len(self._ts)
+        if self._size == alloc and alloc < self.capacity:
+            self._grow(min(self.capacity, max(16, alloc * 2)))
+            alloc = len(self._ts)
+
+        if self._size == alloc:
+            # Full: overwrite the oldest reading
+            pos = self._start
+            self._start = (self._start + 1) % alloc
+        else:
+            pos = (self._start + self._size) % alloc
+            self._size += 1
+
+        self._ts[pos] = ts
+        self._avpu[pos] = avpu
+        columns = self._columns
+        columns["sbp"][pos] = sbp
+        columns["spo2"][pos] = spo2
+        columns["rr"][pos] = rr
+        columns["hr"][pos] = hr
+        columns["temp"][pos] = temp
+        columns["news2"][pos] = news2
+        self._last = vitals
+
+        if self.max_age_ms is not None:
+            cutoff = ts - self.max_age_ms
+            while self._size > 1 and self._ts[self._start] < cutoff:
+                self._start = (self._start + 1) % alloc
+                self._size -= 1
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes allocated for the columns. Grows with the history up to
+        `capacity` readings.
+        """
+        return len(self._ts) * _ROW.size
+
+    def _grow(self, new_alloc: int):
+        """
+        Re-linearises the ring (oldest reading at position 0) and extends
+        every column in place to `new_alloc` slots.
+        """
+        alloc = len(self._ts)
+        start = self._start
+        for column in self._arrays:
+            if start:
+                column[:] = column[start:] + column[:start]
+            column.extend([0] * (new_alloc - alloc))
+        self._start = 0
+
+    # -- Snapshots ----------------------------------------------------------
+
+    def column_bytes(self) -> List[bytes]:
+        """
+        Raw contents of each column in STORAGE_COLUMNS order, oldest reading
+        first, in native byte order.
+        """
+        start, stop = self._start, self._start + self._size
+        alloc = len(self._ts)
+        if stop <= alloc:
+            return [column[start:stop].tobytes() for column in self._arrays]
+        return [column[start:].tobytes() + column[:stop - alloc].tobytes() for column in self._arrays]
+
+    @classmethod
+    def from_column_bytes(cls, buffers: Sequence, size: int, capacity: int = DEFAULT_CAPACITY,
+                          max_age: Optional[timedelta] = None, byteswap: bool = False) -> "VitalsHistory":
+        """
+        Inverse of column_bytes. `buffers` may be memoryviews (e.g. over an
+        mmap); each is copied once into its column. Set `byteswap` when the
+        buffers were written on a machine with the other byte order.
+        """
+        if size > capacity:
+            raise ValueError("history holds more readings than its capacity")
+        history = cls(capacity=capacity, max_age=max_age)
+        for column, buffer in zip(history._arrays, buffers):
+            column.frombytes(buffer)
+            if len(column) != size:
+                raise ValueError("history column length does not match its size")
+            if byteswap:
+                column.byteswap()
+        history._size = size
+        if size:
+            history._last = history._row(size - 1)
+        return history
+
+    # -- Reads --------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        if index == self._size - 1:
+            return self._last
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Vitals]:
+        for i in range(self._size):
+            yield self[i]
+
+    def _pos(self, index: int) -> int:
+        return (self._start + index) % len(self._ts)
+
+    def _row(self, index: int) -> Vitals:
+        pos = self._pos(index)
+        columns = self._columns
+        return Vitals(
+            avpu=chr(self._avpu[pos]),
+            sbp=columns["sbp"][pos],
+            spo2=columns["spo2"][pos],
+            rr=columns["rr"][pos],
+            hr=columns["hr"][pos],
+            temp=columns["temp"][pos],
+            news2=columns["news2"][pos],
+            timestamp=from_epoch_ms(self._ts[pos])
+        )
+
+    def timestamp_ms(self, index: int) -> int:
+        """
+        Epoch-ms timestamp of the reading at logical `index` (0 = oldest).
+        """
+        if index < 0:
+            index += self._size
+        return self._ts[self._pos(index)]
+
+    def value(self, name: str, index: int):
+        """
+        One vital ("avpu", "timestamp_ms" or a numeric column) of the reading
+        at logical `index`, without building a Vitals.
+        """
+        if index < 0:
+            index += self._size
+        value = self._named[name][self._pos(index)]
+        return chr(value) if name == "avpu" else value
+
+    def values_at(self, index: int, names: Sequence[str]) -> list:
+        """
+        Several vitals of the reading at logical `index`, in `names` order,
+        with the ring position resolved once.
+        """
+        if index < 0:
+            index += self._size
+        pos = self._pos(index)
+        named = self._named
+        values = [named[name][pos] for name in names]
+        if "avpu" in names:
+            i = names.index("avpu")
+            values[i] = chr(values[i])
+        return values
+
+    def search(self, timestamp_ms: int, right: bool = False) -> int:
+        """
+        Logical index of the first reading taken at or after `timestamp_ms`
+        (after it, with `right`), or len(self) if there is none. Assumes
+        readings were appended in time order. Each of the ring's two sorted
+        runs is searched with bisect directly on the timestamp array, so
+        this is O(log n) without Python-level loop iterations.
+        """
+        ts = self._ts
+        start, size = self._start, self._size
+        alloc = len(ts)
+        end = start + size
+        find = bisect_right if right else bisect_left
+        if end <= alloc:
+            return find(ts, timestamp_ms, start, end) - start
+        # Wrapped: the older run is [start, alloc), the newer [0, end - alloc)
+        if timestamp_ms < ts[alloc - 1] or (not right and timestamp_ms == ts[alloc - 1]):
+            return find(ts, timestamp_ms, start, alloc) - start
+        return alloc - start + find(ts, timestamp_ms, 0, end - alloc)
+
+    def last_n(self, n: int) -> "HistoryView":
+        """
+        View over the newest `n` readings.
+        """
+        return HistoryView(self, max(0, self._size - n), self._size)
+
+    def since(self, when: datetime) -> "HistoryView":
+        """
+        View over readings taken at or after `when`. Assumes readings were
+        appended in time order; the start is found by binary search.
+        """
+        return HistoryView(self, self.search(to_epoch_ms(when)), self._size)
+
+    def between(self, start: datetime, end: datetime) -> "HistoryView":
+        """
+        View over readings taken from `start` to `end`, both inclusive.
+        """
+        lo = self.search(to_epoch_ms(start))
+        return HistoryView(self, lo, max(lo, self.search(to_epoch_ms(end), right=True)))
+
+    def as_of(self, when: datetime) -> Optional[Vitals]:
+        """
+        The newest reading taken at or before `when`, or None.
+        """
+        index = self.search(to_epoch_ms(when), right=True) - 1
+        return self[index] if index >= 0 else None
+
+    def nearest(self, when: datetime) -> Optional[Vitals]:
+        """
+        The reading taken closest to `when` (the earlier one on a tie), or
+        None when the history is empty.
+        """
+        if not self._size:
+            return None
+        target = to_epoch_ms(when)
+        index = self.search(target)
+        if index == self._size or (index and target - self.timestamp_ms(index - 1) <= self.timestamp_ms(index) - target):
+            index -= 1
+        return self[index]
+
+    def values(self, name: str) -> Iterator:
+        """
+        Iterates one vital's values, oldest first, without building Vitals.
+        """
+        return HistoryView(self, 0, self._size).values(name)
+
+
+class HistoryView:
+    """
+    Window [start, stop) over a VitalsHistory. Nothing is copied; the view is
+    only valid until the next append to the underlying history.
+    """
+    def __init__(self, history: VitalsHistory, start: int, stop: int):
+        self.history = history
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __bool__(self) -> bool:
+        return self.stop > self.start
+
+    def __getitem__(self, index: int) -> Vitals:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("view index out of range")
+        return self.history[self.start + index]
+
+    def __iter__(self) -> Iterator[Vitals]:
+        for i in range(self.start, self.stop):
+            yield self.history[i]
+
+    def values(self, name: str) -> Iterator:
+        """
+        Iterates one vital's values ("avpu", "timestamp_ms" or a numeric
+        column), oldest first.
+        """
+        history = self.history
+        if name == "avpu":
+            column, convert = history._avpu, chr
+        elif name == "timestamp_ms":
+            column, convert = history._ts, None
+        else:
+            column, convert = history._columns[name], None
+        for i in range(self.start, self.stop):
+            value = column[history._pos(i)]
+            yield convert(value) if convert else value
+
+    def _runs(self, name: str) -> List[array]:
+        # The window's slice of one column, as one or two contiguous copies
+        history = self.history
+        column = history._named[name]
+        alloc = len(column)
+        start, stop = history._start + self.start, history._start + self.stop
+        if stop <= alloc:
+            return [column[start:stop]]
+        if start >= alloc:
+            return [column[start - alloc:stop - alloc]]
+        return [column[start:], column[:stop - alloc]]
+
+    def aggregate(self, name: str) -> Optional[WindowStats]:
+        """
+        Count, min, max, mean and newest value of one numeric vital over the
+        window, or None for an empty window. The column is sliced and
+        reduced by the array builtins, without building Vitals or stepping
+        through the ring in Python.
+        """
+        if name == "avpu":
+            raise ValueError("avpu has no numeric aggregates")
+        count = len(self)
+        if not count:
+            return None
+        runs = self._runs(name)
+        return WindowStats(
+            count=count,
+            min=min(map(min, runs)),
+            max=max(map(max, runs)),
+            mean=sum(map(sum, runs)) / count,
+            last=runs[-1][-1],
+        )
+
+    def to_list(self) -> List[Vitals]:
+        return list(self)
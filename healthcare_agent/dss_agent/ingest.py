@@ -0,0 +1,282 @@
+"""
+Streaming vitals ingestion.
+
+Consumes a continuous feed of JSON events (a JSON-lines file or a TCP socket
+from bedside monitors), routes each reading to its patient's agent in a
+WardAgent, and emits recommendations only when they change.
+
+The only buffer is a bounded queue. When it is full, readers stop reading
+and the feed is pushed back on; events are never dropped. Every reading runs
+through the safety rules, and emergent recommendations are always emitted.
+
+Event format (one JSON object per line):
+    {"patient_id": "P1", "timestamp": "2024-01-01T08:00:00", "avpu": "A",
+     "sbp": 118, "spo2": 96, "rr": 18, "hr": 84, "temp": 37.1, "news2": 2}
+`timestamp` may also be epoch milliseconds; ISO timestamps with an offset
+or "Z" are converted to naive UTC, like epoch milliseconds. The vitals may
+be nested under "vitals". Numeric vitals are coerced (a fractional SBP is
+rounded) and AVPU must be one of A, C, V, P, U; events that fail are
+counted as parse errors and skipped. A vital that is absent or null is
+passed on as None, never as a default, so the safety rules escalate the
+reading (or the agent rejects it, counted as a step error). Resource updates use {"type": "resources", ...} with the
+ResourceState fields and apply to all readings that follow them;
+{"type": "discharge", "patient_id": "P1"} drops the patient's agent.
+
+Run from the healthcare_agent directory:
+    python -m dss_agent.ingest feed.jsonl
+    python -m dss_agent.ingest --tcp 0.0.0.0:9000
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .agent import WardAgent
+from .models import AVPU_LEVELS, INTEGER_VITALS, VITAL_FIELDS, Vitals, ResourceState, from_epoch_ms
+
+_CLOSE = object()
+
+def _number(name: str, value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite, got {value!r}")
+    return number
+
+def _coerce_vital(name: str, value: Any) -> Any:
+    if name == "avpu":
+        level = value.strip().upper() if isinstance(value, str) else None
+        if not level or len(level) != 1 or level not in AVPU_LEVELS:
+            raise ValueError(f"avpu must be one of {', '.join(AVPU_LEVELS)}, got {value!r}")
+        return level
+    if name in INTEGER_VITALS:
+        return int(round(_number(name, value)))
+    return _number(name, value)
+
+def parse_event(event: Union[str, bytes, Dict[str, Any]]) -> Tuple[str, Any]:
+    """
+    Parses one feed event.
+    Returns ("vitals", (patient_id, vitals)), ("resources", ResourceState)
+    or ("discharge", patient_id).
+    """
+    if not isinstance(event, dict):
+        event = json.loads(event)
+
+    if event.get("type") == "discharge":
+        return "discharge", str(event["patient_id"])
+
+    if event.get("type") == "resources":
+        return "resources", ResourceState(
+            icu_beds_available=int(event["icu_beds_available"]),
+            rrt_available=bool(event.get("rrt_available", True)),
+            nurse_load=float(event["nurse_load"]),
+            transport_delay_minutes=int(event["transport_delay_minutes"]),
+            specialist_available=bool(event.get("specialist_available", True))
+        )
+
+    fields = event.get("vitals", event)
+    values = {name: None if fields.get(name) is None else _coerce_vital(name, fields[name])
+              for name in VITAL_FIELDS}
+    timestamp = event.get("timestamp", fields.get("timestamp"))
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        values["timestamp"] = timestamp
+    elif timestamp is not None:
+        values["timestamp"] = from_epoch_ms(int(timestamp))
+    vitals = Vitals(**values)
+    return "vitals", (str(event["patient_id"]), vitals)
+
+def _signature(recs: List[Dict[str, Any]]) -> tuple:
+    return tuple((r["action"], r["emergent"], r.get("intent")) for r in recs)
+
+class StreamIngestor:
+    """
+    Bounded-queue ingestion stage in front of a WardAgent.
+
+    Producers call `await submit(event)`, which blocks while the queue is
+    full. `run()` drains the queue in micro-batches of up to `max_batch`
+    readings (each patient at most once per batch, so no reading is
+    coalesced away), evaluates them with WardAgent.run_batch, and calls
+    `on_recommendation(patient_id, recs)` when a patient's recommendation
+    set changes, or on every emergent reading if `always_emit_emergent`.
+    """
+    def __init__(self, resource_state: ResourceState, ward: Optional[WardAgent] = None,
+                 on_recommendation: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                 queue_size: int = 10_000, max_batch: int = 2048, always_emit_emergent: bool = True):
+        self.ward = ward if ward is not None else WardAgent()
+        self.resource_state = resource_state
+        self.on_recommendation = on_recommendation or (lambda patient_id, recs: None)
+        self.max_batch = max_batch
+        self.always_emit_emergent = always_emit_emergent
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=queue_size)
+        self._last_emitted: Dict[str, tuple] = {}
+
+        self.events = 0
+        self.batches = 0
+        self.emitted = 0
+        self.emergent = 0
+        self.parse_errors = 0
+        self.step_errors = 0
+        self.max_queue_depth = 0
+
+    # -- Producers ----------------------------------------------------------
+
+    async def submit(self, event: Union[str, bytes, Dict[str, Any]]):
+        """
+        Queues one raw event, waiting while the queue is full.
+        """
+        await self.queue.put(event)
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    async def close(self):
+        """
+        Signals end of stream; run() returns once everything queued is processed.
+        """
+        await self.queue.put(_CLOSE)
+
+    async def feed_file(self, path: str):
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    await self.submit(line)
+
+    async def feed_stream(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.strip():
+                await self.submit(line)
+
+    async def serve_tcp(self, host: str, port: int) -> asyncio.AbstractServer:
+        """
+        Accepts monitor connections, one JSON event per line.
+        """
+        async def handle(reader, writer):
+            try:
+                await self.feed_stream(reader)
+            finally:
+                writer.close()
+        return await asyncio.start_server(handle, host, port)
+
+    # -- Consumer -----------------------------------------------------------
+
+    async def run(self):
+        queue = self.queue
+        while True:
+            batch = []
+            seen = set()
+            event = await queue.get()
+            while True:
+                if event is _CLOSE:
+                    self._process(batch)
+                    return
+                try:
+                    kind, payload = parse_event(event)
+                except (ValueError, KeyError, TypeError) as e:
+                    self.parse_errors += 1
+                    print(f"Skipping malformed event: {e!r}", file=sys.stderr)
+                    kind = None
+
+                if kind == "resources":
+                    # Readings already queued were taken under the old state
+                    self._process(batch)
+                    batch, seen = [], set()
+                    self.resource_state = payload
+                elif kind == "discharge":
+                    self._process(batch)
+                    batch, seen = [], set()
+                    self.ward.discharge(payload)
+                    self._last_emitted.pop(payload, None)
+                elif kind == "vitals":
+                    if payload[0] in seen:
+                        self._process(batch)
+                        batch, seen = [], set()
+                    batch.append(payload)
+                    seen.add(payload[0])
+
+                if len(batch) >= self.max_batch or queue.empty():
+                    break
+                event = queue.get_nowait()
+
+            self._process(batch)
+            # Let producers refill the queue between batches
+            await asyncio.sleep(0)
+
+    def _process(self, batch: List[Tuple[str, Any]]):
+        if not batch:
+            return
+        self.events += len(batch)
+        self.batches += 1
+        try:
+            results = self.ward.run_batch(batch, self.resource_state)
+            for patient_id, error in self.ward.failed_patients.items():
+                self.step_errors += 1
+                print(f"Skipping reading for {patient_id}: {error}", file=sys.stderr)
+        except Exception as e:
+            # Retry patient by patient so one failing reading cannot hold up
+            # the others (a reading repeated with the same timestamp replaces
+            # the partly applied one)
+            print(f"Batch of {len(batch)} failed ({e!r}); retrying per patient", file=sys.stderr)
+            results = {}
+            for reading in batch:
+                try:
+                    results.update(self.ward.run_batch([reading], self.resource_state))
+                except Exception as e:
+                    self.step_errors += 1
+                    print(f"Skipping reading for {reading[0]}: {e!r}", file=sys.stderr)
+        for patient_id, recs in results.items():
+            signature = _signature(recs)
+            emergent = bool(recs) and recs[0]["emergent"]
+            if emergent:
+                self.emergent += 1
+            if signature != self._last_emitted.get(patient_id) or (emergent and self.always_emit_emergent):
+                self._last_emitted[patient_id] = signature
+                self.emitted += 1
+                self.on_recommendation(patient_id, recs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream vitals events into the escalation agent.")
+    parser.add_argument("path", nargs="?", help="JSON-lines feed file")
+    parser.add_argument("--tcp", help="listen on HOST:PORT instead of reading a file")
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--icu-beds", type=int, default=2)
+    parser.add_argument("--nurse-load", type=float, default=0.6)
+    parser.add_argument("--transport-delay", type=int, default=20)
+    args = parser.parse_args()
+    if not args.path and not args.tcp:
+        parser.error("give a feed file or --tcp HOST:PORT")
+
+    def emit(patient_id, recs):
+        print(json.dumps({"patient_id": patient_id, "recommendations": recs}), flush=True)
+
+    async def run():
+        ingestor = StreamIngestor(
+            ResourceState(icu_beds_available=args.icu_beds, rrt_available=True,
+                          nurse_load=args.nurse_load, transport_delay_minutes=args.transport_delay),
+            on_recommendation=emit, queue_size=args.queue_size
+        )
+        consumer = asyncio.create_task(ingestor.run())
+        if args.tcp:
+            host, port = args.tcp.rsplit(":", 1)
+            server = await ingestor.serve_tcp(host, int(port))
+            async with server:
+                await server.serve_forever()
+        else:
+            await ingestor.feed_file(args.path)
+            await ingestor.close()
+            await consumer
+            print(f"events={ingestor.events} emitted={ingestor.emitted} emergent={ingestor.emergent} "
+                  f"parse_errors={ingestor.parse_errors} step_errors={ingestor.step_errors}", file=sys.stderr)
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
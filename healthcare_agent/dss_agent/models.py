@@ -1,75 +1,250 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict
-from datetime import datetime
-from enum import Enum
-
-class RiskLevel(Enum):
-    LOW = "Low"
-    MEDIUM = "Medium"
-    HIGH = "High"
-    CRITICAL = "Critical"
-
-@dataclass
-class Vitals:
-    avpu: str = "A"
-    sbp: int = 120
-    spo2: int = 98
-    rr: int = 16
-    hr: int = 80
-    temp: float = 37.0
-    news2: int = 0
-    timestamp: datetime = field(default_factory=datetime.now)
-
-@dataclass
-class PatientBeliefState:
-    patient_id: str
-    current_vitals: Vitals
-    history: List[Vitals] = field(default_factory=list)
-    active_interventions: List[str] = field(default_factory=list)
-    # Extracted signals from notes (simulated for now)
-    notes_signals: Dict[str, str] = field(default_factory=dict) 
-
-@dataclass
-class ResourceState:
-    icu_beds_available: int
-    rrt_available: bool
-    nurse_load: float  # 0.0 to 1.0 (or >1.0 if overloaded)
-    transport_delay_minutes: int
-    specialist_available: bool = True
-
-@dataclass
-class Cost:
-    level: str  # "Low", "Medium", "High"
-    explanation: str
-
-@dataclass
-class Recommendation:
-    action: str
-    rationale: str
-    expected_benefit: str
-    cost: Cost
-    confidence: float
-    emergent: bool
-    rank: int = 0
-    intent: str = "escalate" # "monitor" or "escalate"
-    next_check_in_minutes: Optional[int] = None
-    memory_narrative: List[str] = field(default_factory=list)
-    counterfactual_analysis: Optional[Dict[str, Any]] = field(default=None)
-    
-    def to_dict(self):
-        return {
-            "action": self.action,
-            "rationale": self.rationale,
-            "expected_benefit": self.expected_benefit,
-            "cost": {
-                "level": self.cost.level,
-                "explanation": self.cost.explanation
-            },
-            "confidence": self.confidence,
-            "emergent": self.emergent,
-            "rank": self.rank,
-            "intent": self.intent,
-            "next_check_in_minutes": self.next_check_in_minutes,
-            "memory_narrative": self.memory_narrative,
-            "counterfactual_analysis": self.counterfactual_analysis
-        }
+import math
+import struct
+from dataclasses import dataclass, field, replace
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+def to_epoch_ms(dt: datetime) -> int:
+    """
+    Converts a timestamp to integer epoch milliseconds.
+    Naive datetimes (the agent's default) are treated as wall-clock time.
+    """
+    if dt.tzinfo is None:
+        return (dt - _EPOCH) // _MILLISECOND
+    return (dt - _EPOCH_UTC) // _MILLISECOND
+
+def from_epoch_ms(ms: int) -> datetime:
+    """
+    Inverse of to_epoch_ms. Always returns a naive datetime.
+    """
+    return _EPOCH + timedelta(milliseconds=ms)
+
+# Consciousness levels (ACVPU: C is new confusion)
+AVPU_LEVELS = "ACVPU"
+
+# Vitals fields stored as integers
+INTEGER_VITALS = ("sbp", "spo2", "rr", "hr", "news2")
+
+# Every measured field, in storage order
+VITAL_FIELDS = ("avpu", "sbp", "spo2", "rr", "hr", "temp", "news2")
+
+def prepare_vitals(vitals) -> Tuple[Any, Tuple[str, ...]]:
+    """
+    Checks a reading before the agent takes it in. Fractional values of the
+    integer vitals (e.g. an SBP of 65.0 or 60.5 from a monitor) are rounded.
+    Returns (reading, names of fields that are None); the reading is a
+    copy only if something was rounded. Raises ValueError for values that
+    are present but unusable: AVPU other than one of ACVPU, non-numeric or
+    non-finite numbers, or a missing timestamp.
+    """
+    missing = []
+    rounded = None
+    avpu = vitals.avpu
+    if avpu is None:
+        missing.append("avpu")
+    elif not isinstance(avpu, str) or len(avpu) != 1 or avpu not in AVPU_LEVELS:
+        raise ValueError(f"avpu must be one of {', '.join(AVPU_LEVELS)}, got {avpu!r}")
+    for name in INTEGER_VITALS:
+        value = getattr(vitals, name)
+        if type(value) is int:
+            continue
+        if value is None:
+            missing.append(name)
+        elif type(value) is float and math.isfinite(value):
+            if rounded is None:
+                rounded = {}
+            rounded[name] = int(round(value))
+        else:
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+    temp = vitals.temp
+    if temp is None:
+        missing.append("temp")
+    elif type(temp) not in (int, float) or not math.isfinite(temp):
+        raise ValueError(f"temp must be a number, got {temp!r}")
+    if not isinstance(vitals.timestamp, datetime):
+        raise ValueError(f"timestamp must be a datetime, got {vitals.timestamp!r}")
+    if rounded:
+        vitals = replace(vitals, **rounded)
+    return vitals, tuple(missing)
+
+def validate_vitals(vitals) -> None:
+    """
+    Raises ValueError unless `vitals` (Vitals or CompactVitals) is a
+    complete reading the agent can store as it is: AVPU one of ACVPU,
+    integer SBP, SpO2, RR, HR and NEWS2, numeric temperature and a datetime
+    timestamp.
+    """
+    checked, missing = prepare_vitals(vitals)
+    if missing:
+        raise ValueError(f"Reading is missing {', '.join(missing)}")
+    if checked is not vitals:
+        raise ValueError(f"{', '.join(INTEGER_VITALS)} must be integers")
+
+def missing_vitals(vitals) -> Tuple[str, ...]:
+    """
+    Names of the measured fields that are None in `vitals`.
+    """
+    return tuple(name for name in VITAL_FIELDS if getattr(vitals, name) is None)
+
+class RiskLevel(Enum):
+    LOW = "Low"
+    MEDIUM = "Medium"
+    HIGH = "High"
+    CRITICAL = "Critical"
+
+@dataclass
+class Vitals:
+    avpu: str = "A"
+    sbp: int = 120
+    spo2: int = 98
+    rr: int = 16
+    hr: int = 80
+    temp: float = 37.0
+    news2: int = 0
+    timestamp: datetime = field(default_factory=datetime.now)
+
+class CompactVitals:
+    """
+    Memory-compact, read-only variant of Vitals for high-volume feeds.
+
+    All fields are packed into one bytes record (AVPU char, unsigned small
+    ints, float32 temperature, epoch-ms timestamp). Attribute access matches
+    Vitals, so perception and reasoning accept either type. Temperature is
+    kept to 0.01 degC; timestamps to the millisecond.
+    """
+    __slots__ = ("_record",)
+
+    # avpu, sbp, spo2, rr, hr, temp, news2, timestamp_ms  (byte offsets 0, 1, 3, 4, 5, 7, 11, 12)
+    _RECORD = struct.Struct("<cHBBHfBq")
+    _U16 = struct.Struct("<H")
+    _F32 = struct.Struct("<f")
+    _I64 = struct.Struct("<q")
+
+    def __init__(self, avpu: str = "A", sbp: int = 120, spo2: int = 98, rr: int = 16, hr: int = 80,
+                 temp: float = 37.0, news2: int = 0, timestamp: Optional[datetime] = None,
+                 timestamp_ms: Optional[int] = None):
+        if timestamp_ms is None:
+            timestamp_ms = to_epoch_ms(timestamp if timestamp is not None else datetime.now())
+        try:
+            self._record = self._RECORD.pack(avpu.encode("ascii"), sbp, spo2, rr, hr, temp, news2, timestamp_ms)
+        except struct.error as e:
+            raise ValueError(f"Vitals out of range for compact storage: {e}") from None
+
+    @classmethod
+    def from_vitals(cls, vitals: Vitals) -> "CompactVitals":
+        return cls(vitals.avpu, vitals.sbp, vitals.spo2, vitals.rr, vitals.hr, vitals.temp, vitals.news2,
+                   timestamp=vitals.timestamp)
+
+    def to_vitals(self) -> Vitals:
+        return Vitals(avpu=self.avpu, sbp=self.sbp, spo2=self.spo2, rr=self.rr, hr=self.hr,
+                      temp=self.temp, news2=self.news2, timestamp=self.timestamp)
+
+    @property
+    def avpu(self) -> str:
+        return self._record[0:1].decode("ascii")
+
+    @property
+    def sbp(self) -> int:
+        return self._U16.unpack_from(self._record, 1)[0]
+
+    @property
+    def spo2(self) -> int:
+        return self._record[3]
+
+    @property
+    def rr(self) -> int:
+        return self._record[4]
+
+    @property
+    def hr(self) -> int:
+        return self._U16.unpack_from(self._record, 5)[0]
+
+    @property
+    def temp(self) -> float:
+        return round(self._F32.unpack_from(self._record, 7)[0], 2)
+
+    @property
+    def news2(self) -> int:
+        return self._record[11]
+
+    @property
+    def timestamp_ms(self) -> int:
+        return self._I64.unpack_from(self._record, 12)[0]
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_epoch_ms(self.timestamp_ms)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactVitals):
+            return self._record == other._record
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._record)
+
+    def __repr__(self):
+        return (f"CompactVitals(avpu={self.avpu!r}, sbp={self.sbp}, spo2={self.spo2}, rr={self.rr}, "
+                f"hr={self.hr}, temp={self.temp}, news2={self.news2}, timestamp={self.timestamp!r})")
+
+@dataclass
+class PatientBeliefState:
+    patient_id: str
+    current_vitals: Vitals
+    # WorldModel stores a bounded VitalsHistory here; a plain list also works
+    history: Sequence[Vitals] = field(default_factory=list)
+    active_interventions: List[str] = field(default_factory=list)
+    # Start time of each active intervention, where known (see WorldModel.start_intervention)
+    intervention_times: Dict[str, datetime] = field(default_factory=dict)
+    # Extracted signals from notes (simulated for now)
+    notes_signals: Dict[str, str] = field(default_factory=dict) 
+
+@dataclass
+class ResourceState:
+    icu_beds_available: int
+    rrt_available: bool
+    nurse_load: float  # 0.0 to 1.0 (or >1.0 if overloaded)
+    transport_delay_minutes: int
+    specialist_available: bool = True
+
+@dataclass
+class Cost:
+    level: str  # "Low", "Medium", "High"
+    explanation: str
+
+@dataclass
+class Recommendation:
+    action: str
+    rationale: str
+    expected_benefit: str
+    cost: Cost
+    confidence: float
+    emergent: bool
+    rank: int = 0
+    intent: str = "escalate" # "monitor" or "escalate"
+    next_check_in_minutes: Optional[int] = None
+    memory_narrative: Sequence[str] = ()
+    counterfactual_analysis: Optional[Dict[str, Any]] = field(default=None)
+    
+    def to_dict(self):
+        return {
+            "action": self.action,
+            "rationale": self.rationale,
+            "expected_benefit": self.expected_benefit,
+            "cost": {
+                "level": self.cost.level,
+                "explanation": self.cost.explanation
+            },
+            "confidence": self.confidence,
+            "emergent": self.emergent,
+            "rank": self.rank,
+            "intent": self.intent,
+            "next_check_in_minutes": self.next_check_in_minutes,
+            "memory_narrative": list(self.memory_narrative),
+            "counterfactual_analysis": self.counterfactual_analysis
+        }
@@ -0,0 +1,235 @@
+"""
+Incremental trend statistics per patient.
+Each reading updates an EWMA, an exponentially weighted variance, direction
+streaks and time-windowed least-squares slopes for every vital in O(1)
+(amortised), independent of how long the patient has been monitored.
+"""
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Union
+from ..models import Vitals, CompactVitals, to_epoch_ms
+
+TRACKED_VITALS = ("sbp", "spo2", "rr", "hr", "temp", "news2")
+
+# (vital, direction, minimum rate per hour over the longest window, signal name)
+# direction -1 flags a fall, +1 a rise.
+SUSTAINED_RULES = (
+    ("sbp", -1, 10.0, "Sustained SBP decline"),
+    ("spo2", -1, 2.0, "Sustained SpO2 decline"),
+    ("rr", 1, 4.0, "Sustained RR rise"),
+)
+
+class TrendEngine:
+    """
+    Rolling trend statistics for one patient.
+
+    update() takes each new reading in time order; a reading with the same
+    timestamp as the previous one replaces it. `windows_minutes` sets the
+    slope windows; the longest one is used for sustained-trend detection,
+    together with `min_streak` consecutive moves in the same direction, so
+    a single large drop is not reported as a sustained decline.
+
+    Window sums come from one log of running totals shared by all windows:
+    each window only keeps the index where it starts, and the log is trimmed
+    to the longest window.
+    """
+    def __init__(self, windows_minutes: Sequence[float] = (15, 60), alpha: float = 0.3,
+                 min_streak: int = 3):
+        if not windows_minutes:
+            raise ValueError("at least one window is required")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.min_streak = min_streak
+        self.windows = tuple(sorted(windows_minutes))
+
+        self.count = 0
+        self._origin_ms: Optional[int] = None
+        self._last_ms: Optional[int] = None
+        zeros = (0,) * len(TRACKED_VITALS)
+        # (ewma, ewvar, last value, falling streak, rising streak), one tuple
+        # entry per vital. Updates build new tuples, so the previous state
+        # doubles as the undo record for a replaced reading.
+        self._state = (zeros, zeros, zeros, zeros, zeros)
+        self._prev_state = None
+        # Running totals after each reading: (t, n, sum t, sum t^2, sum y, sum t*y).
+        # The first entry is the total just before the oldest reading still needed.
+        self._totals = deque([(float("-inf"), 0, 0.0, 0.0, zeros, zeros)])
+        self._dropped = 0
+        # Per window: absolute index of the total just before its first reading
+        self._starts = [0] * len(self.windows)
+
+    def update(self, vitals: Union[Vitals, CompactVitals]):
+        ts = vitals.timestamp_ms if isinstance(vitals, CompactVitals) else to_epoch_ms(vitals.timestamp)
+        if ts == self._last_ms:
+            self._undo_last()
+        if self._origin_ms is None:
+            self._origin_ms = ts
+        # Minutes since the first reading
+        t = (ts - self._origin_ms) / 60000.0
+        ys = (vitals.sbp, vitals.spo2, vitals.rr, vitals.hr, vitals.temp, vitals.news2)
+
+        self._prev_state = state = self._state
+        if self.count == 0:
+            zeros = state[1]
+            self._state = (ys, zeros, ys, zeros, zeros)
+        else:
+            ewma, ewvar, last, down, up = state
+            alpha = self.alpha
+            keep = 1.0 - alpha
+            diffs = [y - m for y, m in zip(ys, ewma)]
+            self._state = (
+                tuple(m + alpha * d for m, d in zip(ewma, diffs)),
+                tuple(keep * (v + alpha * d * d) for v, d in zip(ewvar, diffs)),
+                ys,
+                tuple(n + 1 if y < p else 0 for n, y, p in zip(down, ys, last)),
+                tuple(n + 1 if y > p else 0 for n, y, p in zip(up, ys, last)),
+            )
+
+        totals = self._totals
+        _, n, st, stt, sy, sty = totals[-1]
+        totals.append((t, n + 1, st + t, stt + t * t,
+                       tuple(s + y for s, y in zip(sy, ys)),
+                       tuple(s + t * y for s, y in zip(sty, ys))))
+
+        # Advance each window past readings older than its span
+        dropped = self._dropped
+        starts = self._starts
+        for k, minutes in enumerate(self.windows):
+            cutoff = t - minutes
+            start = starts[k]
+            while totals[start + 1 - dropped][0] < cutoff:
+                start += 1
+            starts[k] = start
+        # The longest window starts earliest; nothing before it is needed
+        while dropped < starts[-1]:
+            totals.popleft()
+            dropped += 1
+        self._dropped = dropped
+
+        self.count += 1
+        self._last_ms = ts
+
+    def _undo_last(self):
+        # The replacement has the same time, so window starts and trimming
+        # are unaffected; only the newest total and the state roll back.
+        self._state = self._prev_state
+        self._prev_state = None
+        self._totals.pop()
+        self.count -= 1
+        if self.count == 0:
+            self._origin_ms = None
+
+    # -- Snapshots ----------------------------------------------------------
+
+    def get_state(self) -> dict:
+        """
+        The engine's full state as plain JSON-serialisable data.
+        """
+        return {
+            "windows": list(self.windows),
+            "alpha": self.alpha,
+            "min_streak": self.min_streak,
+            "count": self.count,
+            "origin_ms": self._origin_ms,
+            "last_ms": self._last_ms,
+            "state": self._state,
+            "prev_state": self._prev_state,
+            "totals": list(self._totals),
+            "dropped": self._dropped,
+            "starts": self._starts,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TrendEngine":
+        """
+        Rebuilds an engine from get_state() output (including its JSON round trip).
+        """
+        engine = cls(state["windows"], state["alpha"], state["min_streak"])
+        engine.count = state["count"]
+        engine._origin_ms = state["origin_ms"]
+        engine._last_ms = state["last_ms"]
+        engine._state = tuple(tuple(column) for column in state["state"])
+        prev_state = state["prev_state"]
+        engine._prev_state = None if prev_state is None else tuple(tuple(column) for column in prev_state)
+        engine._totals = deque((t, n, st, stt, tuple(sy), tuple(sty)) for t, n, st, stt, sy, sty in state["totals"])
+        engine._dropped = state["dropped"]
+        engine._starts = list(state["starts"])
+        return engine
+
+    # -- Window statistics --------------------------------------------------
+
+    def _window(self, minutes: Optional[float]) -> int:
+        if minutes is None:
+            return len(self.windows) - 1
+        return self.windows.index(minutes)
+
+    def samples(self, minutes: Optional[float] = None) -> int:
+        """
+        Number of readings in the window of `minutes` (default: longest).
+        """
+        base = self._totals[self._starts[self._window(minutes)] - self._dropped]
+        return self._totals[-1][1] - base[1]
+
+    def _slope(self, k: int, column: int) -> Optional[float]:
+        """
+        Least-squares slope per minute in window k, or None with fewer than two distinct times.
+        """
+        head = self._totals[-1]
+        base = self._totals[self._starts[k] - self._dropped]
+        n = head[1] - base[1]
+        st = head[2] - base[2]
+        denom = n * (head[3] - base[3]) - st * st
+        if n < 2 or denom <= 1e-9:
+            return None
+        sy = head[4][column] - base[4][column]
+        sty = head[5][column] - base[5][column]
+        return (n * sty - st * sy) / denom
+
+    def slope_per_hour(self, vital: str, minutes: Optional[float] = None) -> Optional[float]:
+        """
+        Slope of `vital` per hour over the window of `minutes` (default: longest).
+        """
+        slope = self._slope(self._window(minutes), TRACKED_VITALS.index(vital))
+        return None if slope is None else slope * 60.0
+
+    # -- Signals ------------------------------------------------------------
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        EWMA, variance, window slopes (per hour) and streaks for every vital.
+        """
+        ewma, ewvar, _, down, up = self._state
+        result = {}
+        for i, vital in enumerate(TRACKED_VITALS):
+            slopes = {}
+            for k, minutes in enumerate(self.windows):
+                slope = self._slope(k, i)
+                slopes[minutes] = None if slope is None else round(slope * 60.0, 3)
+            result[vital] = {
+                "ewma": round(ewma[i], 3),
+                "variance": round(ewvar[i], 3),
+                "slope_per_hour": slopes,
+                "falling_streak": down[i],
+                "rising_streak": up[i],
+            }
+        return result
+
+    def sustained_trends(self) -> List[str]:
+        """
+        Signal names for vitals that have moved steadily in a worrying
+        direction over the longest window.
+        """
+        if self.count < self.min_streak + 1:
+            return []
+        longest = len(self.windows) - 1
+        _, _, _, down, up = self._state
+        found = []
+        for vital, direction, rate, name in SUSTAINED_RULES:
+            column = TRACKED_VITALS.index(vital)
+            streak = down[column] if direction < 0 else up[column]
+            if streak < self.min_streak:
+                continue
+            slope = self._slope(longest, column)
+            if slope is not None and slope * 60.0 * direction >= rate:
+                found.append(name)
+        return found
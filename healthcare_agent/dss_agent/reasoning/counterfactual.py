@@ -2,84 +2,179 @@
 Counterfactual reasoning module for clinical decision support.
 Estimates the potential risk increase if recommended actions are delayed.
 """
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Sequence, Tuple, Union
 
-def analyze_counterfactual(
-    current_risk: float,
-    delay_minutes: int,
-    active_signals: List[str]
-) -> Dict[str, Any]:
+# Base configuration: linear risk drift per minute
+# A base rate of 0.001 means 60 mins = 0.06 risk increase (6%)
+BASE_RISK_PER_MINUTE = 0.001
+
+# Multipliers for specific high-risk signals
+# These effectively start the "clock" faster
+# Lookups are memoized; call _drivers.cache_clear() and _analysis.cache_clear()
+# after changing this table at runtime.
+SIGNAL_MULTIPLIERS = {
+    "rapid_deterioration": 3.0,
+    "sepsis_alert": 2.0,
+    "emergent_safety_trigger": 5.0,
+    "unstable_trend": 1.5,
+    "hypoxia": 2.0,
+    "hypotension": 2.5,
+    "Rapid SBP drop": 2.5,
+    "Rapid RR rise": 2.0,
+    "Significant SpO2 drop": 2.0,
+    "Sustained SBP decline": 2.5,
+    "Sustained SpO2 decline": 2.0,
+    "Sustained RR rise": 2.0,
+    "SBP below pre-intervention baseline": 2.5,
+    "RR above pre-intervention baseline": 2.0,
+    "SpO2 below pre-intervention baseline": 2.0,
+    "overdue_review": 1.5
+}
+
+# Bit i of a signal mask stands for SIGNAL_NAMES[i]
+SIGNAL_NAMES = tuple(SIGNAL_MULTIPLIERS)
+
+# Default delays for a "cost of waiting" curve: 0-240 min in 15 min steps
+DEFAULT_CURVE_DELAYS = tuple(range(0, 241, 15))
+
+@lru_cache(maxsize=1024)
+def _drivers(active_signals: Tuple[str, ...]) -> Tuple[float, Tuple[str, ...]]:
     """
-    Estimates projected risk increase over time if action is delayed.
-    
-    Args:
-        current_risk: Current risk score (0.0 to 1.0).
-        delay_minutes: Hypothetical delay in minutes.
-        active_signals: List of active signal names (e.g. from trends or alerts).
-        
-    Returns:
-        Dict containing projected risk, change, drivers, and summary.
+    Returns (multiplier, key drivers) for a signal set.
+    The multiplier is the highest-impact driver; every known signal is listed
+    as a driver, in the order given.
     """
-    
-    # Base configuration: linear risk drift per minute
-    # A base rate of 0.001 means 60 mins = 0.06 risk increase (6%)
-    BASE_RISK_PER_MINUTE = 0.001  
-    
-    # Multipliers for specific high-risk signals
-    # These effectively start the "clock" faster
-    SIGNAL_MULTIPLIERS = {
-        "rapid_deterioration": 3.0,
-        "sepsis_alert": 2.0,
-        "emergent_safety_trigger": 5.0,
-        "unstable_trend": 1.5,
-        "hypoxia": 2.0,
-        "hypotension": 2.5,
-        "Rapid SBP drop": 2.5,
-        "Rapid RR rise": 2.0,
-        "Significant SpO2 drop": 2.0,
-        "overdue_review": 1.5
-    }
-    
-    # Calculate effective deterioration rate
     multiplier = 1.0
     key_drivers = []
-    
-    # Identify the highest impact driver
     for signal in active_signals:
         if signal in SIGNAL_MULTIPLIERS:
             if SIGNAL_MULTIPLIERS[signal] > multiplier:
                 multiplier = SIGNAL_MULTIPLIERS[signal]
             key_drivers.append(signal)
+    return multiplier, tuple(key_drivers)
 
-    # Filter key_drivers to only those that actually increased the multiplier
-    # Or just list all significant ones? Listing all active high-risk signals is better for explanation.
-    # Let's keep all active signals that are in our dictionary as drivers.
-    
+@lru_cache(maxsize=4096)
+def _analysis(current_risk: float, delay_minutes: int, active_signals: Tuple[str, ...]) -> Tuple[float, float, Tuple[str, ...], str]:
+    multiplier, key_drivers = _drivers(active_signals)
     effective_rate = BASE_RISK_PER_MINUTE * multiplier
-    
-    # Calculate projected risk
-    risk_increase = effective_rate * delay_minutes
-    projected_risk = current_risk + risk_increase
-    
-    # Cap at 1.0
-    projected_risk = min(1.0, projected_risk)
-    
+
+    # Calculate projected risk, capped at 1.0
+    projected_risk = min(1.0, current_risk + effective_rate * delay_minutes)
+
     # Recalculate actual change after cap
     actual_change = projected_risk - current_risk
-    
+
     # Generate summary string
     summary = f"Delay of {delay_minutes} min projected to increase risk by {actual_change:.2f}."
     if key_drivers:
         summary += f" Driven by: {', '.join(key_drivers)}."
     else:
         summary += " Due to baseline physiologic drift."
-        
+
     if projected_risk >= 1.0:
         summary += " Warning: Risk reaches critical saturation."
 
+    return round(projected_risk, 3), round(actual_change, 3), key_drivers, summary
+
+def analyze_counterfactual(
+    current_risk: float,
+    delay_minutes: int,
+    active_signals: List[str]
+) -> Dict[str, Any]:
+    """
+    Estimates projected risk increase over time if action is delayed.
+    Results are memoized on (risk, delay, signals); each call returns a new dict.
+
+    Args:
+        current_risk: Current risk score (0.0 to 1.0).
+        delay_minutes: Hypothetical delay in minutes.
+        active_signals: List of active signal names (e.g. from trends or alerts).
+
+    Returns:
+        Dict containing projected risk, change, drivers, and summary.
+    """
+    projected_risk, risk_change, key_drivers, summary = _analysis(current_risk, delay_minutes, tuple(active_signals))
     return {
-        "projected_risk": round(projected_risk, 3),
-        "risk_change": round(actual_change, 3),
-        "key_drivers": key_drivers,
+        "projected_risk": projected_risk,
+        "risk_change": risk_change,
+        "key_drivers": list(key_drivers),
         "summary": summary
     }
+
+def risk_curve(
+    current_risk: float,
+    active_signals: Sequence[str],
+    delays: Iterable[int] = DEFAULT_CURVE_DELAYS
+) -> Dict[str, Any]:
+    """
+    Projects risk for every delay in one call, e.g. for a "cost of waiting"
+    chart. Values match analyze_counterfactual at each delay.
+
+    Returns:
+        Dict with parallel "delays", "projected_risk" and "risk_change" lists,
+        plus the "key_drivers" shared by every point.
+    """
+    multiplier, key_drivers = _drivers(tuple(active_signals))
+    rate = BASE_RISK_PER_MINUTE * multiplier
+    delays = list(delays)
+    projected = [min(1.0, current_risk + rate * d) for d in delays]
+    return {
+        "delays": delays,
+        "projected_risk": [round(p, 3) for p in projected],
+        "risk_change": [round(p - current_risk, 3) for p in projected],
+        "key_drivers": list(key_drivers)
+    }
+
+def signal_mask(active_signals: Iterable[str]) -> int:
+    """
+    Encodes a signal list as a bitmask over SIGNAL_NAMES. Unknown signals
+    carry no multiplier and are left out.
+    """
+    mask = 0
+    for signal in active_signals:
+        if signal in SIGNAL_MULTIPLIERS:
+            mask |= 1 << SIGNAL_NAMES.index(signal)
+    return mask
+
+@lru_cache(maxsize=1024)
+def _mask_multiplier(mask: int) -> float:
+    multiplier = 1.0
+    for i, name in enumerate(SIGNAL_NAMES):
+        if mask >> i & 1 and SIGNAL_MULTIPLIERS[name] > multiplier:
+            multiplier = SIGNAL_MULTIPLIERS[name]
+    return multiplier
+
+def what_if_matrix(
+    current_risks: Sequence[float],
+    delays: Sequence[int],
+    signals: Sequence[Union[int, Sequence[str]]]
+) -> List[Tuple[float, ...]]:
+    """
+    Projected risk for every patient at every delay, for what-if sweeps
+    such as "every patient on the ward waits 30/60/120 min".
+
+    Args:
+        current_risks: One current risk (0.0 to 1.0) per patient.
+        delays: Delays in minutes, shared by all patients.
+        signals: One signal mask (see signal_mask) or signal list per patient.
+
+    Returns:
+        One row per patient, one projected risk per delay. Values match
+        analyze_counterfactual(...)["projected_risk"]. Rows are tuples and
+        patients with the same risk and multiplier share the same row.
+    """
+    if len(current_risks) != len(signals):
+        raise ValueError("current_risks and signals must have one entry per patient")
+    delays = tuple(delays)
+    rows: Dict[Tuple[float, float], Tuple[float, ...]] = {}
+    matrix = []
+    for risk, active in zip(current_risks, signals):
+        mask = active if isinstance(active, int) else signal_mask(active)
+        rate = BASE_RISK_PER_MINUTE * _mask_multiplier(mask)
+        key = (risk, rate)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = tuple(round(min(1.0, risk + rate * d), 3) for d in delays)
+        matrix.append(row)
+    return matrix
@@ -1,48 +1,161 @@
-"""
-Module for generating memory-based narrative explanations.
-Compares current state to historical state to highlight changes.
-"""
-from typing import List
-from ..models import Vitals
-
-def generate_memory_narrative(history: List[Vitals], current: Vitals) -> List[str]:
-    """
-    Generates a list of strings describing changes since the last assessment.
-    """
-    narrative = []
-    
-    if not history:
-        narrative.append("Initial assessment - no prior history.")
-        return narrative
-        
-    last = history[-1]
-    
-    # Check NEWS2 change
-    if current.news2 != last.news2:
-        direction = "increased" if current.news2 > last.news2 else "decreased"
-        narrative.append(f"NEWS2 score {direction} from {last.news2} -> {current.news2}")
-    
-    # Check RR change (significant if >= 4 change? or just any change?)
-    # Requirement: "Respiratory rate increased from 22 -> 28"
-    if abs(current.rr - last.rr) >= 2:
-        direction = "increased" if current.rr > last.rr else "decreased"
-        narrative.append(f"Respiratory rate {direction} from {last.rr} -> {current.rr}")
-        
-    # Check SpO2 change
-    if abs(current.spo2 - last.spo2) >= 3:
-        direction = "dropped" if current.spo2 < last.spo2 else "improved"
-        narrative.append(f"SpO2 {direction} from {last.spo2}% -> {current.spo2}%")
-        
-    # Check SBP change
-    if abs(current.sbp - last.sbp) >= 15:
-         direction = "dropped" if current.sbp < last.sbp else "rose"
-         narrative.append(f"Systolic BP {direction} from {last.sbp} -> {current.sbp}")
-         
-    # AVPU change
-    if current.avpu != last.avpu:
-        narrative.append(f"Consciousness level changed from {last.avpu} -> {current.avpu}")
-
-    if not narrative:
-        narrative.append("Vital signs remain stable since last assessment.")
-        
-    return narrative
+"""
+Module for generating memory-based narrative explanations.
+Compares current state to historical state to highlight changes: against
+the previous reading, and against the readings 1h, 6h and 24h back so a
+slow drift shows up even when no single step crosses a threshold.
+"""
+from datetime import timedelta
+from typing import List, Sequence, Tuple
+from ..history import VitalsHistory
+from ..models import Vitals, to_epoch_ms
+
+_MILLISECOND = timedelta(milliseconds=1)
+
+# Smallest change that makes the narrative (NEWS2 and AVPU: any change)
+RR_CHANGE = 2
+SPO2_CHANGE = 3
+SBP_CHANGE = 15
+
+STABLE_LINE = "Vital signs remain stable since last assessment."
+INITIAL_LINE = "Initial assessment - no prior history."
+
+# Lookback windows summarised after the last-reading comparison
+DEFAULT_HORIZONS = (timedelta(hours=1), timedelta(hours=6), timedelta(hours=24))
+
+# Vitals the narrative tracks, in narrative order, with their change
+# threshold (None: any change)
+TRACKED = (("news2", None), ("rr", RR_CHANGE), ("spo2", SPO2_CHANGE), ("sbp", SBP_CHANGE), ("avpu", None))
+_TRACKED_NAMES = tuple(name for name, _ in TRACKED)
+
+def describe_change(name: str, old, new) -> str:
+    """
+    The narrative line for one tracked vital changing from `old` to `new`.
+    """
+    if name == "news2":
+        return f"NEWS2 score {'increased' if new > old else 'decreased'} from {old} -> {new}"
+    if name == "rr":
+        return f"Respiratory rate {'increased' if new > old else 'decreased'} from {old} -> {new}"
+    if name == "spo2":
+        return f"SpO2 {'dropped' if new < old else 'improved'} from {old}% -> {new}%"
+    if name == "sbp":
+        return f"Systolic BP {'dropped' if new < old else 'rose'} from {old} -> {new}"
+    return f"Consciousness level changed from {old} -> {new}"
+
+def _changed(old, new, threshold) -> bool:
+    return old != new if threshold is None else abs(new - old) >= threshold
+
+def _horizon_line(horizon: timedelta, name: str, old, new) -> str:
+    minutes = int(horizon.total_seconds() // 60)
+    label = f"{minutes // 60}h" if minutes % 60 == 0 else f"{minutes}min"
+    return f"{describe_change(name, old, new)} over the last {label}"
+
+def generate_memory_narrative(history: Sequence[Vitals], current: Vitals) -> List[str]:
+    """
+    Generates a list of strings describing changes since the last assessment.
+    `history` may be a list or a VitalsHistory; only the newest entry is read.
+    """
+    narrative = []
+    
+    if not history:
+        narrative.append(INITIAL_LINE)
+        return narrative
+        
+    last = history[-1]
+    
+    # e.g. "Respiratory rate increased from 22 -> 28"
+    for name, threshold in TRACKED:
+        old, new = getattr(last, name), getattr(current, name)
+        if _changed(old, new, threshold):
+            narrative.append(describe_change(name, old, new))
+
+    if not narrative:
+        narrative.append(STABLE_LINE)
+        
+    return narrative
+
+def horizon_changes(history: VitalsHistory, current: Vitals, horizons: Sequence[timedelta] = DEFAULT_HORIZONS,
+                    reported: Sequence[str] = ()) -> List[Tuple[timedelta, str, object, object]]:
+    """
+    Tracked vitals that changed past their threshold between the reading at
+    the start of each horizon (the newest one taken at or before
+    now - horizon) and `current`, as (horizon, vital, old, new), shortest
+    horizon first. A vital is reported at its shortest qualifying horizon
+    only, and vitals in `reported` (e.g. already described against the
+    previous reading) are skipped. Horizons the history does not reach
+    back to are skipped.
+
+    Each reference reading is found by binary search over the history's
+    timestamps and read straight from the history's columns, so the cost
+    does not depend on how many days of readings the history holds.
+    """
+    return _horizon_changes(history, current, [(h, h // _MILLISECOND) for h in sorted(horizons)], reported)
+
+def _horizon_changes(history: VitalsHistory, current: Vitals, horizons: Sequence[Tuple[timedelta, int]],
+                     reported: Sequence[str]) -> List[Tuple[timedelta, str, object, object]]:
+    # `horizons`: (horizon, length in ms), shortest first
+    changes = []
+    size = len(history)
+    if not size:
+        return changes
+    reported = set(reported)
+    now_ms = to_epoch_ms(current.timestamp)
+    new_values = [getattr(current, name) for name in _TRACKED_NAMES]
+    for horizon, horizon_ms in horizons:
+        index = history.search(now_ms - horizon_ms, right=True) - 1
+        if index < 0:
+            break
+        if index == size - 1:
+            # Same reference as the last-reading comparison
+            continue
+        old_values = history.values_at(index, _TRACKED_NAMES)
+        for (name, threshold), old, new in zip(TRACKED, old_values, new_values):
+            if name not in reported and (old != new if threshold is None else abs(new - old) >= threshold):
+                changes.append((horizon, name, old, new))
+                reported.add(name)
+    return changes
+
+def generate_horizon_narrative(history: VitalsHistory, current: Vitals,
+                               horizons: Sequence[timedelta] = DEFAULT_HORIZONS,
+                               reported: Sequence[str] = ()) -> List[str]:
+    """
+    Lines describing changes over each horizon, e.g.
+    "SpO2 dropped from 97% -> 91% over the last 6h".
+    """
+    return [_horizon_line(*change) for change in horizon_changes(history, current, horizons, reported)]
+
+class MemoryNarrator:
+    """
+    One patient's memory narrative, kept across steps: changes since the
+    previous reading, followed by slower drifts over each of `horizons`
+    (see horizon_changes; pass () for the previous reading only).
+
+    A step where no tracked vital crossed its change threshold against the
+    previous reading or any horizon (the common case on a stable ward) gets
+    the patient's cached "stable" narrative back without building anything;
+    only a crossing regenerates the lines. The lines are returned as a
+    tuple, so the cached narrative can be shared between steps safely.
+    """
+    __slots__ = ("horizons", "_horizons_ms", "_stable", "rebuilds")
+
+    def __init__(self, horizons: Sequence[timedelta] = DEFAULT_HORIZONS):
+        self.horizons = tuple(sorted(horizons))
+        self._horizons_ms = [(h, h // _MILLISECOND) for h in self.horizons]
+        self._stable = (STABLE_LINE,)
+        self.rebuilds = 0
+
+    def narrative(self, history: VitalsHistory, current: Vitals) -> Tuple[str, ...]:
+        if not history:
+            self.rebuilds += 1
+            return (INITIAL_LINE,)
+        last = history[-1]
+        reported = [name for name, threshold in TRACKED
+                    if _changed(getattr(last, name), getattr(current, name), threshold)]
+        drifts = _horizon_changes(history, current, self._horizons_ms, reported) if self.horizons else ()
+        if not reported and not drifts:
+            return self._stable
+        self.rebuilds += 1
+        lines = [describe_change(name, getattr(last, name), getattr(current, name)) for name in reported]
+        if not lines:
+            lines.append(STABLE_LINE)
+        lines.extend(_horizon_line(*change) for change in drifts)
+        return tuple(lines)
@@ -1,79 +1,198 @@
-from typing import List
-from ..models import PatientBeliefState, ResourceState, Recommendation, Cost
-
-def score_actions(belief_state: PatientBeliefState, resource_state: ResourceState, possible_actions: List[dict]) -> List[Recommendation]:
-    """
-    Scores and ranks possible actions based on risk, resources, and policy.
-    """
-    vitals = belief_state.current_vitals
-    # Normalized risk 0-1
-    base_risk = min(vitals.news2 / 20.0, 1.0)
-    
-    scored_recs = []
-    
-    for action_def in possible_actions:
-        # 1. Filter by minimum risk
-        if base_risk < action_def.get("min_risk", 0.0):
-            continue
-            
-        # 2. Hard resource checks
-        if action_def["action"] == "ICU transfer" and resource_state.icu_beds_available == 0:
-            continue
-            
-        # 3. Conditional logic for specific actions
-        if action_def["action"] == "Prepare transfer plan / bed request":
-            # Only if ICU is full OR risk is high enough to warrant pre-planning but not immediate transfer?
-            # Original logic: if icu_beds > 0 or base_risk < 0.3: continue
-            if resource_state.icu_beds_available > 0 and base_risk < 0.6: # Relaxed slightly for this implementation
-                 continue
-
-        # 4. Calculate Score
-        score = action_def["base_score"] + base_risk * 0.4
-        
-        # Resource penalties
-        if action_def["cost_level"] == "High" and resource_state.nurse_load > 0.9:
-            score -= 0.3
-            
-        if action_def["action"] == "ICU transfer":
-            # Penalty for transport delay (e.g., 0.1 per hour)
-            score -= (resource_state.transport_delay_minutes / 60.0) * 0.1
-            
-        score = max(score, 0.0)
-        
-        # 5. Confidence calibration
-        # Confidence increases with score and risk
-        confidence = min(max(score, 0.3), 1.0)
-        
-        # 6. Rationale generation
-        rationale = _generate_rationale(action_def, belief_state, resource_state, base_risk)
-        
-        rec = Recommendation(
-            action=action_def["action"],
-            rationale=rationale,
-            expected_benefit=action_def["benefit"],
-            cost=Cost(level=action_def["cost_level"], explanation=action_def["cost_exp"]),
-            confidence=round(confidence, 2),
-            emergent=False
-        )
-        scored_recs.append((score, rec))
-        
-    # Sort and rank
-    scored_recs.sort(key=lambda x: x[0], reverse=True)
-    
-    final_recs = []
-    for rank, (score, rec) in enumerate(scored_recs, 1):
-        rec.rank = rank
-        final_recs.append(rec)
-        
-    return final_recs
-
-def _generate_rationale(action_def, belief_state, resource_state, base_risk):
-    risk_desc = "high" if base_risk > 0.6 else "moderate" if base_risk > 0.3 else "low"
-    base = f"Patient has {risk_desc} risk (NEWS2={belief_state.current_vitals.news2})."
-    
-    if action_def["action"] == "ICU transfer":
-        return f"{base} ICU beds: {resource_state.icu_beds_available}. Delay: {resource_state.transport_delay_minutes}m."
-    elif action_def["action"] == "Prepare transfer plan / bed request":
-        return f"{base} ICU full (0 beds). Initiating contingency planning."
-    
-    return base + " " + action_def.get("rationale_template", "Action appropriate for risk level.")
+from dataclasses import dataclass, fields
+from typing import List, Mapping, Sequence, Tuple, Dict
+from ..models import PatientBeliefState, ResourceState, Recommendation, Cost
+
+# Resource gates for the columnar engine
+GATE_NONE = 0
+GATE_ICU_BEDS = 1       # Requires a free ICU bed; penalised by transport delay
+GATE_TRANSFER_PLAN = 2  # Only when ICU is full or risk is high
+
+# Config names for the gates ("gate" key of an action definition)
+GATE_NAMES = {"none": GATE_NONE, "icu_beds": GATE_ICU_BEDS, "transfer_plan": GATE_TRANSFER_PLAN}
+
+# Gates of the built-in actions, used when a definition has no "gate" key
+_DEFAULT_GATES = {"ICU transfer": GATE_ICU_BEDS, "Prepare transfer plan / bed request": GATE_TRANSFER_PLAN}
+
+COST_LEVELS = ("Low", "Medium", "High")
+
+# Rationale of actions without a "rationale_template"
+DEFAULT_RATIONALE = "Action appropriate for risk level."
+# Placeholders a "rationale_template" may use, e.g. "{icu_beds_available}"
+RATIONALE_FIELDS = tuple(f.name for f in fields(ResourceState))
+
+def score_actions(belief_state: PatientBeliefState, resource_state: ResourceState, possible_actions: List[dict]) -> List[Recommendation]:
+    """
+    Scores and ranks possible actions based on risk, resources, and policy.
+    """
+    vitals = belief_state.current_vitals
+    # Normalized risk 0-1
+    base_risk = min(vitals.news2 / 20.0, 1.0)
+    
+    scored_recs = []
+    
+    for action_def in possible_actions:
+        # 1. Filter by minimum risk
+        if base_risk < action_def.get("min_risk", 0.0):
+            continue
+            
+        # 2. Hard resource checks
+        if action_def["action"] == "ICU transfer" and resource_state.icu_beds_available == 0:
+            continue
+            
+        # 3. Conditional logic for specific actions
+        if action_def["action"] == "Prepare transfer plan / bed request":
+            # Only if ICU is full OR risk is high enough to warrant pre-planning but not immediate transfer?
+            # Original logic: if icu_beds > 0 or base_risk < 0.3: continue
+            if resource_state.icu_beds_available > 0 and base_risk < 0.6: # Relaxed slightly for this implementation
+                 continue
+
+        # 4. Calculate Score
+        score = action_def["base_score"] + base_risk * 0.4
+        
+        # Resource penalties
+        if action_def["cost_level"] == "High" and resource_state.nurse_load > 0.9:
+            score -= 0.3
+            
+        if action_def["action"] == "ICU transfer":
+            # Penalty for transport delay (e.g., 0.1 per hour)
+            score -= (resource_state.transport_delay_minutes / 60.0) * 0.1
+            
+        score = max(score, 0.0)
+        
+        # 5. Confidence calibration
+        # Confidence increases with score and risk
+        confidence = min(max(score, 0.3), 1.0)
+        
+        # 6. Rationale generation
+        rationale = _generate_rationale(action_def, belief_state, resource_state, base_risk)
+        
+        rec = Recommendation(
+            action=action_def["action"],
+            rationale=rationale,
+            expected_benefit=action_def["benefit"],
+            cost=Cost(level=action_def["cost_level"], explanation=action_def["cost_exp"]),
+            confidence=round(confidence, 2),
+            emergent=False
+        )
+        scored_recs.append((score, rec))
+        
+    # Sort and rank
+    scored_recs.sort(key=lambda x: x[0], reverse=True)
+    
+    final_recs = []
+    for rank, (score, rec) in enumerate(scored_recs, 1):
+        rec.rank = rank
+        final_recs.append(rec)
+        
+    return final_recs
+
+def _generate_rationale(action_def, belief_state, resource_state, base_risk):
+    risk_desc = "high" if base_risk > 0.6 else "moderate" if base_risk > 0.3 else "low"
+    base = f"Patient has {risk_desc} risk (NEWS2={belief_state.current_vitals.news2})."
+    template = action_def.get("rationale_template", DEFAULT_RATIONALE)
+    return base + " " + template.format(**{name: getattr(resource_state, name) for name in RATIONALE_FIELDS})
+
+
+@dataclass(frozen=True)
+class CompiledActions:
+    """
+    Columnar form of an action table. Column i describes possible_actions[i].
+    """
+    defs: Tuple[Mapping, ...]
+    names: Tuple[str, ...]
+    base_score: Tuple[float, ...]
+    min_risk: Tuple[float, ...]
+    cost_code: Tuple[int, ...]
+    gate: Tuple[int, ...]
+
+    def __len__(self):
+        return len(self.names)
+
+def _gate(action_def: Mapping) -> int:
+    if "gate" in action_def:
+        return GATE_NAMES[action_def["gate"]]
+    return _DEFAULT_GATES.get(action_def["action"], GATE_NONE)
+
+def compile_actions(possible_actions: Sequence[Mapping]) -> CompiledActions:
+    """
+    Compiles the action dicts once into columns so the per-patient loop
+    does no string compares or dict lookups.
+    """
+    return CompiledActions(
+        defs=tuple(possible_actions),
+        names=tuple(a["action"] for a in possible_actions),
+        base_score=tuple(a["base_score"] for a in possible_actions),
+        min_risk=tuple(a.get("min_risk", 0.0) for a in possible_actions),
+        cost_code=tuple(COST_LEVELS.index(a["cost_level"]) for a in possible_actions),
+        gate=tuple(_gate(a) for a in possible_actions),
+    )
+
+def rank_actions(compiled: CompiledActions, base_risks: Sequence[float], resource_state: ResourceState) -> List[List[Tuple[int, float, float]]]:
+    """
+    Scores an N-patients x M-actions matrix.
+    Returns, per patient, the ranked (action_index, score, confidence) rows.
+
+    Scores only depend on base risk and the shared resource state, so each
+    distinct risk value is scored once and its ranking is shared by every
+    patient at that risk. Arithmetic follows score_actions step by step so
+    ranks and confidences match it exactly.
+    """
+    icu_beds = resource_state.icu_beds_available
+    nurse_overloaded = resource_state.nurse_load > 0.9
+    transport_penalty = (resource_state.transport_delay_minutes / 60.0) * 0.1
+    columns = list(zip(range(len(compiled)), compiled.base_score, compiled.min_risk, compiled.cost_code, compiled.gate))
+
+    by_risk: Dict[float, List[Tuple[int, float, float]]] = {}
+    ranked = []
+    for base_risk in base_risks:
+        rows = by_risk.get(base_risk)
+        if rows is None:
+            rows = []
+            for index, base_score, min_risk, cost_code, gate in columns:
+                if base_risk < min_risk:
+                    continue
+                if gate == GATE_ICU_BEDS and icu_beds == 0:
+                    continue
+                if gate == GATE_TRANSFER_PLAN and icu_beds > 0 and base_risk < 0.6:
+                    continue
+                score = base_score + base_risk * 0.4
+                if cost_code == 2 and nurse_overloaded:
+                    score -= 0.3
+                if gate == GATE_ICU_BEDS:
+                    score -= transport_penalty
+                score = max(score, 0.0)
+                rows.append((index, score, round(min(max(score, 0.3), 1.0), 2)))
+            rows.sort(key=lambda row: row[1], reverse=True)
+            by_risk[base_risk] = rows
+        ranked.append(rows)
+    return ranked
+
+def score_actions_batch(belief_states: Sequence[PatientBeliefState], resource_state: ResourceState, compiled: CompiledActions) -> List[List[Recommendation]]:
+    """
+    Columnar equivalent of calling score_actions for every belief state.
+    """
+    base_risks = [min(b.current_vitals.news2 / 20.0, 1.0) for b in belief_states]
+    rankings = rank_actions(compiled, base_risks, resource_state)
+
+    rationales: Dict[Tuple[int, int], str] = {}
+    results = []
+    for belief_state, base_risk, rows in zip(belief_states, base_risks, rankings):
+        news2 = belief_state.current_vitals.news2
+        recs = []
+        for rank, (index, score, confidence) in enumerate(rows, 1):
+            rationale = rationales.get((news2, index))
+            if rationale is None:
+                rationale = _generate_rationale(compiled.defs[index], belief_state, resource_state, base_risk)
+                rationales[(news2, index)] = rationale
+            action_def = compiled.defs[index]
+            recs.append(Recommendation(
+                action=action_def["action"],
+                rationale=rationale,
+                expected_benefit=action_def["benefit"],
+                cost=Cost(level=action_def["cost_level"], explanation=action_def["cost_exp"]),
+                confidence=confidence,
+                emergent=False,
+                rank=rank
+            ))
+        results.append(recs)
+    return results
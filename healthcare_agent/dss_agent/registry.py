@@ -0,0 +1,241 @@
+"""
+Process-wide registry of EscalationAgents keyed by patient_id.
+Lets a server keep each patient's WorldModel across requests so history,
+trends and narratives build up incrementally.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from .agent import EscalationAgent
+from .catalog import default_catalog
+from .history import DEFAULT_CAPACITY
+from .models import Vitals, ResourceState
+from .snapshot import SnapshotReader, write_snapshot
+from .wal import WriteAheadLog
+from .instrumentation import AgentMetrics
+from .encoding import EncodedStep
+from .world_model import WorldModel
+
+T = TypeVar("T")
+
+class AgentRegistry:
+    """
+    LRU cache of agents with idle-TTL eviction.
+
+    The least recently used agent is evicted once `max_agents` is exceeded
+    or the agents' histories together allocate more than
+    `max_history_bytes`, and agents idle for longer than `idle_ttl_seconds`
+    are dropped on access. Histories grow as readings arrive, so the byte
+    budget is checked after every step.
+    All agents share one action table. Steps for the same patient are
+    serialised; different patients run concurrently.
+
+    save_snapshot() / restore_snapshot() carry every patient's WorldModel
+    across a restart. Restore is lazy: a patient's state is decoded from the
+    memory-mapped snapshot on first access.
+    """
+    def __init__(self, max_agents: int = 5000, idle_ttl_seconds: Optional[float] = 6 * 3600,
+                 history_capacity: int = DEFAULT_CAPACITY, clock: Callable[[], float] = time.monotonic,
+                 wal: Optional[WriteAheadLog] = None, metrics: Optional[AgentMetrics] = None,
+                 max_history_bytes: Optional[int] = None):
+        if max_agents < 1:
+            raise ValueError("max_agents must be at least 1")
+        if max_history_bytes is not None and max_history_bytes < 1:
+            raise ValueError("max_history_bytes must be positive")
+        self.max_agents = max_agents
+        self.max_history_bytes = max_history_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.history_capacity = history_capacity
+        self.possible_actions = default_catalog()
+        # Step log shared by every agent
+        self.wal = wal
+        # Stage timings and step counters shared by every agent
+        self.metrics = metrics
+        self._clock = clock
+        self._lock = threading.Lock()
+        # patient_id -> [agent, step lock, last access, history bytes], oldest access first
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # Sum of the entries' history bytes
+        self.history_bytes = 0
+        self.evictions = 0
+        # Restored snapshot and the patients in it not yet loaded
+        self._snapshot: Optional[SnapshotReader] = None
+        self._pending: set = set()
+        self.restored = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, patient_id: str) -> bool:
+        return patient_id in self._entries or patient_id in self._pending
+
+    def get(self, patient_id: str) -> EscalationAgent:
+        """
+        Returns the patient's agent, creating it if needed.
+        """
+        return self._entry(patient_id)[0]
+
+    def peek(self, patient_ids: Iterable[str], read: Callable[[EscalationAgent], T]) -> Dict[str, T]:
+        """
+        Read-only access for queries: calls `read(agent)` under each
+        patient's step lock, so it sees a whole step. Only agents already in
+        memory are read; none is created or restored from a snapshot, and
+        LRU order and idle timers are left as they are. Returns
+        {patient_id: result} for the patients found.
+        """
+        with self._lock:
+            entries = [(patient_id, self._entries.get(patient_id)) for patient_id in patient_ids]
+        results = {}
+        for patient_id, entry in entries:
+            if entry is not None and patient_id not in results:
+                with entry[1]:
+                    results[patient_id] = read(entry[0])
+        return results
+
+    def run_step(self, patient_id: str, vitals: Vitals, resource_state: ResourceState) -> List[Dict[str, Any]]:
+        """
+        Runs one step on the patient's persistent agent.
+        """
+        entry = self._entry(patient_id)
+        with entry[1]:
+            output = entry[0].run_step(vitals, resource_state)
+        self._account(patient_id, entry)
+        return output
+
+    def run_step_encoded(self, patient_id: str, vitals: Vitals, resource_state: ResourceState) -> EncodedStep:
+        """
+        run_step with the output pre-serialized to JSON bytes.
+        """
+        entry = self._entry(patient_id)
+        with entry[1]:
+            step = entry[0].run_step_encoded(vitals, resource_state)
+        self._account(patient_id, entry)
+        return step
+
+    def evict(self, patient_id: str):
+        with self._lock:
+            entry = self._entries.pop(patient_id, None)
+            if entry is not None:
+                self.history_bytes -= entry[3]
+            self._pending.discard(patient_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.history_bytes = 0
+            self._close_snapshot_locked()
+
+    # -- Snapshots ----------------------------------------------------------
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Writes every tracked patient's WorldModel to `path`, including
+        restored patients that have not been accessed yet. Each patient is
+        encoded under its step lock; other patients keep running meanwhile.
+        Returns the number of patients written.
+        """
+        return write_snapshot(path, self._snapshot_world_models())
+
+    def _snapshot_world_models(self) -> Iterator[WorldModel]:
+        with self._lock:
+            entries = list(self._entries.values())
+            pending = [patient_id for patient_id in self._pending if patient_id not in self._entries]
+            reader = self._snapshot
+        # Pending patients first, each decoded under the registry lock so
+        # restore_snapshot() or clear() cannot close the reader mid-load.
+        # A patient loaded meanwhile is written from its live agent.
+        for patient_id in pending:
+            world_model = entry = None
+            with self._lock:
+                if self._snapshot is not reader:
+                    break
+                if patient_id in self._pending:
+                    world_model = reader.load(patient_id)
+                else:
+                    entry = self._entries.get(patient_id)
+            if world_model is not None:
+                yield world_model
+            elif entry is not None:
+                with entry[1]:
+                    yield entry[0].world_model
+        for agent, step_lock, _, _ in entries:
+            with step_lock:
+                yield agent.world_model
+
+    def restore_snapshot(self, path: str) -> int:
+        """
+        Makes the patients in the snapshot at `path` available. Patients
+        already tracked keep their live state. Returns the number of
+        patients restorable.
+        """
+        reader = SnapshotReader(path)
+        with self._lock:
+            self._close_snapshot_locked()
+            self._snapshot = reader
+            self._pending = {patient_id for patient_id in reader.patient_ids() if patient_id not in self._entries}
+            return len(self._pending)
+
+    def _close_snapshot_locked(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+        self._pending = set()
+
+    def _entry(self, patient_id: str) -> list:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None:
+                agent = EscalationAgent(patient_id, possible_actions=self.possible_actions,
+                                        history_capacity=self.history_capacity, wal=self.wal,
+                                        metrics=self.metrics)
+                if patient_id in self._pending:
+                    self._pending.discard(patient_id)
+                    agent.restore_world_model(self._snapshot.load(patient_id))
+                    self.restored += 1
+                nbytes = agent.world_model.patient_belief.history.nbytes
+                entry = [agent, threading.Lock(), now, nbytes]
+                self._entries[patient_id] = entry
+                self.history_bytes += nbytes
+            else:
+                entry[2] = now
+                self._entries.move_to_end(patient_id)
+            self._evict_locked(now)
+            return entry
+
+    def _account(self, patient_id: str, entry: list):
+        """
+        Records the growth of `entry`'s history after a step and evicts
+        least recently used agents while over the byte budget.
+        """
+        nbytes = entry[0].world_model.patient_belief.history.nbytes
+        if nbytes == entry[3]:
+            return
+        with self._lock:
+            # Skip agents evicted while the step ran
+            if self._entries.get(patient_id) is entry:
+                self.history_bytes += nbytes - entry[3]
+                entry[3] = nbytes
+                self._evict_locked(self._clock())
+
+    def _evict_locked(self, now: float):
+        entries = self._entries
+        while len(entries) > self.max_agents:
+            self._pop_oldest_locked()
+        if self.max_history_bytes is not None:
+            # The most recently used agent always stays
+            while self.history_bytes > self.max_history_bytes and len(entries) > 1:
+                self._pop_oldest_locked()
+        if self.idle_ttl_seconds is not None:
+            cutoff = now - self.idle_ttl_seconds
+            while entries:
+                oldest = next(iter(entries.values()))
+                if oldest[2] >= cutoff:
+                    break
+                self._pop_oldest_locked()
+
+    def _pop_oldest_locked(self):
+        _, entry = self._entries.popitem(last=False)
+        self.history_bytes -= entry[3]
+        self.evictions += 1
@@ -0,0 +1,232 @@
+"""
+Binary snapshots of WorldModel state.
+
+A snapshot holds every patient's history columns, current vitals, trend
+engine state and bookkeeping in one file, so a restarted server resumes with
+its trends and narratives intact. The file is read through mmap: opening it
+only parses the patient index, and each patient's record is decoded when
+that patient is loaded.
+
+Layout:
+    header   magic, format version, index offset, index length
+    records  per patient: JSON metadata, then the raw history columns
+             (STORAGE_COLUMNS order, oldest reading first)
+    index    JSON: byte order, column layout, patient_id -> record location
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from typing import IO, Dict, Iterable, Iterator, List
+from .filelock import claim_exclusive
+from .history import VitalsHistory, STORAGE_COLUMNS
+from .models import Vitals, CompactVitals, missing_vitals, to_epoch_ms, from_epoch_ms
+from .perception.trend_engine import TrendEngine
+from .world_model import WorldModel
+
+MAGIC = b"DSSSNAP1"
+FORMAT_VERSION = 1
+
+# magic, version, index offset, index length
+_HEADER = struct.Struct("<8sIQQ")
+
+def _column_layout() -> List[list]:
+    return [[name, code, array(code).itemsize] for name, code in STORAGE_COLUMNS]
+
+def _encode_vitals(vitals) -> list:
+    ts = vitals.timestamp_ms if isinstance(vitals, CompactVitals) else to_epoch_ms(vitals.timestamp)
+    return [vitals.avpu, vitals.sbp, vitals.spo2, vitals.rr, vitals.hr, vitals.temp, vitals.news2, ts]
+
+def _decode_vitals(row: list) -> Vitals:
+    avpu, sbp, spo2, rr, hr, temp, news2, ts = row
+    return Vitals(avpu=avpu, sbp=sbp, spo2=spo2, rr=rr, hr=hr, temp=temp, news2=news2,
+                  timestamp=from_epoch_ms(ts))
+
+def encode_world_model(world_model: WorldModel) -> bytes:
+    """
+    One patient's snapshot record: length-prefixed JSON metadata followed by
+    the history columns.
+    """
+    belief = world_model.patient_belief
+    history = belief.history
+    if not isinstance(history, VitalsHistory):
+        # A plain list history (e.g. a hand-built belief state) is copied into columns
+        copy = VitalsHistory(capacity=max(1, len(history)))
+        for vitals in history:
+            copy.append(vitals)
+        history = copy
+    last_assessment = world_model.last_assessment_time
+    meta = {
+        "patient_id": belief.patient_id,
+        "current_vitals": _encode_vitals(belief.current_vitals),
+        "has_reading": world_model.has_reading,
+        "active_interventions": list(belief.active_interventions),
+        "intervention_times": {name: when.isoformat() for name, when in belief.intervention_times.items()},
+        "notes_signals": dict(belief.notes_signals),
+        "history_size": len(history),
+        "history_capacity": history.capacity,
+        "history_max_age_ms": history.max_age_ms,
+        "last_assessment_time": None if last_assessment is None else last_assessment.isoformat(),
+        "last_recommendation": world_model.last_recommendation,
+        "trends": world_model.trends.get_state(),
+    }
+    meta_bytes = json.dumps(meta, separators=(",", ":"), default=str).encode("utf-8")
+    return b"".join([struct.pack("<I", len(meta_bytes)), meta_bytes] + history.column_bytes())
+
+def claim_snapshot_path(path: str) -> IO:
+    """
+    Claims `path` for this process through the lock file `<path>.lock`.
+    Keep the returned handle open for as long as the process writes
+    snapshots there. Raises RuntimeError if another process has claimed it.
+    """
+    return claim_exclusive(f"{path}.lock", f"snapshot path {path}")
+
+def write_snapshot(path: str, world_models: Iterable[WorldModel]) -> int:
+    """
+    Writes all `world_models` to `path` and returns how many were written.
+    The file is written to a uniquely named temporary file next to `path`
+    and renamed into place, so a crash mid-write leaves the previous
+    snapshot intact.
+    """
+    patients: Dict[str, list] = {}
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+            offset = _HEADER.size
+            for world_model in world_models:
+                record = encode_world_model(world_model)
+                patients[world_model.patient_belief.patient_id] = [offset, len(record)]
+                f.write(record)
+                offset += len(record)
+            index = json.dumps({
+                "byteorder": sys.byteorder,
+                "columns": _column_layout(),
+                "created": datetime.now().isoformat(),
+                "patients": patients,
+            }, separators=(",", ":")).encode("utf-8")
+            f.write(index)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, offset, len(index)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return len(patients)
+
+class SnapshotReader:
+    """
+    Memory-mapped view of a snapshot file.
+
+    Opening it reads only the header and patient index; load() decodes one
+    patient's record into a fresh WorldModel. Use as a context manager, or
+    call close() when done.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a snapshot") from None
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_index(self):
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a snapshot")
+        magic, version, index_offset, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        index = json.loads(self._map[index_offset:index_offset + index_length])
+        if index["columns"] != _column_layout():
+            raise ValueError("Snapshot column layout does not match this platform")
+        self._byteswap = index["byteorder"] != sys.byteorder
+        self._itemsizes = [itemsize for _, _, itemsize in index["columns"]]
+        self.created = datetime.fromisoformat(index["created"])
+        self._patients: Dict[str, list] = index["patients"]
+
+    def __len__(self) -> int:
+        return len(self._patients)
+
+    def __contains__(self, patient_id: str) -> bool:
+        return patient_id in self._patients
+
+    def patient_ids(self) -> Iterator[str]:
+        return iter(self._patients)
+
+    def load(self, patient_id: str) -> WorldModel:
+        """
+        Decodes one patient's WorldModel. Raises KeyError for unknown patients.
+        """
+        offset, length = self._patients[patient_id]
+        view = memoryview(self._map)[offset:offset + length]
+        buffers = []
+        try:
+            (meta_length,) = struct.unpack_from("<I", view, 0)
+            meta = json.loads(bytes(view[4:4 + meta_length]))
+            size = meta["history_size"]
+            pos = 4 + meta_length
+            for itemsize in self._itemsizes:
+                buffers.append(view[pos:pos + size * itemsize])
+                pos += size * itemsize
+            max_age_ms = meta["history_max_age_ms"]
+            history = VitalsHistory.from_column_bytes(
+                buffers, size, capacity=meta["history_capacity"],
+                max_age=None if max_age_ms is None else timedelta(milliseconds=max_age_ms),
+                byteswap=self._byteswap
+            )
+        finally:
+            # Outstanding views would keep the mmap from closing
+            for buffer in buffers:
+                buffer.release()
+            view.release()
+
+        world_model = WorldModel(patient_id)
+        belief = world_model.patient_belief
+        belief.current_vitals = _decode_vitals(meta["current_vitals"])
+        # Older snapshots always held a reading
+        world_model.has_reading = meta.get("has_reading", True)
+        world_model.current_complete = not missing_vitals(belief.current_vitals)
+        belief.history = history
+        belief.active_interventions = meta["active_interventions"]
+        # Absent from snapshots written before start times were recorded
+        belief.intervention_times = {name: datetime.fromisoformat(when)
+                                     for name, when in meta.get("intervention_times", {}).items()}
+        belief.notes_signals = meta["notes_signals"]
+        world_model.trends = TrendEngine.from_state(meta["trends"])
+        last_assessment = meta["last_assessment_time"]
+        world_model.last_assessment_time = None if last_assessment is None else datetime.fromisoformat(last_assessment)
+        world_model.last_recommendation = meta["last_recommendation"]
+        return world_model
+
+    def load_all(self) -> Iterator[WorldModel]:
+        for patient_id in self._patients:
+            yield self.load(patient_id)
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,284 @@
+"""
+Append-only write-ahead log of agent steps.
+
+Every step's vitals, resource state and recommendations are recorded for
+audit and crash recovery. The step encodes its record and puts it on a
+bounded queue; a background writer appends records to the current segment
+and makes them durable with one fsync per flush interval (group commit), so
+the hot path never waits on the disk. When the queue is full, callers wait;
+records are never dropped.
+
+Records are encoded by the caller rather than the writer: the encode costs
+the same CPU either way, and doing it under the GIL in the writer thread
+stalls steps for a whole switch interval.
+
+Segments are files named wal-<sequence>.log in the log directory, rotated
+once they reach `segment_bytes`. A directory belongs to one log at a time:
+the log holds an exclusive lock on wal.lock until it is closed, so two
+processes never append to the same segment. Each record is framed as
+    length (u32) | crc32 (u32) | JSON payload
+and replay stops at the first torn or corrupt record at the end of a segment.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from .models import Vitals, CompactVitals, ResourceState, to_epoch_ms, from_epoch_ms
+from .world_model import WorldModel
+from .encoding import encode_envelope
+from .filelock import claim_exclusive
+
+_FRAME = struct.Struct("<II")
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+_LOCK_NAME = "wal.lock"
+_STOP = object()
+
+def _segment_name(sequence: int) -> str:
+    return f"{_SEGMENT_PREFIX}{sequence:08d}{_SEGMENT_SUFFIX}"
+
+def _segment_sequence(path: str) -> int:
+    return int(os.path.basename(path)[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+
+def list_segments(directory: str) -> List[str]:
+    """
+    Segment paths in `directory`, oldest first.
+    """
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+def encode_record(logged_ms: int, patient_id: str, vitals: Union[Vitals, CompactVitals],
+                  resource_state: ResourceState,
+                  recommendations: Union[List[Dict[str, Any]], List[bytes]],
+                  narrative: Optional[List[str]] = None) -> bytes:
+    """
+    Frames one step. `recommendations` are dicts, or JSON bytes from
+    run_step_encoded, which are spliced in as they are. A step-level
+    `narrative` is recorded as "memory_narrative".
+    """
+    ts = vitals.timestamp_ms if isinstance(vitals, CompactVitals) else to_epoch_ms(vitals.timestamp)
+    record = {
+        "logged_ms": logged_ms,
+        "patient_id": patient_id,
+        "vitals": [vitals.avpu, vitals.sbp, vitals.spo2, vitals.rr, vitals.hr, vitals.temp, vitals.news2, ts],
+        "resources": vars(resource_state),
+    }
+    if narrative is not None:
+        record["memory_narrative"] = narrative
+    if recommendations and isinstance(recommendations[0], bytes):
+        payload = encode_envelope(record, "recommendations", recommendations)
+    else:
+        record["recommendations"] = recommendations
+        payload = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+def decode_vitals(row: list) -> Vitals:
+    avpu, sbp, spo2, rr, hr, temp, news2, ts = row
+    return Vitals(avpu=avpu, sbp=sbp, spo2=spo2, rr=rr, hr=hr, temp=temp, news2=news2,
+                  timestamp=from_epoch_ms(ts))
+
+class WriteAheadLog:
+    """
+    Background-written, segment-rotated step log.
+
+    append() is cheap and thread-safe. The writer thread flushes and fsyncs
+    at most every `flush_interval_seconds`; flush() blocks until everything
+    appended so far is durable. Call close() (or use as a context manager)
+    to drain the queue and stop the writer; append() and flush() raise
+    RuntimeError afterwards. Raises RuntimeError if another process has the
+    directory open.
+    """
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 flush_interval_seconds: float = 0.05, max_queue: int = 10_000, fsync: bool = True):
+        if segment_bytes < 1:
+            raise ValueError("segment_bytes must be positive")
+        os.makedirs(directory, exist_ok=True)
+        self._claim = claim_exclusive(os.path.join(directory, _LOCK_NAME), f"write-ahead log directory {directory}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval_seconds = flush_interval_seconds
+        self.fsync = fsync
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        existing = list_segments(directory)
+        # Never append to an old segment: it may end in a torn record
+        self._sequence = _segment_sequence(existing[-1]) + 1 if existing else 0
+        self._file = None
+        self._segment_size = 0
+        self.records_written = 0
+        self.syncs = 0
+        self.error: Optional[BaseException] = None
+        self._closed = False
+        # Orders append/flush against close, so nothing is queued after _STOP
+        self._state_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+        self._writer.start()
+
+    # -- Producer side ------------------------------------------------------
+
+    def append(self, patient_id: str, vitals: Union[Vitals, CompactVitals], resource_state: ResourceState,
+               recommendations: Union[List[Dict[str, Any]], List[bytes]], narrative: Optional[List[str]] = None):
+        """
+        Encodes and queues one step for logging. Blocks only while the queue is full.
+        """
+        record = encode_record(time.time_ns() // 1_000_000, patient_id, vitals, resource_state,
+                               recommendations, narrative)
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("write-ahead log is closed")
+            self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every record appended before this call is on disk.
+        Returns False on timeout.
+        """
+        done = threading.Event()
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("write-ahead log is closed")
+            self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        self._claim.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- Writer thread ------------------------------------------------------
+
+    def _run(self):
+        waiters: List[threading.Event] = []
+        dirty = False
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, last_sync + self.flush_interval_seconds - time.monotonic()) if dirty else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            # Group commit: take everything already queued before syncing
+            batch = [] if item is None else [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    self._write(item)
+                    dirty = True
+            now = time.monotonic()
+            if (dirty or waiters) and (stopping or waiters or now - last_sync >= self.flush_interval_seconds):
+                if dirty:
+                    self._sync()
+                    dirty = False
+                last_sync = now
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: bytes):
+        try:
+            if self._file is None or self._segment_size >= self.segment_bytes:
+                self._rotate()
+            self._file.write(record)
+            self._segment_size += len(record)
+            self.records_written += 1
+        except OSError as e:
+            # Keep draining so producers never block on a dead writer
+            self.error = e
+            print(f"Write-ahead log write failed: {e!r}")
+
+    def _rotate(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        self._file = open(os.path.join(self.directory, _segment_name(self._sequence)), "ab")
+        self._sequence += 1
+        self._segment_size = 0
+
+    def _sync(self):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.syncs += 1
+        except OSError as e:
+            self.error = e
+            print(f"Write-ahead log sync failed: {e!r}")
+
+# -- Replay -----------------------------------------------------------------
+
+def _read_segment(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, pos)
+        payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            # Torn or corrupt tail from a crash mid-write
+            return
+        yield json.loads(payload)
+        pos += _FRAME.size + length
+
+def replay(directory: str, patient_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields logged steps in order, optionally for one patient only. Each
+    record has "logged_ms", "patient_id", "vitals" (a Vitals), "resources"
+    (a ResourceState) and "recommendations"; steps logged by
+    run_step_encoded also have the step's "memory_narrative".
+    """
+    for path in list_segments(directory):
+        for record in _read_segment(path):
+            if patient_id is not None and record["patient_id"] != patient_id:
+                continue
+            record["vitals"] = decode_vitals(record["vitals"])
+            record["resources"] = ResourceState(**record["resources"])
+            yield record
+
+def rebuild_world_model(directory: str, patient_id: str, world_model: Optional[WorldModel] = None) -> Tuple[WorldModel, int]:
+    """
+    Replays a patient's logged readings into `world_model` (default: a new
+    one). Readings not newer than the model's current vitals are skipped,
+    so the log can be replayed on top of a restored snapshot.
+    Returns (world_model, readings applied).
+    """
+    if world_model is None:
+        world_model = WorldModel(patient_id)
+    belief = world_model.patient_belief
+    latest_ms = to_epoch_ms(belief.current_vitals.timestamp) if world_model.has_reading else None
+    applied = 0
+    for record in replay(directory, patient_id):
+        vitals = record["vitals"]
+        if latest_ms is not None and to_epoch_ms(vitals.timestamp) <= latest_ms:
+            continue
+        world_model.update_vitals(vitals)
+        world_model.update_resources(record["resources"])
+        applied += 1
+    return world_model, applied
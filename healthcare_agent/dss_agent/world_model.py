@@ -1,45 +1,101 @@
-from datetime import datetime
-from typing import Optional, List
-from .models import PatientBeliefState, ResourceState, Vitals
-
-class WorldModel:
-    """
-    Manages the agent's belief about the world, including patient state
-    and resource availability.
-    """
-    def __init__(self, patient_id: str):
-        self.patient_belief = PatientBeliefState(
-            patient_id=patient_id,
-            current_vitals=Vitals(),
-            history=[]
-        )
-        self.resource_state: Optional[ResourceState] = None
-        self.last_assessment_time: Optional[datetime] = None
-        self.last_recommendation: Optional[dict] = None
-
-    def update_vitals(self, new_vitals: Vitals):
-        """
-        Updates the patient's current vitals and archives the previous state
-        to history.
-        """
-        # Archive current vitals to history if it's not the initial empty state
-        # or if we want to track every update. 
-        # For simplicity, we'll append the *previous* current_vitals to history.
-        if self.patient_belief.current_vitals.timestamp != new_vitals.timestamp:
-             self.patient_belief.history.append(self.patient_belief.current_vitals)
-        
-        # Update current vitals
-        self.patient_belief.current_vitals = new_vitals
-        self.last_assessment_time = datetime.now()
-
-    def update_resources(self, new_resources: ResourceState):
-        """
-        Updates the agent's knowledge of hospital resources.
-        """
-        self.resource_state = new_resources
-
-    def get_history(self) -> List[Vitals]:
-        return self.patient_belief.history
-
-    def get_current_vitals(self) -> Vitals:
-        return self.patient_belief.current_vitals
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from .models import PatientBeliefState, ResourceState, Vitals, prepare_vitals
+from .history import VitalsHistory, DEFAULT_CAPACITY
+from .perception.trend_engine import TrendEngine
+
+class WorldModel:
+    """
+    Manages the agent's belief about the world, including patient state
+    and resource availability.
+    """
+    def __init__(self, patient_id: str, history_capacity: int = DEFAULT_CAPACITY,
+                 history_max_age: Optional[timedelta] = None):
+        self.patient_belief = PatientBeliefState(
+            patient_id=patient_id,
+            current_vitals=Vitals(),
+            history=VitalsHistory(capacity=history_capacity, max_age=history_max_age)
+        )
+        # False while current_vitals is the placeholder above, which is
+        # never archived to history
+        self.has_reading = False
+        # False while current_vitals lacks a value (see update_vitals)
+        self.current_complete = True
+        # Rolling per-vital statistics, updated with every reading
+        self.trends = TrendEngine()
+        self.resource_state: Optional[ResourceState] = None
+        self.last_assessment_time: Optional[datetime] = None
+        self.last_recommendation: Optional[dict] = None
+
+    def update_vitals(self, new_vitals: Vitals,
+                      admit_missing: Optional[Callable[[Vitals, Tuple[str, ...]], None]] = None) -> Vitals:
+        """
+        Updates the patient's current vitals and archives the previous state
+        to history. Returns the reading as taken in (see
+        models.prepare_vitals: fractional integer vitals are rounded).
+
+        A reading with missing (None) values still becomes the current
+        reading, so the safety rules see it, but it is never archived or fed
+        to the trend engine. `admit_missing(vitals, missing)` may raise to
+        refuse such a reading. Unusable values raise ValueError, as does a
+        reading older than the current one (history queries and trend slopes
+        rely on timestamps only moving forward). Either way nothing changes,
+        so one bad reading is rejected on its own instead of breaking every
+        later step.
+        """
+        new_vitals, missing = prepare_vitals(new_vitals)
+        belief = self.patient_belief
+        if self.has_reading and new_vitals.timestamp < belief.current_vitals.timestamp:
+            raise ValueError(f"Reading at {new_vitals.timestamp} is older than the current reading "
+                             f"at {belief.current_vitals.timestamp}")
+        if missing and admit_missing is not None:
+            admit_missing(new_vitals, missing)
+        # Archive the previous reading to history; the initial placeholder and
+        # incomplete readings are not stored, and one with the same timestamp
+        # is replaced
+        if self.has_reading and self.current_complete and belief.current_vitals.timestamp != new_vitals.timestamp:
+             belief.history.append(belief.current_vitals)
+        
+        # Update current vitals
+        belief.current_vitals = new_vitals
+        self.has_reading = True
+        self.current_complete = not missing
+        if not missing:
+            self.trends.update(new_vitals)
+        self.last_assessment_time = datetime.now()
+        return new_vitals
+
+    def update_resources(self, new_resources: ResourceState):
+        """
+        Updates the agent's knowledge of hospital resources.
+        """
+        self.resource_state = new_resources
+
+    def start_intervention(self, name: str, when: Optional[datetime] = None):
+        """
+        Marks `name` as active, started at `when` (default: the time of the
+        current reading). Readings up to that time form its pre-intervention
+        baseline.
+        """
+        belief = self.patient_belief
+        if name not in belief.active_interventions:
+            belief.active_interventions.append(name)
+        belief.intervention_times[name] = belief.current_vitals.timestamp if when is None else when
+
+    def end_intervention(self, name: str):
+        belief = self.patient_belief
+        if name in belief.active_interventions:
+            belief.active_interventions.remove(name)
+        belief.intervention_times.pop(name, None)
+
+    def get_history(self) -> VitalsHistory:
+        """
+        The patient's past readings (the current one excluded). Besides list
+        access it answers time-indexed queries in O(log n): as_of(t),
+        nearest(t) and between(t1, t2), whose views give per-vital window
+        aggregates (min, max, mean, last).
+        """
+        return self.patient_belief.history
+
+    def get_current_vitals(self) -> Vitals:
+        return self.patient_belief.current_vitals
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+import pytest
+from dss_agent.explainability.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_hits_misses_and_ttl_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    calls = []
+    loader = lambda: calls.append(1) or "guideline"
+
+    assert cache.get_or_load("ICU transfer", loader) == "guideline"
+    assert cache.get_or_load("ICU transfer", loader) == "guideline"
+    clock.now = 11
+    cache.get_or_load("ICU transfer", loader)
+
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_lru_size_bound():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_single_flight_coalesces_concurrent_misses():
+    cache = TTLCache()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "doc"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["doc"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+def test_loader_errors_are_not_cached():
+    cache = TTLCache()
+
+    def failing():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+
+def test_async_single_flight():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "doc"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load_async("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["doc"] * 5
+    assert len(calls) == 1
+
+def test_serve_stale_while_refreshing():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock, serve_stale=True)
+    refreshed = threading.Event()
+
+    cache.get_or_load("k", lambda: "v1")
+    clock.now = 20
+
+    def refresh():
+        refreshed.set()
+        return "v2"
+
+    assert cache.get_or_load("k", refresh) == "v1"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("k") == "v2":
+            break
+        time.sleep(0.01)
+    assert cache.get("k") == "v2"
+    assert cache.stats()["stale_hits"] == 1
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+import pytest
+from dss_agent.agent import EscalationAgent, WardAgent, default_actions
+from dss_agent.catalog import ActionCatalog, default_catalog, CATALOG_ENV_VAR
+from dss_agent.models import Vitals, ResourceState
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+
+def test_default_catalog_is_shared_and_frozen():
+    a, b = EscalationAgent("A"), EscalationAgent("B")
+    assert a.possible_actions is b.possible_actions is default_catalog()
+    catalog = default_catalog()
+    assert catalog[catalog.id_of("ICU transfer")]["action"] == "ICU transfer"
+    assert catalog.id_of("Discharge planning") == 5
+    with pytest.raises(TypeError):
+        catalog[0]["base_score"] = 1.0
+    # default_actions() still hands out an editable copy
+    actions = default_actions()
+    actions[0]["base_score"] = 1.0
+    assert catalog[0]["base_score"] == 0.4
+
+def test_agent_output_unchanged_with_list_or_catalog():
+    vitals = Vitals(sbp=105, spo2=94, rr=22, news2=7)
+    from_list = EscalationAgent("P", possible_actions=default_actions()).run_step(vitals, RESOURCES)
+    from_catalog = EscalationAgent("P").run_step(vitals, RESOURCES)
+    assert from_list == from_catalog
+
+@pytest.mark.parametrize("row, message", [
+    ({"action": "X", "base_score": 0.5, "benefit": "Low", "cost_level": "Huge", "cost_exp": "?"}, "cost_level"),
+    ({"action": "X", "benefit": "Low", "cost_level": "Low", "cost_exp": "?"}, "missing 'base_score'"),
+    ({"action": "X", "base_score": "high", "benefit": "Low", "cost_level": "Low", "cost_exp": "?"}, "wrong type"),
+    ({"action": "X", "base_score": 0.5, "benefit": "Low", "cost_level": "Low", "cost_exp": "?", "min_risk": 2}, "min_risk"),
+    ({"action": "X", "base_score": 0.5, "benefit": "Low", "cost_level": "Low", "cost_exp": "?", "gate": "beds"}, "gate"),
+    ({"action": "X", "base_score": 0.5, "benefit": "Low", "cost_level": "Low", "cost_exp": "?", "min_rsk": 0.1}, "unknown keys"),
+    ({"action": "X", "base_score": 0.5, "benefit": "Low", "cost_level": "Low", "cost_exp": "?",
+      "rationale_template": "{icu_beds} free"}, "rationale_template"),
+])
+def test_validation_at_load(row, message):
+    with pytest.raises(ValueError, match=message):
+        ActionCatalog.from_dicts([row])
+
+def test_duplicate_and_empty_catalogs_rejected():
+    with pytest.raises(ValueError, match="duplicate"):
+        ActionCatalog.from_dicts(default_actions() + default_actions()[:1])
+    with pytest.raises(ValueError, match="no actions"):
+        ActionCatalog.from_dicts([])
+
+def test_site_catalog_from_file(tmp_path, monkeypatch):
+    site = [
+        {"action": "Monitor closely", "base_score": 0.4, "benefit": "Low", "cost_level": "Low", "cost_exp": "Minimal"},
+        {"action": "HDU admission", "base_score": 0.95, "benefit": "High", "cost_level": "High",
+         "cost_exp": "HDU bed", "min_risk": 0.3, "gate": "icu_beds",
+         "rationale_template": "{icu_beds_available} HDU bed(s) free."},
+    ]
+    path = tmp_path / "site_actions.json"
+    path.write_text(json.dumps({"actions": site}))
+
+    catalog = ActionCatalog.load(str(path))
+    assert catalog.source == str(path)
+    recs = WardAgent(possible_actions=catalog).run_batch([("P", Vitals(news2=8))], RESOURCES)["P"]
+    assert recs[0]["action"] == "HDU admission"
+    assert recs[0]["rationale"] == "Patient has moderate risk (NEWS2=8). 1 HDU bed(s) free."
+    # The gate applies to the site action: no beds, no admission
+    no_beds = ResourceState(icu_beds_available=0, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+    recs = EscalationAgent("P", possible_actions=catalog).run_step(Vitals(news2=8), no_beds)
+    assert [r["action"] for r in recs] == ["Monitor closely"]
+
+    monkeypatch.setenv(CATALOG_ENV_VAR, str(path))
+    default_catalog.cache_clear()
+    try:
+        assert default_catalog().id_of("HDU admission") == 1
+    finally:
+        monkeypatch.delenv(CATALOG_ENV_VAR)
+        default_catalog.cache_clear()
+
+def test_catalog_without_always_eligible_action_rejected():
+    hdu_only = [{"action": "HDU admission", "base_score": 0.95, "benefit": "High", "cost_level": "High",
+                 "cost_exp": "HDU bed", "min_risk": 0.3, "gate": "icu_beds"}]
+    with pytest.raises(ValueError, match="always-eligible"):
+        ActionCatalog.from_dicts(hdu_only)
+    # Zero min_risk is not enough when the action is gated
+    with pytest.raises(ValueError, match="always-eligible"):
+        ActionCatalog.from_dicts([dict(hdu_only[0], min_risk=0.0)])
+
+def test_readme_site_catalog_recommends_for_every_patient(tmp_path):
+    readme = (Path(__file__).parent.parent / "dss_agent" / "README.md").read_text(encoding="utf-8")
+    example = readme.split("```json", 1)[1].split("```", 1)[0]
+    path = tmp_path / "site_actions.json"
+    path.write_text(example)
+    ward = WardAgent(possible_actions=ActionCatalog.load(str(path)))
+    results = ward.run_batch([(f"P{news2}", Vitals(news2=news2)) for news2 in range(9)], RESOURCES)
+    assert all(recs for recs in results.values())
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.agent import EscalationAgent
+from dss_agent.models import Vitals, CompactVitals, ResourceState
+
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def test_attribute_parity_with_vitals():
+    vitals = Vitals(avpu="V", sbp=95, spo2=88, rr=26, hr=121, temp=38.7, news2=10, timestamp=T0)
+    compact = CompactVitals.from_vitals(vitals)
+
+    for name in ("avpu", "sbp", "spo2", "rr", "hr", "temp", "news2", "timestamp"):
+        assert getattr(compact, name) == getattr(vitals, name)
+    assert compact.to_vitals() == vitals
+    assert CompactVitals.from_vitals(vitals) == compact
+
+def test_rejects_values_outside_compact_ranges():
+    with pytest.raises(ValueError):
+        CompactVitals(spo2=300)
+    with pytest.raises(ValueError):
+        CompactVitals(sbp=-1)
+
+def test_agent_accepts_compact_vitals():
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.6, transport_delay_minutes=15)
+    steps = [
+        Vitals(avpu="A", sbp=120, spo2=98, rr=16, news2=1, timestamp=T0),
+        Vitals(avpu="A", sbp=96, spo2=93, rr=23, news2=6, timestamp=T0 + timedelta(hours=1)),
+    ]
+    plain, compact = EscalationAgent("P1"), EscalationAgent("P2")
+
+    for vitals in steps:
+        assert compact.run_step(CompactVitals.from_vitals(vitals), resources) == plain.run_step(vitals, resources)
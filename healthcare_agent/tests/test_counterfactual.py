@@ -69,3 +69,39 @@ def test_analyze_counterfactual_custom_signals():
     
     assert result["projected_risk"] == pytest.approx(0.25)
     assert "Rapid SBP drop" in result["key_drivers"]
+
+def test_risk_curve_matches_pointwise_analysis():
+    """The curve must equal analyze_counterfactual at every delay, including the cap."""
+    from dss_agent.reasoning.counterfactual import risk_curve
+    signals = ["overdue_review", "Rapid SBP drop", "unknown_signal"]
+    curve = risk_curve(0.7, signals)
+
+    assert curve["delays"][0] == 0 and curve["delays"][-1] == 240
+    assert curve["key_drivers"] == ["overdue_review", "Rapid SBP drop"]
+    for delay, projected, change in zip(curve["delays"], curve["projected_risk"], curve["risk_change"]):
+        point = analyze_counterfactual(0.7, delay, signals)
+        assert point["projected_risk"] == projected
+        assert point["risk_change"] == change
+
+def test_memoized_results_are_independent_copies():
+    first = analyze_counterfactual(0.3, 60, ["hypoxia"])
+    first["key_drivers"].append("mutated")
+    second = analyze_counterfactual(0.3, 60, ["hypoxia"])
+    assert second["key_drivers"] == ["hypoxia"]
+
+def test_what_if_matrix_matches_pointwise_analysis():
+    from dss_agent.reasoning.counterfactual import what_if_matrix, signal_mask
+    risks = [0.1, 0.45, 0.9, 0.45]
+    signal_sets = [[], ["overdue_review"], ["Rapid SBP drop", "hypoxia"], ["overdue_review", "not_a_signal"]]
+    delays = [0, 30, 60, 120, 240]
+
+    by_lists = what_if_matrix(risks, delays, signal_sets)
+    by_masks = what_if_matrix(risks, delays, [signal_mask(s) for s in signal_sets])
+    assert by_lists == by_masks
+    for row, risk, signals in zip(by_lists, risks, signal_sets):
+        assert list(row) == [analyze_counterfactual(risk, d, signals)["projected_risk"] for d in delays]
+    # Same risk and multiplier: one shared row
+    assert by_lists[1] is by_lists[3]
+
+    with pytest.raises(ValueError):
+        what_if_matrix([0.1], delays, [])
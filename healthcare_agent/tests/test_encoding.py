@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.encoding import encode_envelope, encode_recommendations, with_fields
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.wal import WriteAheadLog, replay
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _reading(minute, sbp=120, news2=None, spo2=97):
+    return Vitals(sbp=sbp, rr=16 + minute % 4, spo2=spo2, news2=minute % 3 if news2 is None else news2,
+                  timestamp=T0 + timedelta(minutes=minute))
+
+def test_encoded_step_matches_to_dict():
+    readings = [_reading(0), _reading(1, news2=6, spo2=91), _reading(2), _reading(3, sbp=60)]
+    plain, encoded = EscalationAgent("P1"), EscalationAgent("P1")
+    for vitals in readings:
+        expected = plain.run_step(vitals, RESOURCES)
+        step = encoded.run_step_encoded(vitals, RESOURCES)
+        assert [rec.to_dict() for rec in step.recommendations] == expected
+        assert [json.loads(b) for b in encode_recommendations(step.recommendations)] == expected
+        # The server path sends the narrative once per step
+        assert step.narrative == expected[0]["memory_narrative"]
+        assert [dict(json.loads(b), memory_narrative=step.narrative) for b in step.encoded] == expected
+
+def test_shared_parts_encoded_once_per_step():
+    step = EscalationAgent("P1").run_step_encoded(_reading(0, news2=6), RESOURCES)
+    assert len(step.recommendations) > 1
+    assert all(b"memory_narrative" not in encoded for encoded in step.encoded)
+    counterfactual = json.dumps(step.recommendations[0].counterfactual_analysis, separators=(",", ":")).encode()
+    assert all(counterfactual in encoded for encoded in step.encoded)
+    assert encode_recommendations(step.recommendations, narrative=False) == step.encoded
+
+def test_fields_and_envelope_splice():
+    step = EscalationAgent("P1").run_step_encoded(_reading(0), RESOURCES)
+    items = [with_fields(encoded, {"explanation": "why → now"}) for encoded in step.encoded]
+    body = encode_envelope({"status": "success", "patient_risk_score": 0}, "recommendations", items)
+    decoded = json.loads(body)
+    assert decoded["status"] == "success"
+    assert [r["explanation"] for r in decoded["recommendations"]] == ["why → now"] * len(items)
+    assert decoded["recommendations"][0]["action"] == step.recommendations[0].action
+    assert with_fields(step.encoded[0], {}) is step.encoded[0]
+    assert json.loads(encode_envelope({}, "items", [])) == {"items": []}
+
+def test_encoded_steps_are_logged(tmp_path):
+    directory = str(tmp_path / "wal")
+    with WriteAheadLog(directory) as wal:
+        agent = EscalationAgent("P1", wal=wal)
+        step = agent.run_step_encoded(_reading(0), RESOURCES)
+    record, = replay(directory)
+    assert record["memory_narrative"] == step.narrative
+    assert [dict(r, memory_narrative=step.narrative) for r in record["recommendations"]] == \
+        [rec.to_dict() for rec in step.recommendations]
+    assert record["resources"] == RESOURCES
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from dss_agent.explainability.explanation_cache import ExplanationCache, canonical_key, explanation_context
+
+REC = {
+    "action": "Consult specialist",
+    "rationale": "Patient has moderate risk (NEWS2=7). Action appropriate for risk level.",
+    "expected_benefit": "Medium",
+    "cost": {"level": "Medium", "explanation": "Specialist time"},
+    "confidence": 0.98,
+    "emergent": False,
+    "intent": "escalate",
+    "memory_narrative": ["NEWS2 score increased from 5 -> 7"],
+    "counterfactual_analysis": {"projected_risk": 0.5, "key_drivers": ["overdue_review", "Rapid RR rise"]},
+}
+
+def test_canonical_key_ignores_key_order():
+    assert canonical_key({"a": 1, "b": [1, 2]}) == canonical_key({"b": [1, 2], "a": 1})
+    assert canonical_key({"a": 1}) != canonical_key({"a": 2})
+
+def test_context_drops_per_patient_detail():
+    other_patient = dict(REC, memory_narrative=["Vital signs remain stable since last assessment."],
+                         counterfactual_analysis={"projected_risk": 0.7, "key_drivers": ["Rapid RR rise", "overdue_review"]})
+
+    assert explanation_context(REC, ["doc"]) == explanation_context(other_patient, ["doc"])
+
+def test_identical_contexts_generate_once():
+    cache = ExplanationCache()
+    calls = []
+    generate = lambda ctx: calls.append(ctx) or "explanation"
+
+    for _ in range(3):
+        assert cache.get_or_generate(explanation_context(REC, ["doc"]), generate) == "explanation"
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "explanations.sqlite")
+    context = explanation_context(REC, ["doc"])
+
+    ExplanationCache(disk_path=path).get_or_generate(context, lambda ctx: "from model")
+    restarted = ExplanationCache(disk_path=path)
+    value = restarted.get_or_generate(context, lambda ctx: "regenerated")
+
+    assert value == "from model"
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["generated"] == 0
+
+def test_async_disk_access_stays_off_the_event_loop(tmp_path):
+    context = explanation_context(REC, ["doc"])
+    cache = ExplanationCache(disk_path=str(tmp_path / "explanations.sqlite"))
+    disk_threads = []
+    for name in ("get", "put"):
+        method = getattr(cache.disk, name)
+        def record(*args, _method=method):
+            disk_threads.append(threading.get_ident())
+            return _method(*args)
+        setattr(cache.disk, name, record)
+
+    async def generate(ctx):
+        return "from model"
+
+    async def main():
+        value = await cache.get_or_generate_async(context, generate)
+        return value, threading.get_ident()
+
+    value, loop_thread = asyncio.run(main())
+    assert value == "from model"
+    assert len(disk_threads) == 2 and loop_thread not in disk_threads
@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.history import VitalsHistory
+from dss_agent.models import Vitals
+from dss_agent.world_model import WorldModel
+
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _vitals(minute, sbp=120):
+    return Vitals(sbp=sbp, rr=16 + minute % 5, temp=37.2, timestamp=T0 + timedelta(minutes=minute))
+
+def test_append_and_index_like_a_list():
+    history = VitalsHistory(capacity=100)
+    readings = [_vitals(m, sbp=100 + m) for m in range(40)]
+    for v in readings:
+        history.append(v)
+
+    assert len(history) == 40
+    assert history[-1] is readings[-1]
+    assert history[0] == readings[0]
+    assert [v.sbp for v in history] == [v.sbp for v in readings]
+    assert history[10:13] == readings[10:13]
+
+def test_capacity_overwrites_oldest():
+    history = VitalsHistory(capacity=5)
+    for m in range(12):
+        history.append(_vitals(m, sbp=100 + m))
+
+    assert len(history) == 5
+    assert list(history.values("sbp")) == [107, 108, 109, 110, 111]
+    assert history[0].timestamp == T0 + timedelta(minutes=7)
+
+def test_max_age_evicts_old_readings():
+    history = VitalsHistory(capacity=1000, max_age=timedelta(minutes=30))
+    for m in range(0, 120, 5):
+        history.append(_vitals(m, sbp=m))
+
+    assert list(history.values("sbp")) == [85, 90, 95, 100, 105, 110, 115]
+    # Eviction left room at the front; keep appending past the old allocation
+    for m in range(120, 400, 5):
+        history.append(_vitals(m, sbp=m))
+    assert list(history.values("sbp")) == list(range(365, 400, 5))
+
+def test_last_n_and_since_views():
+    history = VitalsHistory(capacity=10)
+    for m in range(25):
+        history.append(_vitals(m, sbp=m))
+
+    assert list(history.last_n(3).values("sbp")) == [22, 23, 24]
+    assert len(history.last_n(50)) == 10
+    assert list(history.since(T0 + timedelta(minutes=20)).values("sbp")) == [20, 21, 22, 23, 24]
+    assert len(history.since(T0 + timedelta(hours=1))) == 0
+    assert history.since(T0)[0].sbp == 15
+
+def test_search_matches_a_linear_scan_on_a_wrapped_ring():
+    history = VitalsHistory(capacity=16)
+    # Two readings per timestamp, 37 readings: the ring has wrapped
+    for i in range(37):
+        history.append(_vitals(i // 2, sbp=i))
+    stamps = list(history.values("timestamp_ms"))
+    for minute in range(8, 20):
+        target = stamps[0] + (minute - 10) * 60_000
+        assert history.search(target) == sum(t < target for t in stamps)
+        assert history.search(target, right=True) == sum(t <= target for t in stamps)
+
+def test_values_at_reads_one_reading():
+    history = VitalsHistory(capacity=4)
+    for m in range(6):
+        history.append(_vitals(m, sbp=100 + m))
+    assert history.values_at(0, ("sbp", "avpu", "rr")) == [102, "A", 18]
+    assert history.value("sbp", -1) == 105
+    assert history.value("timestamp_ms", 1) == history.timestamp_ms(1)
+
+def test_time_indexed_queries_and_window_aggregates():
+    history = VitalsHistory(capacity=20)
+    # Every 5 minutes from minute 0 to 145; the ring keeps minutes 50-145
+    for m in range(0, 150, 5):
+        history.append(_vitals(m, sbp=m))
+
+    window = history.between(T0 + timedelta(minutes=58), T0 + timedelta(minutes=75))
+    assert list(window.values("sbp")) == [60, 65, 70, 75]
+    stats = window.aggregate("sbp")
+    assert (stats.count, stats.min, stats.max, stats.mean, stats.last) == (4, 60, 75, 67.5, 75)
+    # A window across the ring's wrap point matches a direct computation
+    wrapped = history.between(T0, T0 + timedelta(hours=3))
+    assert wrapped.aggregate("rr").mean == sum(wrapped.values("rr")) / len(wrapped) and len(wrapped) == 20
+    assert history.between(T0, T0 + timedelta(minutes=40)).aggregate("sbp") is None
+
+    assert history.as_of(T0 + timedelta(minutes=64)).sbp == 60
+    assert history.as_of(T0 + timedelta(minutes=45)) is None
+    assert history.nearest(T0 + timedelta(minutes=63)).sbp == 65
+    assert history.nearest(T0 + timedelta(minutes=62, seconds=30)).sbp == 60
+    assert history.nearest(T0 + timedelta(days=1)).sbp == 145
+    with pytest.raises(ValueError):
+        window.aggregate("avpu")
+
+def test_rejected_append_leaves_history_unchanged():
+    history = VitalsHistory(capacity=4)
+    for m in range(4):
+        history.append(_vitals(m, sbp=100 + m))
+    before = list(history)
+    for bad in (Vitals(avpu=None), Vitals(avpu="Alert"), Vitals(sbp=92.5), Vitals(rr=2 ** 40)):
+        with pytest.raises(ValueError):
+            history.append(bad)
+    assert list(history) == before
+    history.append(_vitals(4, sbp=104))
+    assert [v.sbp for v in history] == [101, 102, 103, 104]
+
+def test_bad_reading_is_rejected_without_wedging_the_patient():
+    world = WorldModel("P1")
+    world.update_vitals(_vitals(0))
+    for bad in (Vitals(avpu="Alert", timestamp=T0 + timedelta(minutes=1)),
+                Vitals(sbp="low", timestamp=T0 + timedelta(minutes=1)),
+                Vitals(temp=float("nan"), timestamp=T0 + timedelta(minutes=1))):
+        with pytest.raises(ValueError):
+            world.update_vitals(bad)
+    assert world.get_current_vitals() == _vitals(0)
+    # Later readings are processed normally
+    for m in range(1, 4):
+        world.update_vitals(_vitals(m, sbp=110 + m))
+    assert world.get_current_vitals().sbp == 113
+    assert [v.sbp for v in world.get_history()][-2:] == [111, 112]
+
+def test_fractional_and_missing_values():
+    world = WorldModel("P1")
+    assert world.update_vitals(Vitals(sbp=92.5, timestamp=T0)).sbp == 92
+    trend_count = world.trends.count
+    # Seen as the current reading, but never stored or trended
+    incomplete = Vitals(avpu=None, timestamp=T0 + timedelta(minutes=1))
+    world.update_vitals(incomplete)
+    assert world.get_current_vitals() is incomplete
+    assert world.trends.count == trend_count
+    world.update_vitals(_vitals(2))
+    assert [v.sbp for v in world.get_history()] == [92]
+
+    refused = []
+    def refuse(vitals, missing):
+        refused.append(missing)
+        raise ValueError("not escalated")
+    with pytest.raises(ValueError):
+        world.update_vitals(Vitals(hr=None, timestamp=T0 + timedelta(minutes=3)), refuse)
+    assert refused == [("hr",)]
+    assert world.get_current_vitals() == _vitals(2)
+
+def test_out_of_order_reading_is_rejected():
+    world = WorldModel("P1")
+    for m in range(3):
+        world.update_vitals(_vitals(m))
+    with pytest.raises(ValueError, match="older"):
+        world.update_vitals(_vitals(1, sbp=90))
+    assert world.get_current_vitals() == _vitals(2)
+    assert [v.timestamp for v in world.get_history()] == [T0, T0 + timedelta(minutes=1)]
+    # A repeat of the current timestamp still replaces it
+    world.update_vitals(_vitals(2, sbp=100))
+    assert world.get_current_vitals().sbp == 100
+    assert world.get_history().as_of(T0 + timedelta(minutes=1)).timestamp == T0 + timedelta(minutes=1)
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        VitalsHistory(capacity=0)
+
+def test_world_model_uses_bounded_history():
+    world = WorldModel("P1", history_capacity=3)
+    for m in range(10):
+        world.update_vitals(_vitals(m, sbp=100 + m))
+
+    assert isinstance(world.get_history(), VitalsHistory)
+    assert [v.sbp for v in world.get_history()] == [106, 107, 108]
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.ingest import StreamIngestor, parse_event
+from dss_agent.models import ResourceState
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.6, transport_delay_minutes=20)
+
+def _line(pid, t, **vitals):
+    event = {"patient_id": pid, "timestamp": t.isoformat(), "avpu": "A", "sbp": 120, "spo2": 97, "rr": 16, "hr": 80, "temp": 37.0, "news2": 1}
+    event.update(vitals)
+    return json.dumps(event)
+
+def _run(lines, **kwargs):
+    emitted = []
+    ingestor = StreamIngestor(RESOURCES, on_recommendation=lambda pid, recs: emitted.append((pid, recs)), **kwargs)
+
+    async def main():
+        consumer = asyncio.ensure_future(ingestor.run())
+        for line in lines:
+            await ingestor.submit(line)
+        await ingestor.close()
+        await consumer
+
+    asyncio.run(main())
+    return ingestor, emitted
+
+def test_parse_event_forms():
+    t = datetime(2024, 1, 1, 8, 0)
+    kind, (pid, vitals) = parse_event(_line("P1", t, news2=4))
+    assert kind == "vitals" and pid == "P1" and vitals.news2 == 4 and vitals.timestamp == t
+
+    kind, (_, nested) = parse_event({"patient_id": 7, "timestamp": 1704096000000, "vitals": {"sbp": 95}})
+    assert nested.sbp == 95 and nested.timestamp == t
+
+    _, (_, aware) = parse_event(_line("P1", t, timestamp="2024-01-01T09:00:00+01:00"))
+    assert aware.timestamp == t and aware.timestamp.tzinfo is None
+    _, (_, utc) = parse_event(_line("P1", t, timestamp="2024-01-01T08:00:00Z"))
+    assert utc.timestamp == t
+
+    kind, resources = parse_event('{"type": "resources", "icu_beds_available": 0, "nurse_load": 0.9, "transport_delay_minutes": 30}')
+    assert kind == "resources" and resources.icu_beds_available == 0
+
+def test_emits_only_on_change():
+    t0 = datetime.now()
+    lines = [_line("P1", t0 + timedelta(minutes=i)) for i in range(5)]
+    ingestor, emitted = _run(lines)
+    assert ingestor.events == 5
+    assert len(emitted) == 1
+
+def test_matches_run_step_and_never_drops_emergent():
+    """A tiny queue forces backpressure; every emergent reading must still be emitted."""
+    t0 = datetime.now()
+    lines = []
+    for i in range(30):
+        t = t0 + timedelta(minutes=i)
+        lines.append(_line("P1", t, news2=i % 6))
+        lines.append(_line("P2", t, sbp=65, avpu="V", news2=12))
+    ingestor, emitted = _run(lines, queue_size=2, max_batch=3)
+
+    assert ingestor.events == 60
+    assert ingestor.max_queue_depth <= 2
+    emergent = [recs for pid, recs in emitted if pid == "P2"]
+    assert len(emergent) == 30 and all(recs[0]["emergent"] for recs in emergent)
+
+    # Emissions are the changed results of stepping a single agent through the P1 readings
+    agent = EscalationAgent("P1")
+    expected = []
+    for line in lines[::2]:
+        recs = agent.run_step(parse_event(line)[1][1], RESOURCES)
+        if not expected or [r["action"] for r in recs] != [r["action"] for r in expected[-1]]:
+            expected.append(recs)
+    assert [recs for pid, recs in emitted if pid == "P1"] == expected
+
+def test_resource_update_applies_to_following_readings():
+    t0 = datetime.now()
+    lines = [
+        _line("P1", t0, news2=6),
+        json.dumps({"type": "resources", "icu_beds_available": 0, "nurse_load": 0.95, "transport_delay_minutes": 60}),
+        _line("P2", t0, news2=6),
+    ]
+    ingestor, emitted = _run(lines)
+    assert ingestor.resource_state.icu_beds_available == 0
+    by_patient = {pid: recs for pid, recs in emitted}
+    assert by_patient["P1"] != by_patient["P2"]
+
+def test_malformed_events_are_counted():
+    ingestor, emitted = _run(["not json", '{"sbp": 100}', _line("P1", datetime.now())])
+    assert ingestor.parse_errors == 2
+    assert ingestor.events == 1
+
+def test_fields_are_coerced_or_rejected():
+    t = datetime(2024, 1, 1, 8, 0)
+    _, (_, vitals) = parse_event(_line("P1", t, sbp=92.5, rr="18", avpu="v"))
+    assert (vitals.sbp, vitals.rr, vitals.avpu) == (92, 18, "V")
+    for bad in ({"avpu": "Alert"}, {"sbp": "low"}, {"spo2": True}, {"temp": float("nan")}):
+        with pytest.raises(ValueError):
+            parse_event(_line("P1", t, **bad))
+
+def test_bad_events_do_not_stop_ingestion(monkeypatch):
+    t0 = datetime.now()
+    lines = [_line("P1", t0, avpu="Alert"), _line("P2", t0, sbp=92.5), _line("P3", t0, sbp=60)]
+    ingestor, emitted = _run(lines)
+    assert ingestor.parse_errors == 1
+    assert {pid for pid, _ in emitted} == {"P2", "P3"}
+    assert dict(emitted)["P3"][0]["action"] == "Call RRT"
+
+    # A failure inside a step is isolated to its patient
+    original = EscalationAgent._update_beliefs
+    def failing(self, vitals, resource_state):
+        if self.world_model.patient_belief.patient_id == "P1":
+            raise RuntimeError("boom")
+        return original(self, vitals, resource_state)
+    monkeypatch.setattr(EscalationAgent, "_update_beliefs", failing)
+    ingestor, emitted = _run([_line("P1", t0), _line("P2", t0), _line("P3", t0, sbp=60)])
+    assert ingestor.step_errors == 1
+    assert {pid for pid, _ in emitted} == {"P2", "P3"}
+
+def test_missing_vitals_are_escalated_not_defaulted():
+    t0 = datetime.now()
+    _, (_, vitals) = parse_event({"patient_id": "P1", "timestamp": t0.isoformat(), "avpu": None, "sbp": 120})
+    assert vitals.avpu is None and vitals.spo2 is None and vitals.temp is None and vitals.sbp == 120
+
+    lines = [_line("P1", t0, sbp=None), _line("P2", t0, temp=None), _line("P3", t0)]
+    ingestor, emitted = _run(lines)
+    assert ingestor.parse_errors == 0
+    # Missing SBP fires its safety rule; nothing escalates a missing temperature
+    assert dict(emitted)["P1"][0]["emergent"]
+    assert ingestor.step_errors == 1
+    assert {pid for pid, _ in emitted} == {"P1", "P3"}
@@ -0,0 +1,111 @@
+import gc
+import threading
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent, WardAgent
+from dss_agent.instrumentation import AgentMetrics, LatencyHistogram, ROUTINE_STAGES, EMERGENT_STAGES
+from dss_agent.models import Vitals, ResourceState
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _reading(minute, sbp=120):
+    return Vitals(sbp=sbp, rr=16 + minute % 4, news2=minute % 3, timestamp=T0 + timedelta(minutes=minute))
+
+def test_counts_paths_and_times_every_stage():
+    metrics = AgentMetrics(sample_every=1)
+    timed = []
+    metrics.add_hook(lambda patient_id, path, breakdown: timed.append((patient_id, path, breakdown)))
+    agent = EscalationAgent("P1", metrics=metrics)
+    for minute in range(4):
+        agent.run_step(_reading(minute), RESOURCES)
+    agent.run_step(_reading(4, sbp=60), RESOURCES)
+
+    stats = metrics.stats()
+    assert stats["steps"] == {"emergent": 1, "routine": 4}
+    assert stats["step"]["count"] == 5
+    assert stats["stages"]["narrative"]["count"] == 4
+    assert stats["stages"]["world_model"]["count"] == 5
+    assert [path for _, path, _ in timed] == ["routine"] * 4 + ["emergent"]
+    assert tuple(timed[0][2]) == ROUTINE_STAGES
+    assert tuple(timed[-1][2]) == EMERGENT_STAGES
+    assert all(ns >= 0 for _, _, breakdown in timed for ns in breakdown.values())
+
+def test_sampling_keeps_counters_exact_across_threads():
+    metrics = AgentMetrics(sample_every=3)
+
+    def work(i):
+        ward = WardAgent(metrics=metrics)
+        agent = EscalationAgent(f"T{i}", metrics=metrics)
+        for minute in range(20):
+            agent.run_step(_reading(minute), RESOURCES)
+            ward.run_batch([(f"W{i}", _reading(minute))], RESOURCES)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = metrics.stats()
+    assert sum(stats["steps"].values()) == 160
+    # Batched steps are counted but not timed
+    assert 0 < stats["step"]["count"] <= 80
+    assert sum(metrics.stats()["steps"].values()) == 160
+
+def test_finished_threads_shards_are_retired():
+    metrics = AgentMetrics(sample_every=2)
+
+    def work(i):
+        agent = EscalationAgent(f"T{i}", metrics=metrics)
+        agent.run_step(_reading(0), RESOURCES)
+        agent.run_step(_reading(1, sbp=60), RESOURCES)
+
+    for i in range(50):
+        thread = threading.Thread(target=work, args=(i,))
+        thread.start()
+        thread.join()
+    del thread
+    gc.collect()
+
+    assert metrics.live_shards() == 0
+    stats = metrics.stats()
+    assert stats["steps"] == {"emergent": 50, "routine": 50}
+    assert stats["step"]["count"] == 50
+
+def test_reading_metrics_does_not_shift_sampling():
+    metrics = AgentMetrics(sample_every=2)
+    agent = EscalationAgent("P1", metrics=metrics)
+    for minute in range(10):
+        agent.run_step(_reading(minute), RESOURCES)
+        metrics.stats()
+        metrics.to_prometheus()
+    stats = metrics.stats()
+    assert stats["steps"]["routine"] == 10
+    assert stats["step"]["count"] == 5
+
+def test_prometheus_export():
+    metrics = AgentMetrics(sample_every=1)
+    agent = EscalationAgent("P1", metrics=metrics)
+    agent.run_step(_reading(0), RESOURCES)
+    agent.run_step(_reading(1, sbp=60), RESOURCES)
+
+    text = metrics.to_prometheus()
+    assert "# TYPE dss_agent_steps_total counter" in text
+    assert 'dss_agent_steps_total{path="routine"} 1' in text
+    assert 'dss_agent_steps_total{path="emergent"} 1' in text
+    assert 'dss_agent_stage_seconds_bucket{stage="scoring",le="+Inf"} 1' in text
+    assert 'dss_agent_stage_seconds_count{stage="safety"} 2' in text
+    assert "dss_agent_step_seconds_count 2" in text
+    assert text.endswith("\n")
+
+def test_histogram_percentiles_and_buckets():
+    histogram = LatencyHistogram()
+    for ns in range(1, 1001):
+        histogram.record(ns * 1000)
+    assert abs(histogram.percentile(0.5) - 500_000) / 500_000 < 0.07
+    assert abs(histogram.percentile(0.99) - 990_000) / 990_000 < 0.07
+    assert histogram.percentile(1.0) <= 1_000_000
+    below_100us, below_1ms, below_1s = histogram.cumulative([1e5, 1e6, 1e9])
+    assert 90 <= below_100us <= 100
+    assert 930 <= below_1ms <= 1000
+    assert below_1s == 1000
@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta
+from dss_agent.history import VitalsHistory
+from dss_agent.models import Cost, Recommendation, Vitals
+from dss_agent.reasoning.narrative import (
+    MemoryNarrator, STABLE_LINE, generate_memory_narrative, generate_horizon_narrative
+)
+
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _vitals(minute, **values):
+    return Vitals(timestamp=T0 + timedelta(minutes=minute), **values)
+
+def test_stable_steps_reuse_the_narrative():
+    narrator = MemoryNarrator()
+    history = VitalsHistory()
+    current = _vitals(0, rr=18)
+    assert narrator.narrative(history, current) == ("Initial assessment - no prior history.",)
+
+    lines = []
+    for minute in range(1, 6):
+        history.append(current)
+        current = _vitals(minute, rr=18 + minute % 2)
+        lines.append(narrator.narrative(history, current))
+    assert lines[0] == (STABLE_LINE,)
+    assert all(narrative is lines[0] for narrative in lines)
+    assert narrator.rebuilds == 1
+
+    history.append(current)
+    current = _vitals(6, rr=24, news2=3)
+    assert narrator.narrative(history, current) == (
+        "NEWS2 score increased from 0 -> 3", "Respiratory rate increased from 19 -> 24"
+    )
+    assert narrator.rebuilds == 2
+
+def test_matches_full_regeneration():
+    rng = random.Random(3)
+    narrator = MemoryNarrator(horizons=())
+    history = VitalsHistory()
+    current = _vitals(0)
+    for minute in range(1, 300):
+        history.append(current)
+        current = _vitals(minute, sbp=rng.choice((110, 112, 130)), spo2=rng.choice((95, 96, 92)),
+                          rr=rng.choice((16, 17, 19)), news2=rng.choice((1, 1, 1, 2)), avpu=rng.choice("AAAAV"))
+        assert list(narrator.narrative(history, current)) == generate_memory_narrative(history, current)
+    assert narrator.rebuilds < 299
+
+def test_slow_drift_shows_over_longer_horizons():
+    # Minute-level readings for 13 hours; SpO2 loses 1% every 2 hours, so
+    # no single step (or hour) crosses the 3% threshold
+    narrator = MemoryNarrator()
+    history = VitalsHistory()
+    for minute in range(13 * 60):
+        history.append(_vitals(minute, spo2=97 - minute // 120, rr=18))
+    current = _vitals(13 * 60, spo2=91, rr=18)
+
+    assert narrator.narrative(history, current) == (STABLE_LINE, "SpO2 dropped from 94% -> 91% over the last 6h")
+    assert generate_horizon_narrative(history, current) == ["SpO2 dropped from 94% -> 91% over the last 6h"]
+
+    # A sudden change is reported against the previous reading only
+    sudden = _vitals(13 * 60, spo2=91, rr=26)
+    assert narrator.narrative(history, sudden) == (
+        "Respiratory rate increased from 18 -> 26", "SpO2 dropped from 94% -> 91% over the last 6h"
+    )
+
+def test_shared_stable_narrative_cannot_be_corrupted():
+    narrator = MemoryNarrator()
+    history = VitalsHistory()
+    history.append(_vitals(0, rr=18))
+    rec = Recommendation(action="Monitor", rationale="", expected_benefit="", cost=Cost("Low", ""),
+                         confidence=0.5, emergent=False, memory_narrative=narrator.narrative(history, _vitals(1, rr=18)))
+    rec.to_dict()["memory_narrative"].append("edited by a caller")
+    assert narrator.narrative(history, _vitals(2, rr=18)) == (STABLE_LINE,)
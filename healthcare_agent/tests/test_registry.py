@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.registry import AgentRegistry
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_same_patient_reuses_agent_state():
+    registry = AgentRegistry()
+    t0 = datetime.now()
+    registry.run_step("P1", Vitals(rr=16, news2=1, timestamp=t0), RESOURCES)
+    recs = registry.run_step("P1", Vitals(rr=24, news2=5, timestamp=t0 + timedelta(minutes=5)), RESOURCES)
+
+    assert registry.get("P1").world_model.get_history()[-1].rr == 16
+    assert "Respiratory rate increased from 16 -> 24" in recs[0]["memory_narrative"]
+
+def test_lru_eviction_caps_agent_count():
+    registry = AgentRegistry(max_agents=2)
+    registry.get("P1")
+    registry.get("P2")
+    registry.get("P1")
+    registry.get("P3")
+
+    assert "P2" not in registry
+    assert "P1" in registry and "P3" in registry
+    assert registry.evictions == 1
+
+def test_idle_ttl_eviction():
+    clock = FakeClock()
+    registry = AgentRegistry(idle_ttl_seconds=60, clock=clock)
+    registry.get("P1")
+    clock.now = 30
+    registry.get("P2")
+    clock.now = 75
+    registry.get("P2")
+
+    assert "P1" not in registry
+    assert "P2" in registry
+
+def test_history_byte_budget_evicts_least_recently_used():
+    # 16 readings' worth of columns per agent after its first step
+    per_agent = 16 * 37
+    registry = AgentRegistry(max_history_bytes=2 * per_agent)
+    t0 = datetime.now()
+    for patient_id in ("P1", "P2", "P3"):
+        registry.run_step(patient_id, Vitals(rr=16, news2=1, timestamp=t0), RESOURCES)
+        registry.run_step(patient_id, Vitals(rr=18, news2=1, timestamp=t0 + timedelta(minutes=1)), RESOURCES)
+
+    assert "P1" not in registry
+    assert "P2" in registry and "P3" in registry
+    assert registry.history_bytes == 2 * per_agent
+    registry.evict("P2")
+    assert registry.history_bytes == per_agent
+
+def test_peek_reads_without_creating_or_touching_agents():
+    registry = AgentRegistry(max_agents=2)
+    t0 = datetime.now()
+    registry.run_step("P1", Vitals(rr=16, news2=3, timestamp=t0), RESOURCES)
+    registry.run_step("P2", Vitals(rr=16, news2=1, timestamp=t0), RESOURCES)
+
+    risks = registry.peek(["P1", "P9", "P1"], lambda agent: agent.current_risk())
+    assert risks == {"P1": 0.15}
+    assert "P9" not in registry
+
+    # P1 was only read, so it is still the least recently used
+    registry.get("P3")
+    assert "P1" not in registry and "P2" in registry
@@ -0,0 +1,117 @@
+import itertools
+from dataclasses import dataclass
+import pytest
+from dss_agent.agent import EscalationAgent
+from dss_agent.models import Vitals, PatientBeliefState, ResourceState
+from dss_agent.reasoning.safety import (
+    SafetyRule, SafetyRuleSet, check_safety_rules, check_safety_rules_batch
+)
+
+def _reference_rationale(v):
+    """The original hard-coded five rules."""
+    triggers = []
+    if v.avpu != "A":
+        triggers.append(f"AVPU={v.avpu}")
+    if v.sbp < 70:
+        triggers.append(f"SBP={v.sbp}")
+    if v.spo2 < 80:
+        triggers.append(f"SpO2={v.spo2}")
+    if v.rr > 35:
+        triggers.append(f"RR={v.rr}")
+    if v.news2 >= 9:
+        triggers.append(f"NEWS2={v.news2}")
+    if not triggers:
+        return None
+    return f"Patient meets critical safety criteria: {', '.join(triggers)}. Immediate RRT response required."
+
+def _grid():
+    for avpu, sbp, spo2, rr, news2 in itertools.product("AVPU", (69, 70, 71), (79, 80, 81), (34, 35, 36), (8, 9, 10)):
+        yield Vitals(avpu=avpu, sbp=sbp, spo2=spo2, rr=rr, news2=news2)
+
+def test_default_rules_match_original_checks():
+    for vitals in _grid():
+        rec = check_safety_rules(PatientBeliefState(patient_id="P", current_vitals=vitals))
+        expected = _reference_rationale(vitals)
+        if expected is None:
+            assert rec is None
+        else:
+            assert rec.rationale == expected
+            assert rec.action == "Call RRT" and rec.emergent and rec.confidence == 0.95
+
+def test_batch_matches_single():
+    beliefs = [PatientBeliefState(patient_id=str(i), current_vitals=v) for i, v in enumerate(_grid())]
+    batch = check_safety_rules_batch(beliefs)
+    for belief, rec in zip(beliefs, batch):
+        single = check_safety_rules(belief)
+        assert (rec and rec.to_dict()) == (single and single.to_dict())
+
+@dataclass
+class LabVitals:
+    hr: int = 80
+    lactate: float = None
+    avpu: str = "A"
+
+def test_folded_guards_and_extra_fields():
+    rules = SafetyRuleSet([
+        SafetyRule("hr", ">", 130, "HR"),
+        SafetyRule("hr", ">=", 150, "HR critical"),
+        SafetyRule("hr", "<=", 40, "HR low"),
+        SafetyRule("lactate", ">=", 4.0, "Lactate", fire_if_missing=False),
+        SafetyRule("avpu", "in", ("P", "U"), "Unresponsive"),
+    ])
+    assert rules.check(LabVitals(hr=130)) == []
+    assert [r.label for _, r, _ in rules.check(LabVitals(hr=131))] == ["HR"]
+    assert [r.label for _, r, _ in rules.check(LabVitals(hr=150))] == ["HR", "HR critical"]
+    assert [r.label for _, r, _ in rules.check(LabVitals(hr=40))] == ["HR low"]
+    # Optional lab values do not fire while missing
+    assert rules.check(LabVitals(lactate=None)) == []
+    assert [r.label for _, r, _ in rules.check(LabVitals(lactate=4.0, avpu="U"))] == ["Lactate", "Unresponsive"]
+
+    batch = rules.check_batch([LabVitals(hr=150), LabVitals(), LabVitals(lactate=5.0)])
+    assert [len(t) for t in batch] == [2, 0, 1]
+
+def test_not_equal_rules_fold_to_intersection():
+    rules = SafetyRuleSet([SafetyRule("avpu", "!=", "A", "AVPU"), SafetyRule("avpu", "not in", ("A", "V"), "Not A/V")])
+    assert rules.check(LabVitals(avpu="A")) == []
+    assert [r.label for _, r, _ in rules.check(LabVitals(avpu="V"))] == ["AVPU"]
+    assert [r.label for _, r, _ in rules.check(LabVitals(avpu="P"))] == ["AVPU", "Not A/V"]
+
+def test_rule_table_validation():
+    with pytest.raises(ValueError):
+        SafetyRuleSet([SafetyRule("hr", "~", 1, "bad")])
+    rules = SafetyRuleSet.from_dicts([{"field": "avpu", "op": "in", "threshold": ["V", "P", "U"], "label": "AVPU"}])
+    assert rules.check(LabVitals(avpu="V"))
+
+def test_missing_values_fail_safe():
+    # A guarded field that is missing or None escalates, as AVPU=None did
+    # before rules were compiled
+    for vitals in (Vitals(avpu=None), Vitals(sbp=None)):
+        rec = check_safety_rules(PatientBeliefState(patient_id="P", current_vitals=vitals))
+        assert rec is not None and rec.action == "Call RRT" and "=None" in rec.rationale
+    rules = SafetyRuleSet([SafetyRule("sbp", "<", 70, "SBP")])
+    assert [r.label for _, r, _ in rules.check(LabVitals())] == ["SBP"]
+    batch = rules.check_batch([LabVitals(), Vitals(sbp=None), Vitals(sbp=65), Vitals()])
+    assert [[value for _, _, value in triggers] for triggers in batch] == [[None], [None], [65], []]
+
+def test_from_dicts_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="heart_rate"):
+        SafetyRuleSet.from_dicts([{"field": "heart_rate", "op": ">", "threshold": 130}])
+    rules = SafetyRuleSet.from_dicts(
+        [{"field": "lactate", "op": ">=", "threshold": 4.0, "fire_if_missing": False}],
+        known_fields=["lactate"]
+    )
+    assert rules.check(LabVitals()) == []
+    assert rules.check(LabVitals(lactate=4.2))
+
+def test_agent_escalates_fractional_and_missing_readings():
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+    agent = EscalationAgent("P1")
+    for vitals, trigger in ((Vitals(avpu="V", sbp=60.5), "SBP=60"), (Vitals(sbp=65.0), "SBP=65"),
+                            (Vitals(avpu=None), "AVPU=None")):
+        recs = agent.run_step(vitals, resources)
+        assert recs[0]["action"] == "Call RRT" and recs[0]["emergent"]
+        assert trigger in recs[0]["rationale"]
+    # Missing values no rule escalates cannot be scored
+    with pytest.raises(ValueError, match="hr"):
+        agent.run_step(Vitals(hr=None), resources)
+    assert agent.run_step(Vitals(), resources)[0]["action"] != "Call RRT"
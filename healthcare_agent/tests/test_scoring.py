@@ -0,0 +1,28 @@
+import itertools
+from dss_agent.agent import default_actions
+from dss_agent.models import Vitals, PatientBeliefState, ResourceState
+from dss_agent.reasoning.scoring import score_actions, score_actions_batch, compile_actions, rank_actions
+
+def _belief(news2):
+    return PatientBeliefState(patient_id=f"P{news2}", current_vitals=Vitals(news2=news2))
+
+def test_batch_scoring_matches_scalar():
+    """Columnar scoring must reproduce score_actions for every risk/resource combination."""
+    actions = default_actions()
+    compiled = compile_actions(actions)
+    beliefs = [_belief(n) for n in range(0, 21)]
+
+    for beds, load, delay in itertools.product((0, 1, 3), (0.5, 0.95), (0, 20, 90)):
+        resources = ResourceState(icu_beds_available=beds, rrt_available=True, nurse_load=load, transport_delay_minutes=delay)
+        batch = score_actions_batch(beliefs, resources, compiled)
+        for belief, recs in zip(beliefs, batch):
+            expected = score_actions(belief, resources, actions)
+            assert [r.to_dict() for r in recs] == [r.to_dict() for r in expected]
+
+def test_rank_actions_shares_rows_per_risk():
+    compiled = compile_actions(default_actions())
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=15)
+    ranked = rank_actions(compiled, [0.4, 0.1, 0.4], resources)
+
+    assert ranked[0] is ranked[2]
+    assert [compiled.names[i] for i, _, _ in ranked[0]][0] == "ICU transfer"
@@ -0,0 +1,74 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+from dss_agent.agent import WardAgent
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.sharding import ShardRing, ShardedWard
+
+def _resources():
+    return ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.8, transport_delay_minutes=20)
+
+def _tick(t0, tick, n=24):
+    ts = t0 + timedelta(minutes=15 * tick)
+    batch = []
+    for i in range(n):
+        sbp = 125 - 4 * tick - (i % 5) * 3
+        batch.append((f"P{i:03d}", Vitals(avpu="V" if i == 7 else "A", sbp=sbp, spo2=97 - (i % 4), rr=14 + tick + i % 6,
+                                          news2=(i + tick) % 9, timestamp=ts)))
+    return batch
+
+def test_ring_is_stable_and_moves_few_patients():
+    patients = [f"P{i:05d}" for i in range(2000)]
+    ring4 = ShardRing(4)
+    assert [ring4.shard_for(p) for p in patients] == [ShardRing(4).shard_for(p) for p in patients]
+    assert set(ring4.shard_for(p) for p in patients) == {0, 1, 2, 3}
+
+    ring5 = ShardRing(5)
+    moved = sum(ring4.shard_for(p) != ring5.shard_for(p) for p in patients)
+    # Adding a fifth shard should move roughly 1/5 of patients, not most of them
+    assert moved < len(patients) * 0.35
+
+def test_sharded_matches_ward_agent():
+    t0 = datetime(2024, 1, 1, 8, 0)
+    ward = WardAgent()
+    with ShardedWard(n_workers=3) as sharded:
+        for tick in range(3):
+            expected = ward.run_batch(_tick(t0, tick), _resources())
+            assert sharded.run_batch(_tick(t0, tick), _resources()) == expected
+        census = sharded.census()
+        assert sorted(p for patients in census.values() for p in patients) == sorted(ward.agents)
+        sharded.discharge("P001")
+        assert "P001" in census[sharded.shard_for("P001")]
+        assert "P001" not in sharded.census()[sharded.shard_for("P001")]
+
+def test_worker_crash_is_isolated():
+    t0 = datetime(2024, 1, 1, 8, 0)
+    with ShardedWard(n_workers=2) as sharded:
+        sharded.run_batch(_tick(t0, 0), _resources())
+        before = sharded.census()
+        victim = sharded._shards[0]
+        victim.process.kill()
+        victim.process.join()
+
+        results = sharded.run_batch(_tick(t0, 1), _resources())
+        # Every patient still gets a recommendation; the crashed shard restarted
+        assert set(results) == {pid for pid, _ in _tick(t0, 1)}
+        assert sharded.failed_patients == {}
+        assert sharded.restarts == [1, 0]
+
+        ward = WardAgent()
+        ward.run_batch(_tick(t0, 0), _resources())
+        expected = ward.run_batch(_tick(t0, 1), _resources())
+        # The surviving shard kept its history, so its results are unchanged
+        for pid in before[1]:
+            assert results[pid] == expected[pid]
+        assert sharded.census()[0] == before[0]
+
+def test_bad_reading_fails_only_its_patient():
+    t0 = datetime(2024, 1, 1, 8, 0)
+    batch = _tick(t0, 0)
+    batch[3] = (batch[3][0], replace(batch[3][1], avpu="Z"))
+    with ShardedWard(n_workers=2) as sharded:
+        results = sharded.run_batch(batch, _resources())
+        assert set(sharded.failed_patients) == {"P003"}
+        assert set(results) == {pid for pid, _ in batch} - {"P003"}
+        assert sharded.restarts == [0, 0]
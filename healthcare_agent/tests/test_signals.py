@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from dss_agent.agent import EscalationAgent
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.perception import signals as signals_module
+from dss_agent.perception.signals import StepSignals
+from dss_agent.world_model import WorldModel
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+
+def _count_trend_calls(monkeypatch):
+    calls = []
+    original = signals_module.vitals_trends.analyze_vital_trends
+    def counting(*args):
+        calls.append(1)
+        return original(*args)
+    monkeypatch.setattr(signals_module.vitals_trends, "analyze_vital_trends", counting)
+    return calls
+
+def test_emergent_step_skips_perception(monkeypatch):
+    calls = _count_trend_calls(monkeypatch)
+    agent = EscalationAgent("P1")
+    recs = agent.run_step(Vitals(avpu="A", sbp=60, news2=7), RESOURCES)
+    assert recs[0]["action"] == "Call RRT"
+    assert calls == []
+
+def test_signals_are_memoized_per_step(monkeypatch):
+    calls = _count_trend_calls(monkeypatch)
+    agent = EscalationAgent("P1")
+    t0 = datetime.now()
+    agent.run_step(Vitals(sbp=130, news2=2, timestamp=t0), RESOURCES)
+    agent.run_step(Vitals(sbp=100, news2=3, timestamp=t0 + timedelta(minutes=5)), RESOURCES)
+    assert len(calls) == 2
+
+    signals = agent.signals
+    assert signals.trends is signals.trends
+    assert "Rapid SBP drop" in signals.explanation_signals()
+    assert len(calls) == 2
+
+def test_treatment_response_on_demand():
+    agent = EscalationAgent("P1")
+    belief = agent.world_model.patient_belief
+    belief.active_interventions.append("fluid_bolus")
+    t0 = datetime.now()
+    agent.world_model.update_vitals(Vitals(sbp=90, timestamp=t0))
+    agent.world_model.update_vitals(Vitals(sbp=100, timestamp=t0 + timedelta(minutes=10)))
+    assert StepSignals(belief).treatment_response["response_status"] == "responsive"
+
+def test_treatment_response_against_pre_intervention_baseline():
+    agent = EscalationAgent("P1")
+    world_model = agent.world_model
+    t0 = datetime.now()
+    for minute, sbp in zip(range(0, 50, 10), [80, 84, 86, 85, 85]):
+        world_model.update_vitals(Vitals(sbp=sbp, timestamp=t0 + timedelta(minutes=minute)))
+    # Baseline: the readings from 30 minutes before the bolus up to it (84, 86, 85, 85)
+    world_model.start_intervention("fluid_bolus")
+    # Slow rise after the bolus: no single step is a 5 mmHg improvement
+    for minute, sbp in zip(range(50, 110, 10), [88, 90, 92, 94, 95, 96]):
+        world_model.update_vitals(Vitals(sbp=sbp, timestamp=t0 + timedelta(minutes=minute)))
+    response = StepSignals(world_model.patient_belief).treatment_response
+    assert response == {"response_status": "responsive", "baseline_sbp": 85.0}
+
+    world_model.end_intervention("fluid_bolus")
+    assert world_model.patient_belief.intervention_times == {}
+    assert StepSignals(world_model.patient_belief).treatment_response["response_status"] == "unknown"
+
+def test_trends_compare_against_pre_intervention_baseline():
+    agent = EscalationAgent("P1")
+    world_model = agent.world_model
+    t0 = datetime.now()
+    world_model.update_vitals(Vitals(sbp=120, rr=16, timestamp=t0))
+    world_model.start_intervention("oxygen")
+    # RR creeps up under treatment, never more than 5 per reading
+    for minute, rr in zip(range(10, 60, 10), [18, 20, 22, 24]):
+        world_model.update_vitals(Vitals(sbp=118, rr=rr, timestamp=t0 + timedelta(minutes=minute)))
+
+    signals = StepSignals(world_model.patient_belief, world_model.trends)
+    assert "RR above pre-intervention baseline" in signals.trends["trends"]
+    assert "Rapid RR rise" not in signals.trends["trends"]
+    assert "RR above pre-intervention baseline" in signals.explanation_signals()
+
+def test_placeholder_reading_stays_out_of_the_baseline():
+    # Device timestamps well before the world model was created
+    world_model = WorldModel("P1")
+    t0 = datetime(2024, 1, 1, 8, 0)
+    for minute in (0, 10, 20):
+        world_model.update_vitals(Vitals(sbp=80, timestamp=t0 + timedelta(minutes=minute)))
+    world_model.start_intervention("fluid_bolus")
+    world_model.update_vitals(Vitals(sbp=82, timestamp=t0 + timedelta(minutes=30)))
+
+    assert [v.sbp for v in world_model.get_history()] == [80, 80, 80]
+    response = StepSignals(world_model.patient_belief).treatment_response
+    assert response == {"response_status": "no_significant_change", "baseline_sbp": 80.0}
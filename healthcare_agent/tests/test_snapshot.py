@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.agent import EscalationAgent
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.registry import AgentRegistry
+from dss_agent.snapshot import SnapshotReader, claim_snapshot_path, write_snapshot
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _reading(minute):
+    return Vitals(sbp=130 - minute // 3, spo2=97 - minute % 3, rr=16 + minute % 5, temp=37.1,
+                  news2=minute % 4, timestamp=T0 + timedelta(minutes=minute))
+
+def test_round_trip_resumes_identically(tmp_path):
+    live = EscalationAgent("P1", history_capacity=50)
+    for minute in range(80):
+        live.run_step(_reading(minute), RESOURCES)
+    live.world_model.start_intervention("fluid_bolus")
+
+    path = str(tmp_path / "agents.snap")
+    assert write_snapshot(path, [live.world_model]) == 1
+
+    restored = EscalationAgent("P1")
+    with SnapshotReader(path) as reader:
+        assert "P1" in reader and len(reader) == 1
+        restored.restore_world_model(reader.load("P1"))
+
+    history = restored.world_model.get_history()
+    assert len(history) == 50
+    assert list(history) == list(live.world_model.get_history())
+    assert restored.world_model.patient_belief.active_interventions == ["fluid_bolus"]
+    assert restored.world_model.has_reading
+    assert restored.world_model.patient_belief.intervention_times == {"fluid_bolus": _reading(79).timestamp}
+    assert restored.world_model.trends.stats() == live.world_model.trends.stats()
+
+    for minute in range(80, 90):
+        assert restored.run_step(_reading(minute), RESOURCES) == live.run_step(_reading(minute), RESOURCES)
+
+def test_registry_restores_lazily_and_keeps_pending_patients(tmp_path):
+    path = str(tmp_path / "agents.snap")
+    registry = AgentRegistry()
+    for patient_id in ("P1", "P2"):
+        registry.run_step(patient_id, _reading(0), RESOURCES)
+        registry.run_step(patient_id, _reading(1), RESOURCES)
+    assert registry.save_snapshot(path) == 2
+
+    restarted = AgentRegistry()
+    assert restarted.restore_snapshot(path) == 2
+    assert len(restarted) == 0 and "P2" in restarted
+
+    restarted.get("P1")
+    assert restarted.restored == 1
+    assert restarted.get("P1").world_model.get_history()[-1].rr == _reading(0).rr
+
+    # P2 was never touched but still makes it into the next snapshot
+    assert restarted.save_snapshot(path) == 2
+    with SnapshotReader(path) as reader:
+        assert sorted(reader.patient_ids()) == ["P1", "P2"]
+    restarted.clear()
+
+def test_save_survives_concurrent_load_and_clear(tmp_path):
+    path = str(tmp_path / "agents.snap")
+    registry = AgentRegistry()
+    for patient_id in ("P1", "P2", "P3"):
+        registry.run_step(patient_id, _reading(0), RESOURCES)
+    registry.save_snapshot(path)
+    restarted = AgentRegistry()
+    restarted.restore_snapshot(path)
+
+    models = restarted._snapshot_world_models()
+    first = next(models).patient_belief.patient_id
+    # Other requests load and step the pending patients mid-save: their
+    # live state is written, not the stale snapshot record
+    for patient_id in {"P1", "P2", "P3"} - {first}:
+        restarted.run_step(patient_id, _reading(5), RESOURCES)
+    written = next(models)
+    assert written.patient_belief.patient_id != first
+    assert written.get_current_vitals().timestamp == _reading(5).timestamp
+
+    # clear() closes the snapshot mid-save; the rest is skipped, not read from a closed map
+    restarted.clear()
+    assert list(models) == []
+
+def test_rejects_non_snapshot(tmp_path):
+    path = tmp_path / "not.snap"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        SnapshotReader(str(path))
+
+def test_failed_write_keeps_previous_snapshot(tmp_path):
+    agent = EscalationAgent("P1")
+    agent.run_step(_reading(0), RESOURCES)
+    path = str(tmp_path / "agents.snap")
+    write_snapshot(path, [agent.world_model])
+
+    def failing():
+        yield agent.world_model
+        raise RuntimeError("encode failed")
+
+    with pytest.raises(RuntimeError):
+        write_snapshot(path, failing())
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["agents.snap"]
+    with SnapshotReader(path) as reader:
+        assert list(reader.patient_ids()) == ["P1"]
+
+def test_snapshot_path_claimed_by_one_process(tmp_path):
+    path = str(tmp_path / "agents.snap")
+    claim = claim_snapshot_path(path)
+    # flock conflicts between separate open handles, as between workers
+    with pytest.raises(RuntimeError, match="already in use"):
+        claim_snapshot_path(path)
+    claim.close()
+    claim_snapshot_path(path).close()
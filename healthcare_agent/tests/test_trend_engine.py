@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.models import Vitals
+from dss_agent.perception.trend_engine import TrendEngine
+from dss_agent.perception.vitals_trends import analyze_vital_trends
+from dss_agent.world_model import WorldModel
+
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _feed(engine, sbps, interval=15):
+    for i, sbp in enumerate(sbps):
+        engine.update(Vitals(sbp=sbp, timestamp=T0 + timedelta(minutes=i * interval)))
+
+def test_sustained_decline_versus_single_drop():
+    sustained = TrendEngine()
+    _feed(sustained, [130, 122, 114, 106, 98])
+    assert "Sustained SBP decline" in sustained.sustained_trends()
+
+    single = TrendEngine()
+    _feed(single, [120, 121, 120, 120, 95])
+    assert single.sustained_trends() == []
+
+def test_statistics_match_direct_computation():
+    engine = TrendEngine(windows_minutes=(30, 60), alpha=0.5)
+    values = [120, 118, 121, 115, 110, 112, 104]
+    _feed(engine, values, interval=10)
+
+    # EWMA
+    expected = values[0]
+    for v in values[1:]:
+        expected += 0.5 * (v - expected)
+    stats = engine.stats()["sbp"]
+    assert stats["ewma"] == pytest.approx(expected, abs=1e-3)
+
+    # Least-squares slope over the 30-minute window (last four readings)
+    ts = [30, 40, 50, 60]
+    ys = values[3:]
+    t_mean, y_mean = sum(ts) / 4, sum(ys) / 4
+    slope = sum((t - t_mean) * (y - y_mean) for t, y in zip(ts, ys)) / sum((t - t_mean) ** 2 for t in ts)
+    assert stats["slope_per_hour"][30] == pytest.approx(slope * 60, abs=1e-3)
+    assert engine.samples(30) == 4
+    assert engine.samples(60) == 7
+
+def test_window_stays_bounded_over_long_stay():
+    engine = TrendEngine(windows_minutes=(60,))
+    for i in range(5000):
+        engine.update(Vitals(sbp=120 + i % 3, timestamp=T0 + timedelta(minutes=i)))
+    assert engine.samples() == 61
+    assert len(engine._totals) == 62
+    assert abs(engine.slope_per_hour("sbp")) < 1.0
+
+def test_same_timestamp_replaces_previous_reading():
+    replaced = TrendEngine()
+    _feed(replaced, [130, 120])
+    replaced.update(Vitals(sbp=110, timestamp=T0 + timedelta(minutes=15)))
+
+    direct = TrendEngine()
+    _feed(direct, [130, 110])
+    assert replaced.stats() == direct.stats()
+    assert replaced.count == 2
+
+def test_world_model_feeds_trend_signals():
+    world_model = WorldModel("P1")
+    for i, sbp in enumerate([130, 124, 118, 112, 106]):
+        world_model.update_vitals(Vitals(sbp=sbp, timestamp=T0 + timedelta(minutes=i * 15)))
+    belief = world_model.patient_belief
+    signals = analyze_vital_trends(belief.history, belief.current_vitals, world_model.trends)
+    assert signals["trends"] == ["Sustained SBP decline"]
+    assert signals["stability"] == "unstable"
+    # Without the engine only the last-point comparison runs
+    assert analyze_vital_trends(belief.history, belief.current_vitals)["trends"] == []
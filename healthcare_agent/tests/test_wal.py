@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.agent import EscalationAgent, WardAgent
+from dss_agent.models import Vitals, ResourceState
+from dss_agent.wal import WriteAheadLog, replay, rebuild_world_model, list_segments
+
+RESOURCES = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=20)
+T0 = datetime(2024, 1, 1, 8, 0)
+
+def _reading(minute, sbp=120):
+    return Vitals(sbp=sbp, rr=16 + minute % 4, news2=minute % 3, timestamp=T0 + timedelta(minutes=minute))
+
+def test_steps_are_logged_and_replayable(tmp_path):
+    directory = str(tmp_path / "wal")
+    with WriteAheadLog(directory) as wal:
+        agent = EscalationAgent("P1", wal=wal)
+        outputs = [agent.run_step(_reading(m), RESOURCES) for m in range(5)]
+        outputs.append(agent.run_step(_reading(5, sbp=60), RESOURCES))
+        assert wal.flush(timeout=5)
+
+    records = list(replay(directory))
+    assert [r["patient_id"] for r in records] == ["P1"] * 6
+    assert records[-1]["vitals"].sbp == 60
+    assert records[-1]["resources"] == RESOURCES
+    assert [r["recommendations"][0]["action"] for r in records] == [o[0]["action"] for o in outputs]
+
+    rebuilt, applied = rebuild_world_model(directory, "P1")
+    assert applied == 6
+    assert list(rebuilt.get_history())[1:] == list(agent.world_model.get_history())[1:]
+    assert rebuilt.trends.stats() == agent.world_model.trends.stats()
+
+def test_ward_batch_logs_every_patient_and_rotates(tmp_path):
+    directory = str(tmp_path / "wal")
+    with WriteAheadLog(directory, segment_bytes=2048) as wal:
+        ward = WardAgent(wal=wal)
+        for minute in range(10):
+            ward.run_batch([(f"P{i}", _reading(minute)) for i in range(3)], RESOURCES)
+
+    assert len(list_segments(directory)) > 1
+    assert len(list(replay(directory))) == 30
+    assert len(list(replay(directory, "P2"))) == 10
+
+def test_replay_stops_at_torn_tail(tmp_path):
+    directory = str(tmp_path / "wal")
+    with WriteAheadLog(directory) as wal:
+        agent = EscalationAgent("P1", wal=wal)
+        for minute in range(3):
+            agent.run_step(_reading(minute), RESOURCES)
+
+    segment = list_segments(directory)[-1]
+    with open(segment, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 5)
+    assert len(list(replay(directory))) == 2
+
+    # A reopened log starts a new segment after the damaged one
+    with WriteAheadLog(directory) as wal:
+        EscalationAgent("P2", wal=wal).run_step(_reading(0), RESOURCES)
+    assert [r["patient_id"] for r in replay(directory)] == ["P1", "P1", "P2"]
+
+def test_directory_belongs_to_one_log(tmp_path):
+    directory = str(tmp_path / "wal")
+    wal = WriteAheadLog(directory)
+    with pytest.raises(RuntimeError, match="already in use"):
+        WriteAheadLog(directory)
+    wal.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        wal.append("P1", _reading(0), RESOURCES, [])
+    with pytest.raises(RuntimeError, match="closed"):
+        wal.flush(timeout=1)
+    WriteAheadLog(directory).close()
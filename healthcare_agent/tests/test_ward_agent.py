@@ -0,0 +1,93 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+import pytest
+from dss_agent.agent import EscalationAgent, WardAgent
+from dss_agent.models import Vitals, ResourceState
+
+def _ward_vitals(t0):
+    return [
+        ("P1", Vitals(avpu="A", sbp=120, spo2=98, rr=16, news2=1, timestamp=t0)),
+        ("P2", Vitals(avpu="A", sbp=100, spo2=92, rr=22, news2=8, timestamp=t0)),
+        ("P3", Vitals(avpu="V", sbp=65, spo2=85, rr=30, news2=12, timestamp=t0)),
+        ("P4", Vitals(avpu="A", sbp=110, spo2=95, rr=18, news2=5, timestamp=t0)),
+    ]
+
+def test_run_batch_matches_run_step():
+    """run_batch must return exactly what per-patient run_step returns."""
+    t0 = datetime.now()
+    resources = ResourceState(icu_beds_available=0, rrt_available=True, nurse_load=0.95, transport_delay_minutes=20)
+
+    ward = WardAgent()
+    singles = {pid: EscalationAgent(pid) for pid, _ in _ward_vitals(t0)}
+
+    for tick in range(3):
+        ts = t0 + timedelta(minutes=tick)
+        batch = ward.run_batch(_ward_vitals(ts), resources)
+        for pid, vitals in _ward_vitals(ts):
+            assert batch[pid] == singles[pid].run_step(vitals, resources)
+
+def test_run_batch_keeps_per_patient_state():
+    t0 = datetime.now()
+    resources = ResourceState(icu_beds_available=2, rrt_available=True, nurse_load=0.5, transport_delay_minutes=15)
+    ward = WardAgent()
+
+    ward.run_batch(_ward_vitals(t0), resources)
+    ward.run_batch(_ward_vitals(t0 + timedelta(minutes=1)), resources)
+
+    assert set(ward.agents) == {"P1", "P2", "P3", "P4"}
+    # The first reading was archived when the second arrived
+    assert len(ward.get_agent("P1").world_model.get_history()) == 1
+    # All agents share the ward's action table
+    assert ward.get_agent("P2").possible_actions is ward.possible_actions
+
+    ward.discharge("P1")
+    assert "P1" not in ward.agents
+
+def test_what_if_uses_latest_state():
+    t0 = datetime.now()
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=15)
+    ward = WardAgent()
+    # An earlier round where P2's RR was 16
+    earlier = [(pid, replace(v, rr=16 if pid == "P2" else v.rr, timestamp=t0 - timedelta(minutes=5)))
+               for pid, v in _ward_vitals(t0)]
+    ward.run_batch(earlier, resources)
+    ward.run_batch(_ward_vitals(t0), resources)
+
+    sweep = ward.what_if([30, 60, 120])
+    assert sweep["patient_ids"] == ["P1", "P2", "P3", "P4"]
+    assert [len(row) for row in sweep["projected_risk"]] == [3, 3, 3, 3]
+    # P2: NEWS2 8 -> risk 0.4; "Rapid RR rise" doubles the 0.001/min drift
+    assert sweep["projected_risk"][1] == (0.46, 0.52, 0.64)
+
+    subset = ward.what_if([60], patient_ids=["P4"])
+    assert subset["projected_risk"] == [(0.31,)]
+
+def test_duplicate_patient_rejects_the_whole_batch_first():
+    t0 = datetime.now()
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=15)
+    ward = WardAgent()
+    ward.run_batch(_ward_vitals(t0), resources)
+    before = {pid: ward.get_agent(pid).world_model.get_current_vitals() for pid in ward.agents}
+
+    later = _ward_vitals(t0 + timedelta(minutes=1))
+    with pytest.raises(ValueError):
+        ward.run_batch(later + [later[0]] + [("P9", later[0][1])], resources)
+    # Nothing was applied: not the earlier patients, and no new agents
+    assert {pid: ward.get_agent(pid).world_model.get_current_vitals() for pid in ward.agents} == before
+    assert "P9" not in ward.agents
+
+def test_failed_reading_does_not_hold_up_the_batch():
+    t0 = datetime.now()
+    resources = ResourceState(icu_beds_available=1, rrt_available=True, nurse_load=0.5, transport_delay_minutes=15)
+    ward = WardAgent()
+    ward.run_batch(_ward_vitals(t0), resources)
+    before = ward.get_agent("P1").world_model.get_current_vitals()
+
+    later = _ward_vitals(t0 + timedelta(minutes=1))
+    later[0] = ("P1", replace(later[0][1], avpu="Z"))
+    results = ward.run_batch(later, resources)
+
+    assert set(ward.failed_patients) == {"P1"}
+    assert "P1" not in results
+    assert set(results) == {pid for pid, _ in later} - {"P1"}
+    assert ward.get_agent("P1").world_model.get_current_vitals() == before